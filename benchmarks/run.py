@@ -0,0 +1,96 @@
+"""Offline benchmark runner with JSON baselines
+
+Run from the repository root:
+    python -m benchmarks.run --save baseline.json                  # measure and save a baseline
+    python -m benchmarks.run --compare baseline.json               # measure and report regressions
+    python -m benchmarks.run --filter Kepler --sizes 1 1000        # a subset
+
+The exit code is 1 if any case is slower than the baseline by more than --threshold.
+"""
+import argparse
+import json
+import platform
+import re
+import sys
+import timeit
+from datetime import datetime
+from typing import Dict, List
+import numpy as np
+from .suite import CASES
+
+SIZES = (1, 1000, 1000000)
+
+
+def measure(name: str, size: int, repeat: int = 5, min_time: float = 0.2) -> Dict[str, float]:
+    """Best and median seconds of one call of case name at size, scaled up if the case is capped"""
+    setup, cap = CASES[name]
+    count = size if cap is None else min(size, cap)
+    function = setup(count)
+    timer = timeit.Timer(function)
+    number, elapsed = timer.autorange()
+    # autorange stops at 0.2 s, fewer calls are enough for slow cases
+    number = max(1, int(number * min_time / max(elapsed, 1e-9))) if elapsed > min_time else number
+    times = np.array(timer.repeat(repeat=repeat, number=number)) / number * (size / count)
+    return {"min": float(times.min()), "median": float(np.median(times)), "number": number, "repeat": repeat, "scaled": count != size}
+
+
+def run(names: List[str], sizes=SIZES, repeat: int = 5, log=print) -> Dict[str, dict]:
+    results = {}
+    for name in names:
+        for size in sizes:
+            key = f"{name}[{size}]"
+            results[key] = measure(name, size, repeat)
+            if log:
+                log(f"{key:<45s} {results[key]['median'] * 1e3:12.4f} ms{' (scaled)' if results[key]['scaled'] else ''}")
+    return results
+
+
+def getMetadata() -> dict:
+    return {"date": datetime.now().isoformat(timespec="seconds"), "python": platform.python_version(),
+            "numpy": np.__version__, "machine": platform.machine(), "processor": platform.processor(), "node": platform.node()}
+
+
+def compareResults(current: Dict[str, dict], baseline: Dict[str, dict], threshold: float = 0.2) -> List[dict]:
+    """Ratio of current to baseline median of every case in both, regression if ratio > 1 + threshold"""
+    report = []
+    for key in sorted(set(current) & set(baseline)):
+        ratio = current[key]["median"] / baseline[key]["median"]
+        status = "regression" if ratio > 1 + threshold else "improvement" if ratio < 1 / (1 + threshold) else "same"
+        report.append({"case": key, "baseline": baseline[key]["median"], "current": current[key]["median"], "ratio": ratio, "status": status})
+    return report
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmarks of the propagation, GMST and Gauss hot paths")
+    parser.add_argument("--filter", default="", help="regular expression on case names")
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(SIZES))
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--save", help="write results to this JSON file")
+    parser.add_argument("--compare", help="baseline JSON file to compare against")
+    parser.add_argument("--threshold", type=float, default=0.2, help="relative slowdown reported as regression")
+    parser.add_argument("--list", action="store_true", help="list the cases and exit")
+    args = parser.parse_args(argv)
+
+    names = [name for name in CASES if re.search(args.filter, name)]
+    if args.list:
+        print("\n".join(names))
+        return 0
+
+    results = run(names, args.sizes, args.repeat)
+    if args.save:
+        with open(args.save, "w") as file:
+            json.dump({"metadata": getMetadata(), "results": results}, file, indent=2)
+
+    if args.compare:
+        with open(args.compare) as file:
+            baseline = json.load(file)
+        report = compareResults(results, baseline["results"], args.threshold)
+        print(f"\nAgainst {args.compare} ({baseline['metadata']['date']}), threshold {args.threshold:.0%}")
+        for row in report:
+            print(f"{row['case']:<45s} {row['baseline'] * 1e3:12.4f} -> {row['current'] * 1e3:12.4f} ms  x{row['ratio']:6.2f}  {row['status']}")
+        return int(any(row["status"] == "regression" for row in report))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
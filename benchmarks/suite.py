@@ -0,0 +1,152 @@
+"""Benchmark cases of the hot paths
+
+Every case is a setup function size -> callable that processes size items once. Scalar cases loop over
+the scalar function, their loops are capped at `cap` items and the time is scaled up to size.
+"""
+import numpy as np
+from datetime import datetime, timedelta
+from typing import Callable, Dict, NamedTuple
+from package.utility import (TypeOE, TypeOEArray, TypeLatLong, calMeanAnomaly, calEccentricAnomaly, solveKepler, getGMST, getGMSTArray, getRie,
+                             getGMSTAndRie, toECIfromLatLong, toECIfromLatLongBatch)
+from package.orbital import Simulation, OrbitCalculate
+from package.propagation import getStateInECI
+from package.orbital_elements import calc_oe_from_sv, calc_oe_from_sv_batch
+
+
+class TypeCase(NamedTuple):
+    setup: Callable[[int], Callable[[], object]]
+    cap: int = None
+
+
+CASES: Dict[str, TypeCase] = {}
+
+OE = TypeOE(semimajor_axis=6876.6644, eccentricity=0.0020122, inclination=1.6971285,
+            right_ascension=2.7791209, argument_of_perigee=1.6541096, mean_anomaly=0.2653564)
+OBSERVER = TypeLatLong(21.047198, 105.800237)
+TIME = datetime(year=2020, month=4, day=15, hour=18, minute=22, second=4)
+
+
+def case(name: str, cap: int = None):
+    def register(setup):
+        CASES[name] = TypeCase(setup, cap)
+        return setup
+    return register
+
+
+def _anomalies(size: int) -> np.array:
+    return np.random.default_rng(0).uniform(0, 2 * np.pi, size)
+
+
+def _dts(size: int) -> np.array:
+    return np.linspace(0, 86400, size)
+
+
+def _states(size: int):
+    return getStateInECI(TypeOEArray.fromOEs([OE]), _dts(size))
+
+
+@case("calEccentricAnomaly.scalar", cap=10000)
+def _(size):
+    M = _anomalies(size)
+    return lambda: [calEccentricAnomaly(m, OE.eccentricity, alias=1e-12) for m in M]
+
+
+@case("calEccentricAnomaly.array")
+def _(size):
+    M = _anomalies(size)
+    return lambda: calEccentricAnomaly(M, OE.eccentricity, alias=1e-12)
+
+
+@case("solveKepler")
+def _(size):
+    M = _anomalies(size)
+    return lambda: solveKepler(M, OE.eccentricity)
+
+
+@case("calMeanAnomaly.scalar", cap=10000)
+def _(size):
+    dts = _dts(size)
+    return lambda: [calMeanAnomaly(OE.mean_anomaly, OE.semimajor_axis, dt) for dt in dts]
+
+
+@case("calMeanAnomaly.array")
+def _(size):
+    dts = _dts(size)
+    return lambda: calMeanAnomaly(OE.mean_anomaly, OE.semimajor_axis, dts)
+
+
+@case("getGMST.scalar", cap=10000)
+def _(size):
+    times = [TIME + timedelta(seconds=float(dt)) for dt in _dts(size)]
+    return lambda: [getGMST(time) for time in times]
+
+
+@case("getGMSTArray")
+def _(size):
+    dts = _dts(size)
+    return lambda: getGMSTArray(TIME, dts)
+
+
+@case("getRie.scalar", cap=10000)
+def _(size):
+    times = [TIME + timedelta(seconds=float(dt)) for dt in _dts(size)]
+    return lambda: [getRie(time) for time in times]
+
+
+@case("getGMSTAndRie")
+def _(size):
+    dts = _dts(size)
+    return lambda: getGMSTAndRie(TIME, dts)
+
+
+@case("toECIfromLatLong.scalar", cap=10000)
+def _(size):
+    times = [TIME + timedelta(seconds=float(dt)) for dt in _dts(size)]
+    return lambda: [toECIfromLatLong(OBSERVER, time) for time in times]
+
+
+@case("toECIfromLatLongBatch")
+def _(size):
+    dts = _dts(size)
+    return lambda: toECIfromLatLongBatch(OBSERVER, TIME, dts)
+
+
+@case("Simulation.getAllCoords", cap=1000)
+def _(size):
+    sim, dts = Simulation(OE, OBSERVER, time=TIME), _dts(size)
+    return lambda: [sim.getAllCoords(dt) for dt in dts]
+
+
+@case("Simulation.getAllCoordsBatch")
+def _(size):
+    sim, dts = Simulation(OE, OBSERVER, time=TIME), _dts(size)
+    return lambda: sim.getAllCoordsBatch(dts)
+
+
+@case("OrbitCalculate.calculate", cap=100)
+def _(size):
+    orbit = OrbitCalculate(Simulation(OE, OBSERVER, time=TIME))
+    orbit.preCalculate([3800, 3900, 4050])
+    return lambda: [orbit.calculate([3800, 3900, 4050], shouldPrecalculate=False) for _ in range(size)]
+
+
+@case("OrbitCalculate.calculateBatch")
+def _(size):
+    orbit = OrbitCalculate(Simulation(OE, OBSERVER, time=TIME))
+    orbit.preCalculate([3800, 3900, 4050])
+    observers = np.broadcast_to(np.array(orbit.observers), (size, 3, 3))
+    directions = np.broadcast_to(np.array(orbit.directions), (size, 3, 3))
+    time_points = np.broadcast_to(np.array([3800, 3900, 4050.0]), (size, 3))
+    return lambda: OrbitCalculate.calculateBatch(observers, directions, time_points)
+
+
+@case("calc_oe_from_sv.scalar", cap=10000)
+def _(size):
+    R, V = _states(size)
+    return lambda: [calc_oe_from_sv(r, v) for r, v in zip(R, V)]
+
+
+@case("calc_oe_from_sv_batch")
+def _(size):
+    R, V = _states(size)
+    return lambda: calc_oe_from_sv_batch(R, V)
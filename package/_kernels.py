@@ -0,0 +1,151 @@
+"""Scalar kernels of the compiled backend
+
+Plain Python on floats and small float64 arrays, written in the subset Numba compiles in nopython mode.
+The operations follow the NumPy implementations in utility/orbital step by step, so both backends agree
+to rounding. Without Numba they still run (slowly) as Python, which is how the tests check them.
+"""
+import math
+import numpy as np
+from .utility import CONSTANT
+
+# Module level floats, Numba freezes globals as compile-time constants
+GM = CONSTANT.GM
+R_EARTH = CONSTANT.R
+PI = CONSTANT.PI
+
+# Called by the kernels, compiled first by backend.getKernel so nopython mode can call them
+HELPERS = ("_cross", "_dot", "_newtonR2")
+
+
+def keplerE(M, e, E0, repeated, alias):
+    """calEccentricAnomaly for scalars -> (E, iterations, converged)"""
+    counter = 0
+    while counter < repeated and abs(M + e * math.sin(E0) - E0) > alias:
+        E0 -= (E0 - e * math.sin(E0) - M) / (1 - e * math.cos(E0))
+        counter += 1
+    return E0, counter, abs(M + e * math.sin(E0) - E0) <= alias
+
+
+def vecInPQW(a, e, E):
+    """calVecInPQW for a scalar E"""
+    out = np.empty(3)
+    out[0] = a * math.cos(E) - a * e
+    out[1] = a * math.sqrt(1 - e**2) * math.sin(E)
+    out[2] = 0.0
+    return out
+
+
+def matECItoPQW(omega, i, sigma):
+    """getMatECItoPQW, RzO @ RxI @ RzS multiplied out"""
+    cosO, sinO = math.cos(omega), math.sin(omega)
+    cosI, sinI = math.cos(i), math.sin(i)
+    cosS, sinS = math.cos(sigma), math.sin(sigma)
+    mat = np.empty((3, 3))
+    mat[0, 0] = cosO * cosS - sinO * cosI * sinS
+    mat[0, 1] = cosO * sinS + sinO * cosI * cosS
+    mat[0, 2] = sinO * sinI
+    mat[1, 0] = -sinO * cosS - cosO * cosI * sinS
+    mat[1, 1] = -sinO * sinS + cosO * cosI * cosS
+    mat[1, 2] = cosO * sinI
+    mat[2, 0] = sinI * sinS
+    mat[2, 1] = -sinI * cosS
+    mat[2, 2] = cosI
+    return mat
+
+
+def eciFromLatLong(latitude, longtitude, gmst):
+    """toECIfromLatLong with the GMST [deg] of the time: Rie.T @ (x, y, z)"""
+    lat, lon = latitude * (PI / 180), longtitude * (PI / 180)
+    x = R_EARTH * math.cos(lat) * math.cos(lon)
+    y = R_EARTH * math.cos(lat) * math.sin(lon)
+    z = R_EARTH * math.sin(lat)
+    rad = PI * gmst / 180
+    cos, sin = math.cos(rad), math.sin(rad)
+    out = np.empty(3)
+    out[0] = cos * x - sin * y
+    out[1] = sin * x + cos * y
+    out[2] = z
+    return out
+
+
+def _cross(u, v):
+    out = np.empty(3)
+    out[0] = u[1] * v[2] - u[2] * v[1]
+    out[1] = u[2] * v[0] - u[0] * v[2]
+    out[2] = u[0] * v[1] - u[1] * v[0]
+    return out
+
+
+def _dot(u, v):
+    return u[0] * v[0] + u[1] * v[1] + u[2] * v[2]
+
+
+def _newtonR2(a, b, c, x, repeated, tol):
+    """_newtonR2 of orbital for one equation -> (r, iterations, converged)"""
+    counter = 0
+    converged = False
+    while counter < repeated:
+        x2 = x * x
+        x3 = x2 * x
+        fx = ((x2 + a) * x3 + b) * x3 + c
+        dx = x2 * ((8 * x2 + 6 * a) * x3 + 3 * b)
+        step = fx / dx
+        x_previous = x
+        x = x - step
+        counter += 1
+        if abs(step) <= tol * abs(x_previous):
+            converged = True
+            break
+    return x, counter, converged and x > 0
+
+
+def gaussCore(observers, directions, t1, t3, r0, repeated, tol):
+    """OrbitCalculate.calculate from the determinants to v2, r0 = nan for the default start
+    -> (r2, v2, |r2|, iterations, converged)
+    """
+    t = t3 - t1
+    P1 = _cross(directions[1], directions[2])
+    P2 = _cross(directions[0], directions[2])
+    P3 = _cross(directions[0], directions[1])
+    D0 = _dot(directions[0], P1)
+    D11, D21, D31 = _dot(observers[0], P1), _dot(observers[1], P1), _dot(observers[2], P1)
+    D12, D22, D32 = _dot(observers[0], P2), _dot(observers[1], P2), _dot(observers[2], P2)
+    D13, D23, D33 = _dot(observers[0], P3), _dot(observers[1], P3), _dot(observers[2], P3)
+
+    A = (-D12 * t3 / t + D22 + D32 * t1 / t) / D0
+    B = (-D12 * (t**2 - t3**2) * t3 / t + D32 * (t**2 - t1**2) * t1 / t) / 6 / D0
+    E = _dot(observers[1], directions[1])
+    a = -(A**2 + 2 * A * E + _dot(observers[1], observers[1]))
+    b = -2 * GM * B * (A + E)
+    c = -GM**2 * B**2
+
+    bound = 2 * max(max(math.sqrt(abs(a)), abs(b)**(1 / 5)), abs(c / 2)**(1 / 8))
+    if math.isnan(r0):
+        start = math.sqrt(abs(a)) if a < 0 else bound
+    else:
+        start = r0
+    r, iterations, converged = _newtonR2(a, b, c, start, repeated, tol)
+    if not converged:
+        r, retry, converged = _newtonR2(a, b, c, bound, repeated, tol)
+        iterations += retry
+
+    C1 = t3 * (1 + GM / 6 / r**3 * (t**2 - t3**2)) / t
+    C3 = -t1 * (1 + GM / 6 / r**3 * (t**2 - t1**2)) / t
+    mul_p1 = (-D11 + D21 / C1 - C3 * D31 / C1) / D0
+    mul_p2 = A + GM * B / r**3
+    mul_p3 = (-C1 * D13 / C3 + D23 / C3 - D33) / D0
+
+    f1 = 1 - GM * t1**2 / 2 / r**3
+    g1 = t1 - GM * t1**3 / 6 / r**3
+    f3 = 1 - GM * t3**2 / 2 / r**3
+    g3 = t3 - GM * t3**3 / 6 / r**3
+    denominator = f1 * g3 - f3 * g1
+
+    r2 = np.empty(3)
+    v2 = np.empty(3)
+    for k in range(3):
+        r1_k = observers[0, k] + mul_p1 * directions[0, k]
+        r2[k] = observers[1, k] + mul_p2 * directions[1, k]
+        r3_k = observers[2, k] + mul_p3 * directions[2, k]
+        v2[k] = (f1 * r3_k - f3 * r1_k) / denominator
+    return r2, v2, r, iterations, converged
@@ -0,0 +1,126 @@
+import numpy as np
+from datetime import datetime
+from typing import NamedTuple, Tuple
+from .utility import TypeOEArray, TypeLatLong, toECIfromLatLongBatch
+from .propagation import getPosInECI
+
+
+class TypeAssociations(NamedTuple):
+    """Matches of AssociationIndex.query, sorted by query and then by angle
+        - query: index of the measurement             (P,)
+        - satellite: index of the catalog object      (P,)
+        - angle: between measurement and prediction   (P,) [deg]
+    """
+    query: np.array
+    satellite: np.array
+    angle: np.array
+
+
+class AssociationIndex(object):
+    """Spatial index of the predicted look directions of a catalog, seen by one observer
+
+    Unit look vectors are hashed into a uniform grid of cubic cells over [-1, 1]^3 whose edge is the chord
+    of max_radius, so every object within max_radius of a measurement lies in the 27 cells around it.
+    The catalog is kept sorted by cell key; a query batch is answered with one searchsorted per
+    neighbouring cell and a dot product over the candidates.
+    update moves the index to a new time: the look vectors are repropagated and only objects that
+    changed cell are moved in the sorted order, a full rebuild happens when many of them did.
+    """
+
+    def __init__(self, OE: TypeOEArray, observer: TypeLatLong, time: datetime, dt: float = 0, max_radius: float = 1,
+                 rebuild_fraction: float = 0.1) -> None:
+        if not 0 < max_radius < 60:
+            raise ValueError("Max radius must be in (0, 60) degrees")
+        self.OE = OE
+        self.observer = observer
+        self.time = time
+        self.max_radius = max_radius
+        self.rebuild_fraction = rebuild_fraction
+        self._cell = 2 * np.sin(np.deg2rad(max_radius) / 2)
+        self._n = int(np.ceil(2 / self._cell)) + 1
+        self.rebuilds = 0
+        self._build(self.getLookVectors(dt))
+        self.dt = dt
+
+    def getLookVectors(self, dt: float) -> np.array:
+        """Unit vectors from the observer to every object dt seconds after time     (M, 3)"""
+        positions = getPosInECI(self.OE, np.full(len(self.OE), dt, dtype='float64'))
+        looks = positions - toECIfromLatLongBatch(self.observer, self.time, np.array([dt], dtype='float64'))
+        return looks / np.linalg.norm(looks, axis=1)[:, None]
+
+    def _getCells(self, vectors: np.array) -> np.array:
+        # Shifted by one, so the neighbours of every cell have indices in [0, n + 1]
+        return np.floor((vectors + 1) / self._cell).astype('int64') + 1
+
+    def _toKeys(self, cells: np.array) -> np.array:
+        base = self._n + 2
+        return (cells[..., 0] * base + cells[..., 1]) * base + cells[..., 2]
+
+    def _getKeys(self, vectors: np.array) -> np.array:
+        return self._toKeys(self._getCells(vectors))
+
+    def _build(self, looks: np.array) -> None:
+        self.looks = looks
+        keys = self._getKeys(looks)
+        self._order = np.argsort(keys, kind='stable')
+        self._sorted_keys = keys[self._order]
+        self._keys = keys
+        self.rebuilds += 1
+
+    def update(self, dt: float) -> int:
+        """Move the index to dt seconds after time, returns the number of objects that changed cell"""
+        looks = self.getLookVectors(dt)
+        keys = self._getKeys(looks)
+        moved = np.flatnonzero(keys != self._keys)
+        self.dt = dt
+        if len(moved) > self.rebuild_fraction * len(keys):
+            self._build(looks)
+            return len(moved)
+
+        # Remove the moved objects from the sorted order and insert them at their new keys
+        keep = ~np.isin(self._order, moved)
+        order, sorted_keys = self._order[keep], self._sorted_keys[keep]
+        moved = moved[np.argsort(keys[moved], kind='stable')]
+        new_keys = keys[moved]
+        at = np.searchsorted(sorted_keys, new_keys)
+        self._order = np.insert(order, at, moved)
+        self._sorted_keys = np.insert(sorted_keys, at, new_keys)
+        self._keys = keys
+        self.looks = looks
+        return len(moved)
+
+    def query(self, directions: np.array, radius: float) -> TypeAssociations:
+        """All objects within radius [deg] of every measured direction (K, 3)"""
+        if radius > self.max_radius:
+            raise ValueError("Radius must not exceed the max radius of the index")
+        directions = np.atleast_2d(np.asarray(directions, dtype='float64'))
+        directions = directions / np.linalg.norm(directions, axis=1)[:, None]
+
+        offsets = np.stack(np.meshgrid([-1, 0, 1], [-1, 0, 1], [-1, 0, 1], indexing='ij'), axis=-1).reshape(27, 3)
+        keys = self._toKeys(self._getCells(directions)[:, None, :] + offsets)     # (K, 27)
+        starts = np.searchsorted(self._sorted_keys, keys, side='left').ravel()
+        counts = np.searchsorted(self._sorted_keys, keys, side='right').ravel() - starts
+
+        # Candidates of every query: concatenated ranges [start, start + count)
+        total = counts.sum()
+        query = np.repeat(np.repeat(np.arange(len(directions)), 27), counts)
+        position = np.repeat(starts - np.cumsum(counts) + counts, counts) + np.arange(total)
+        satellite = self._order[position]
+
+        cos = np.einsum('ij,ij->i', directions[query], self.looks[satellite])
+        angle = np.rad2deg(np.arccos(np.clip(cos, -1, 1)))
+        inside = angle <= radius
+        query, satellite, angle = query[inside], satellite[inside], angle[inside]
+        order = np.lexsort((angle, query))
+        return TypeAssociations(query[order], satellite[order], angle[order])
+
+    def nearest(self, directions: np.array, radius: float) -> Tuple[np.array, np.array]:
+        """Closest object within radius [deg] of every measurement, index -1 and angle nan if there is none"""
+        directions = np.atleast_2d(directions)
+        matches = self.query(directions, radius)
+        index = np.full(len(directions), -1, dtype='int64')
+        angle = np.full(len(directions), np.nan)
+        first = np.unique(matches.query, return_index=True)[1]
+        index[matches.query[first]] = matches.satellite[first]
+        angle[matches.query[first]] = matches.angle[first]
+        return index, angle
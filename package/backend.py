@@ -0,0 +1,69 @@
+"""Runtime selection of the scalar kernels
+
+    setBackend("numba", cache=True)   # compiled kernels of _kernels, cached on disk
+    setBackend("numpy")               # the NumPy implementations (default)
+    setBackend("auto")                # numba if it is installed, else numpy
+
+The initial backend is read from the DOAN_BACKEND environment variable ("numpy" if unset).
+Kernels are compiled lazily on first use; with cache=True Numba stores them on disk (in __pycache__ or
+NUMBA_CACHE_DIR), so later processes load them instead of compiling and CLI startup stays fast.
+Every setBackend call drops the compiled kernels, they are compiled again with its cache flag on next use.
+"""
+import os
+import sys
+from typing import Callable, Dict
+
+try:
+    import numba
+except ImportError:
+    numba = None
+
+BACKENDS = ("numpy", "numba", "auto")
+_state = {"name": "numpy", "cache": False}
+_compiled: Dict[str, Callable] = {}
+
+
+def isNumbaAvailable() -> bool:
+    return numba is not None
+
+
+def setBackend(name: str = "auto", cache: bool = False) -> str:
+    """Select the backend, returns the resolved name"""
+    if name not in BACKENDS:
+        raise ValueError("Backend must be one of numpy, numba, auto")
+    if name == "auto":
+        name = "numba" if numba is not None else "numpy"
+    if name == "numba" and numba is None:
+        raise ImportError("Backend numba requires the numba package")
+    _compiled.clear()
+    # _kernels imports utility, which imports this module: only touch it once it is loaded
+    kernels = sys.modules.get(f"{__package__}._kernels")
+    for helper in getattr(kernels, "HELPERS", ()):
+        function = getattr(kernels, helper)
+        setattr(kernels, helper, getattr(function, "py_func", function))
+    _state.update(name=name, cache=cache)
+    return name
+
+
+def getBackend() -> str:
+    return _state["name"]
+
+
+def isCompiled() -> bool:
+    return _state["name"] == "numba"
+
+
+def getKernel(name: str) -> Callable:
+    """Compiled kernel of _kernels, compiled on first use"""
+    kernel = _compiled.get(name)
+    if kernel is None:
+        from . import _kernels
+        for helper in _kernels.HELPERS:
+            if not hasattr(getattr(_kernels, helper), "py_func"):
+                setattr(_kernels, helper, numba.njit(cache=_state["cache"])(getattr(_kernels, helper)))
+        kernel = _compiled[name] = numba.njit(cache=_state["cache"])(getattr(_kernels, name))
+    return kernel
+
+
+_name = os.environ.get("DOAN_BACKEND", "numpy")
+setBackend(_name if _name in BACKENDS else "numpy", cache=os.environ.get("DOAN_BACKEND_CACHE", "0") == "1")
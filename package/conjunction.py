@@ -0,0 +1,161 @@
+import numpy as np
+from typing import List, NamedTuple, Tuple
+from .utility import CONSTANT, OE_FIELDS, TypeOEArray
+from .propagation import getPosInECI, getStateInECI, propagateCatalog
+from .passes import _goldenSection
+from .tle import TypeTLECatalog
+
+
+class TypeConjunction(NamedTuple):
+    """A close approach between two satellites, primary < secondary
+    Times are seconds from the start of the screening window's time axis (the elements' epoch by default)
+    """
+    primary: int
+    secondary: int
+    tca: float              # time of closest approach [s]
+    miss_distance: float    # [km]
+    relative_speed: float   # [km/s]
+
+    def __repr__(self):
+        return f"Conjunction(primary={self.primary}, secondary={self.secondary}, tca={self.tca:.3f}, miss_distance={self.miss_distance:.3f}, relative_speed={self.relative_speed:.3f})"
+
+
+def calApsides(OE: TypeOEArray) -> Tuple[np.array, np.array]:
+    """Perigee and apogee radius of every satellite: a*(1 - e), a*(1 + e)     [km]"""
+    a, e = np.asarray(OE.semimajor_axis, dtype='float64'), np.asarray(OE.eccentricity, dtype='float64')
+    return a * (1 - e), a * (1 + e)
+
+
+def filterApsides(perigee: np.array, apogee: np.array, first: np.array, second: np.array, threshold: float) -> np.array:
+    """Mask of the pairs whose radial shells [perigee, apogee] come within threshold of each other,
+    the other pairs can never be closer than threshold
+    """
+    return np.maximum(perigee[first], perigee[second]) - np.minimum(apogee[first], apogee[second]) <= threshold
+
+
+# Cell offsets after (0, 0, 0) in the linear key order, every unordered pair of neighbouring cells is visited once
+_FORWARD = np.array([(dx, dy, dz) for dx in (-1, 0, 1) for dy in (-1, 0, 1) for dz in (-1, 0, 1) if (dx, dy, dz) > (0, 0, 0)])
+
+
+def findCloseObjects(positions: np.array, cell: float) -> Tuple[np.array, np.array]:
+    """Pairs (first < second) of points (M, 3) in the same or neighbouring cubic cells of edge cell,
+    every pair closer than cell is among them
+    """
+    cells = np.floor(positions / cell).astype('int64')
+    cells -= cells.min(axis=0) - 1
+    base = int(cells.max()) + 2
+    keys = (cells[:, 0] * base + cells[:, 1]) * base + cells[:, 2]
+    order = np.argsort(keys, kind='stable')
+    sorted_keys = keys[order]
+    M = len(keys)
+
+    # Same cell: every object with the objects after it in the sorted order
+    lower = np.arange(M) + 1
+    upper = np.searchsorted(sorted_keys, sorted_keys, side='right')
+    ranges = [(np.arange(M), lower, upper)]
+
+    # Forward neighbours: every object with the whole neighbouring cell
+    for offset in _FORWARD:
+        neighbour = sorted_keys + (offset[0] * base + offset[1]) * base + offset[2]
+        lower = np.searchsorted(sorted_keys, neighbour, side='left')
+        upper = np.searchsorted(sorted_keys, neighbour, side='right')
+        ranges.append((np.arange(M), lower, upper))
+
+    source, lower, upper = (np.concatenate(values) for values in zip(*ranges))
+    counts = np.maximum(upper - lower, 0)
+    total = counts.sum()
+    first = np.repeat(source, counts)
+    second = np.repeat(lower - np.cumsum(counts) + counts, counts) + np.arange(total)
+    first, second = order[first], order[second]
+    return np.minimum(first, second), np.maximum(first, second)
+
+
+def screenConjunctions(OE: TypeOEArray, start: float, end: float, step: float = 10, threshold: float = 5,
+                       offsets: np.array = None, tol: float = 1e-3, chunk_size: int = 64) -> List[TypeConjunction]:
+    """Find the close approaches below threshold between every pair of M satellites in [start, end]
+    Input:
+        - OE: orbital elements of M satellites                                   TypeOEArray
+        - start, end: screening window, seconds on the time axis                 [s]
+        - step: sampling step of the window                                      [s]
+        - threshold: miss distance of a conjunction                              [km]
+        - offsets: seconds from the elements' epochs to time 0 if they differ    (M,) [s]
+        - tol: time tolerance of the refined TCA                                 [s]
+        - chunk_size: timepoints propagated at once, bounds the memory to O(M * chunk_size)
+    Output:
+        - conjunctions ordered by primary, secondary and TCA
+    Two satellites at distance d < threshold at time t are at most threshold + (v1 + v2) * step / 2 apart
+    at the nearest sample, v being the speed at perigee. Positions of every sample are hashed into cubic
+    cells of that size, only pairs in neighbouring cells whose apogee/perigee shells overlap are compared.
+    The sampled local minima of the distance are then refined by golden-section search within one step.
+    """
+    if end <= start or step <= 0 or threshold <= 0 or tol <= 0:
+        raise ValueError("End must be after Start. Step, Threshold and Tol must be positive.")
+    if chunk_size <= 0:
+        raise ValueError("Chunk size must be positive")
+    M = len(OE)
+    offsets = np.zeros(M) if offsets is None else np.asarray(offsets, dtype='float64')
+    if offsets.shape != (M,):
+        raise ValueError(f"Offsets must be an array of shape {(M,)}")
+
+    dts = np.arange(start, end, step, dtype='float64')
+    dts = np.append(dts, end) if dts[-1] < end else dts
+
+    # Vis-viva at perigee bounds the speed along the orbit
+    perigee, apogee = calApsides(OE)
+    speed = np.sqrt(CONSTANT.GM * (2 / perigee - 1 / np.asarray(OE.semimajor_axis, dtype='float64')))
+    cell = threshold + speed.max() * step
+
+    # Sampled distances below the bound of their pair: (first, second, sample, distance)
+    samples = []
+    for chunk in range(0, len(dts), chunk_size):
+        times = dts[chunk:chunk + chunk_size]
+        positions = propagateCatalog(OE, offsets[:, None] + times)
+        for k in range(len(times)):
+            first, second = findCloseObjects(positions[:, k], cell)
+            keep = filterApsides(perigee, apogee, first, second, threshold)
+            first, second = first[keep], second[keep]
+            distance = np.linalg.norm(positions[first, k] - positions[second, k], axis=1)
+            keep = distance <= threshold + (speed[first] + speed[second]) * step / 2
+            samples.append((first[keep], second[keep], np.full(np.count_nonzero(keep), chunk + k), distance[keep]))
+    first, second, sample, distance = (np.concatenate(values) for values in zip(*samples))
+    if len(first) == 0:
+        return []
+
+    # Local minima of the sampled distance of every pair, the neighbours outside of the bound count as farther
+    order = np.lexsort((sample, second, first))
+    first, second, sample, distance = first[order], second[order], sample[order], distance[order]
+    same = (first[1:] == first[:-1]) & (second[1:] == second[:-1]) & (sample[1:] == sample[:-1] + 1)
+    previous = np.r_[np.inf, np.where(same, distance[:-1], np.inf)]
+    following = np.r_[np.where(same, distance[1:], np.inf), np.inf]
+    minimum = (distance < previous) & (distance <= following)
+    first, second, sample = first[minimum], second[minimum], sample[minimum]
+
+    def getDistance(first: np.array, second: np.array, t: np.array) -> np.array:
+        positions = getPosInECI(TypeOEArray(*(getattr(OE, name)[np.r_[first, second]] for name in OE_FIELDS)),
+                                np.r_[t + offsets[first], t + offsets[second]])
+        return np.linalg.norm(positions[:len(t)] - positions[len(t):], axis=1)
+
+    lower = np.maximum(dts[sample] - step, start)
+    upper = np.minimum(dts[sample] + step, end)
+    tca = _goldenSection(lambda first, second, t: -getDistance(first, second, t), first, second, lower, upper, tol)
+    miss = getDistance(first, second, tca)
+    close = miss < threshold
+    first, second, tca, miss = first[close], second[close], tca[close], miss[close]
+
+    satellites = np.r_[first, second]
+    _, velocities = getStateInECI(TypeOEArray(*(getattr(OE, name)[satellites] for name in OE_FIELDS)),
+                                  np.r_[tca, tca] + offsets[satellites])
+    relative_speed = np.linalg.norm(velocities[:len(tca)] - velocities[len(tca):], axis=1)
+    order = np.lexsort((tca, second, first))
+    return [TypeConjunction(*values) for values in zip(first[order].tolist(), second[order].tolist(), tca[order].tolist(),
+                                                       miss[order].tolist(), relative_speed[order].tolist())]
+
+
+def screenTLE(catalog: TypeTLECatalog, start, end, step: float = 10, threshold: float = 5, tol: float = 1e-3,
+              chunk_size: int = 64) -> List[TypeConjunction]:
+    """Conjunctions of a TLE catalog between the UTC datetime64 start and end, TCAs are seconds from start"""
+    start = np.datetime64(start, 'us')
+    offsets = (start - catalog.epochs) / np.timedelta64(1, 's')
+    duration = (np.datetime64(end, 'us') - start) / np.timedelta64(1, 's')
+    return screenConjunctions(catalog.OE, 0, duration, step=step, threshold=threshold, offsets=offsets, tol=tol,
+                              chunk_size=chunk_size)
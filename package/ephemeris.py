@@ -0,0 +1,179 @@
+"""Memory-mapped ephemeris files
+
+Layout of a file:
+    - header: HEADER_SIZE bytes, MAGIC followed by a JSON object padded with spaces
+      (epoch, source, satellites M, times N, byte offsets of the blocks below)
+    - times: seconds from the epoch                                 (N,)       float64
+    - states: x, y, z [km], vx, vy, vz [km/s] in ECI                (M, N, 6)  float64
+    - catalog_numbers: if given                                     (M,)       int64
+All numbers are little-endian, the readers take the offsets from the header. The states of one satellite are contiguous, so a lookup of a few
+satellites only pages in their records.
+"""
+import json
+import numpy as np
+from typing import Tuple
+from .utility import OE_FIELDS, TypeOEArray
+from .propagation import getStateInECI
+from .tle import TypeTLECatalog
+
+MAGIC = b"DOANEPH1"
+HEADER_SIZE = 4096
+RECORD_DTYPE = np.dtype('<f8')
+CATALOG_DTYPE = np.dtype('<i8')
+
+
+def _createFile(path: str, header: dict, size: int) -> None:
+    """Write the header and extend the file to size bytes (sparse where the system allows)"""
+    text = MAGIC + json.dumps(header).encode()
+    if len(text) > HEADER_SIZE:
+        raise ValueError(f"Header must be at most {HEADER_SIZE} bytes")
+    with open(path, "wb") as file:
+        file.write(text.ljust(HEADER_SIZE, b" "))
+        file.truncate(size)
+
+
+def writeEphemeris(path: str, OE: TypeOEArray, times: np.array, epoch=None, dts: np.array = None, source: str = "",
+                   catalog_numbers: np.array = None, chunk_size: int = 256, tol: float = 1e-12) -> "Ephemeris":
+    """Propagate M satellites to N times and stream the states into an ephemeris file
+    Input:
+        - OE: orbital elements of M satellites                                  TypeOEArray
+        - times: increasing seconds from epoch of the records                   (N,)   [s]
+        - epoch: datetime or datetime64 of times = 0, kept in the header
+        - dts: seconds from the elements' epochs if they differ from times      (M, N) [s]
+        - source: description of the elements (e.g. TLE file name)
+        - chunk_size: satellites propagated at once, bounds the memory to O(chunk_size * N)
+    Output: the written file opened as Ephemeris
+    """
+    times = np.asarray(times, dtype='float64')
+    M, N = len(OE), len(times)
+    if times.ndim != 1 or N < 2 or np.any(np.diff(times) <= 0):
+        raise ValueError("Times must be an increasing array of at least 2 timepoints")
+    if dts is not None and np.shape(dts) != (M, N):
+        raise ValueError(f"Dts must be an array of shape {(M, N)}")
+    if chunk_size <= 0:
+        raise ValueError("Chunk size must be positive")
+
+    if catalog_numbers is not None and np.shape(catalog_numbers) != (M,):
+        raise ValueError(f"Catalog numbers must be an array of shape {(M,)}")
+
+    # Calculate the byte offsets of the blocks, the catalog numbers are binary so the header stays small for any M
+    offsets = {"times": HEADER_SIZE, "states": HEADER_SIZE + N * RECORD_DTYPE.itemsize}
+    size = offsets["states"] + M * N * 6 * RECORD_DTYPE.itemsize
+    offsets["catalog_numbers"] = None if catalog_numbers is None else size
+    size += 0 if catalog_numbers is None else M * CATALOG_DTYPE.itemsize
+
+    header = {"version": 2, "epoch": None if epoch is None else str(np.datetime64(epoch, 'us')), "source": source,
+              "satellites": M, "times": N, "offsets": offsets}
+    _createFile(path, header, size)
+    np.memmap(path, dtype=RECORD_DTYPE, mode="r+", offset=offsets["times"], shape=(N,))[:] = times
+    if catalog_numbers is not None:
+        np.memmap(path, dtype=CATALOG_DTYPE, mode="r+", offset=offsets["catalog_numbers"], shape=(M,))[:] = catalog_numbers
+
+    states = np.memmap(path, dtype=RECORD_DTYPE, mode="r+", offset=offsets["states"], shape=(M, N, 6))
+    for start in range(0, M, chunk_size):
+        end = min(start + chunk_size, M)
+        chunk = OE[start:end]
+        columns = TypeOEArray(*(getattr(chunk, name)[:, None] for name in OE_FIELDS))
+        positions, velocities = getStateInECI(columns, times if dts is None else np.asarray(dts, dtype='float64')[start:end], tol=tol)
+        states[start:end, :, :3] = positions
+        states[start:end, :, 3:] = velocities
+    states.flush()
+    del states
+    return Ephemeris(path)
+
+
+def writeTLEEphemeris(path: str, catalog: TypeTLECatalog, times: np.array, source: str = "", chunk_size: int = 256) -> "Ephemeris":
+    """Ephemeris of a TLE catalog at the UTC datetime64 times (N,), the epoch of the file is times[0]"""
+    times = np.asarray(times, dtype='datetime64[us]')
+    seconds = (times - times[0]) / np.timedelta64(1, 's')
+    dts = (times[None, :] - catalog.epochs[:, None]) / np.timedelta64(1, 's')
+    return writeEphemeris(path, catalog.OE, seconds, epoch=times[0], dts=dts, source=source,
+                          catalog_numbers=catalog.catalog_numbers, chunk_size=chunk_size)
+
+
+class Ephemeris(object):
+    """Read-only view of an ephemeris file, the records stay on disk as np.memmap
+
+        ephemeris = Ephemeris(path)
+        positions, velocities = ephemeris.interpolate([0, 5], [120.5, 3600.25])
+    """
+
+    def __init__(self, path: str) -> None:
+        with open(path, "rb") as file:
+            text = file.read(HEADER_SIZE)
+        if not text.startswith(MAGIC):
+            raise ValueError(f"{path} is not an ephemeris file")
+        self.header = json.loads(text[len(MAGIC):].decode())
+        self.path = path
+        M, N, offsets = self.header["satellites"], self.header["times"], self.header["offsets"]
+        self.times = np.memmap(path, dtype=RECORD_DTYPE, mode="r", offset=offsets["times"], shape=(N,))
+        self.states = np.memmap(path, dtype=RECORD_DTYPE, mode="r", offset=offsets["states"], shape=(M, N, 6))
+        self.catalog_numbers = None if offsets["catalog_numbers"] is None else \
+            np.memmap(path, dtype=CATALOG_DTYPE, mode="r", offset=offsets["catalog_numbers"], shape=(M,))
+
+    @property
+    def epoch(self) -> np.datetime64:
+        return None if self.header["epoch"] is None else np.datetime64(self.header["epoch"])
+
+    @property
+    def source(self) -> str:
+        return self.header["source"]
+
+    def __len__(self) -> int:
+        return self.header["satellites"]
+
+    def __repr__(self):
+        return f"Ephemeris(satellites: {len(self)}, times: {len(self.times)}, epoch: {self.header['epoch']}, source: {self.source})"
+
+    def toSeconds(self, time) -> np.array:
+        """datetime/datetime64 times to seconds from the epoch of the file"""
+        return (np.asarray(time, dtype='datetime64[us]') - self.epoch) / np.timedelta64(1, 's')
+
+    def interpolate(self, satellites: np.array, t: np.array, method: str = "hermite", order: int = 8) -> Tuple[np.array, np.array]:
+        """States of satellites at seconds t from the epoch, satellites and t are broadcast together
+        Input:
+            - method: "hermite", cubic Hermite on the positions and velocities of the bracketing records,
+                      or "lagrange", Lagrange polynomials through order records around t
+        Output:
+            - positions, velocities of shape broadcast(satellites, t) + (3,) [km], [km/s]
+        """
+        if method not in ("hermite", "lagrange"):
+            raise ValueError("Method must be hermite or lagrange")
+        satellites, t = np.broadcast_arrays(np.asarray(satellites, dtype='int64'), np.asarray(t, dtype='float64'))
+        shape = t.shape
+        satellites, t = satellites.ravel(), t.ravel()
+        times = np.asarray(self.times)
+        N = len(times)
+        if np.any((t < times[0]) | (t > times[-1])):
+            raise ValueError("Times must be within the ephemeris")
+        if np.any((satellites < 0) | (satellites >= len(self))):
+            raise ValueError("Satellites must be indices of the ephemeris")
+
+        # Index of the record at or before t, the last interval includes its end
+        j = np.clip(np.searchsorted(times, t, side="right") - 1, 0, N - 2)
+
+        if method == "hermite":
+            t0, t1 = times[j], times[j + 1]
+            h = t1 - t0
+            s = ((t - t0) / h)[:, None]
+            first, second = self.states[satellites, j], self.states[satellites, j + 1]
+            p0, v0, p1, v1 = first[:, :3], first[:, 3:] * h[:, None], second[:, :3], second[:, 3:] * h[:, None]
+            s2, s3 = s * s, s * s * s
+            positions = (2 * s3 - 3 * s2 + 1) * p0 + (s3 - 2 * s2 + s) * v0 + (-2 * s3 + 3 * s2) * p1 + (s3 - s2) * v1
+            velocities = ((6 * s2 - 6 * s) * p0 + (3 * s2 - 4 * s + 1) * v0 + (-6 * s2 + 6 * s) * p1 + (3 * s2 - 2 * s) * v1) / h[:, None]
+        else:
+            order = min(order, N)
+            start = np.clip(j - order // 2 + 1, 0, N - order)
+            index = start[:, None] + np.arange(order)
+            nodes = times[index]
+            # Lagrange basis weights w_k = prod_{m != k} (t - t_m) / (t_k - t_m)      (K, order)
+            difference = t[:, None] - nodes
+            weights = np.ones(index.shape)
+            for k in range(order):
+                for m in range(order):
+                    if m != k:
+                        weights[:, k] *= difference[:, m] / (nodes[:, k] - nodes[:, m])
+            window = self.states[satellites[:, None], index]
+            state = np.einsum('kn,knc->kc', weights, window)
+            positions, velocities = state[:, :3], state[:, 3:]
+        return positions.reshape(shape + (3,)), velocities.reshape(shape + (3,))
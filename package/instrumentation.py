@@ -0,0 +1,156 @@
+"""Opt-in instrumentation of the hot paths
+
+    with instrument() as metrics:
+        orbit.calculate(time_points)
+    print(metrics.toDict())
+    print(metrics.toPrometheus())
+
+Outside of instrument() every hook is a flag check returning a shared no-op, the solvers are not slowed down.
+The active Metrics is a context variable: a block collects only its own thread or asyncio task (and the tasks
+started from it), blocks in other threads or nested blocks do not see each other's stages and counts.
+Stages: precalculate, determinants, root_solve, velocity, refine, element_conversion
+Counters: <solver>.calls, <solver>.iterations, <solver>.not_converged for kepler, r2_root and refine
+"""
+import functools
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Dict, Iterator, List, Optional
+import numpy as np
+
+# Upper bounds of the stage duration histogram [s]
+BUCKETS = (1e-6, 1e-5, 1e-4, 1e-3, 1e-2, 1e-1, 1, 10, float("inf"))
+
+
+class _NullStage(object):
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        return False
+
+
+_NULL_STAGE = _NullStage()
+
+
+class _Stage(object):
+    __slots__ = ("_metrics", "_name", "_start")
+
+    def __init__(self, metrics: "Metrics", name: str) -> None:
+        self._metrics = metrics
+        self._name = name
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *args):
+        self._metrics.observe(self._name, time.perf_counter() - self._start)
+        return False
+
+
+class Metrics(object):
+    """Stage timers (count, sum, max, histogram over BUCKETS) and counters of one instrument() block"""
+
+    def __init__(self, callback: Optional[Callable[[str, float], None]] = None) -> None:
+        self.timers: Dict[str, List] = {}
+        self.counters: Dict[str, float] = {}
+        self.callback = callback
+
+    def observe(self, name: str, seconds: float) -> None:
+        timer = self.timers.get(name)
+        if timer is None:
+            timer = self.timers[name] = [0, 0.0, 0.0, [0] * len(BUCKETS)]
+        timer[0] += 1
+        timer[1] += seconds
+        timer[2] = max(timer[2], seconds)
+        timer[3][next(k for k, bound in enumerate(BUCKETS) if seconds <= bound)] += 1
+        if self.callback is not None:
+            self.callback(name, seconds)
+
+    def count(self, name: str, value: float = 1) -> None:
+        self.counters[name] = self.counters.get(name, 0) + value
+
+    def toDict(self) -> dict:
+        return {"stages": {name: {"count": count, "sum": total, "max": longest, "mean": total / count}
+                           for name, (count, total, longest, _) in self.timers.items()},
+                "counters": dict(self.counters)}
+
+    def toPrometheus(self, prefix: str = "doan") -> str:
+        """Snapshot in the Prometheus text exposition format"""
+        lines = [f"# TYPE {prefix}_stage_seconds histogram"]
+        for name, (count, total, _, buckets) in self.timers.items():
+            cumulative = np.cumsum(buckets)
+            for bound, value in zip(BUCKETS, cumulative):
+                le = "+Inf" if bound == float("inf") else f"{bound:g}"
+                lines.append(f'{prefix}_stage_seconds_bucket{{stage="{name}",le="{le}"}} {value}')
+            lines.append(f'{prefix}_stage_seconds_sum{{stage="{name}"}} {total!r}')
+            lines.append(f'{prefix}_stage_seconds_count{{stage="{name}"}} {count}')
+        lines.append(f"# TYPE {prefix}_stage_seconds_max gauge")
+        for name, (_, _, longest, _) in self.timers.items():
+            lines.append(f'{prefix}_stage_seconds_max{{stage="{name}"}} {longest!r}')
+        lines.append(f"# TYPE {prefix}_events_total counter")
+        for name, value in self.counters.items():
+            lines.append(f'{prefix}_events_total{{name="{name}"}} {value:g}')
+        return "\n".join(lines) + "\n"
+
+
+# Metrics of the innermost instrument() block of the current context, None when disabled
+_active: ContextVar[Optional[Metrics]] = ContextVar("doan_metrics", default=None)
+
+
+def isEnabled() -> bool:
+    return _active.get() is not None
+
+
+def stage(name: str):
+    """Context manager timing a stage into the active Metrics"""
+    metrics = _active.get()
+    if metrics is None:
+        return _NULL_STAGE
+    return _Stage(metrics, name)
+
+
+def timed(name: str):
+    """Decorator timing every call of a function as stage name"""
+    def decorator(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            metrics = _active.get()
+            if metrics is None:
+                return function(*args, **kwargs)
+            with _Stage(metrics, name):
+                return function(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def count(name: str, value: float = 1) -> None:
+    metrics = _active.get()
+    if metrics is not None:
+        metrics.count(name, value)
+
+
+def countSolver(name: str, iterations, converged) -> None:
+    """Calls, total iterations and non-converged solves of a solver, scalars or arrays"""
+    metrics = _active.get()
+    if metrics is not None:
+        converged = np.asarray(converged)
+        metrics.count(f"{name}.calls", converged.size)
+        metrics.count(f"{name}.iterations", int(np.sum(iterations)))
+        metrics.count(f"{name}.not_converged", int(converged.size - np.count_nonzero(converged)))
+
+
+@contextmanager
+def instrument(callback: Optional[Callable[[str, float], None]] = None, metrics: Metrics = None) -> Iterator[Metrics]:
+    """Enable the hooks inside the block, collecting into metrics (a new Metrics if None)
+    callback(stage, seconds) is called at the end of every stage
+    """
+    metrics = Metrics(callback) if metrics is None else metrics
+    token = _active.set(metrics)
+    try:
+        yield metrics
+    finally:
+        _active.reset(token)
@@ -0,0 +1,130 @@
+import numpy as np
+from typing import NamedTuple, Tuple
+from .utility import getTangentBasis
+from .orbital import OrbitCalculate
+from .refine import calLagrangeCoefficients
+
+
+class TypeOrbitFit(NamedTuple):
+    """Result of fitOrbit
+        - r, v: fitted state at the epoch                           (3,)   [km], [km/s]
+        - epoch: time of the state                                         [s]
+        - covariance: of (r, v)                                     (6, 6)
+        - residuals: angles between measured and fitted directions  (N, 2) [rad]
+        - rms: root mean square of the residuals                           [rad]
+        - iterations: Levenberg-Marquardt iterations
+        - converged: relative state step below tol
+    """
+    r: np.array
+    v: np.array
+    epoch: float
+    covariance: np.array
+    residuals: np.array
+    rms: float
+    iterations: int
+    converged: bool
+
+
+def calPositions(states: np.array, dts: np.array) -> np.array:
+    """Two-body positions of states (M, 6) [km], [km/s] after dts (N,) [s] -> (M, N, 3), universal variables"""
+    M, N = len(states), len(dts)
+    R = np.repeat(states[:, :3], N, axis=0)
+    V = np.repeat(states[:, 3:], N, axis=0)
+    f, g = calLagrangeCoefficients(R, V, np.tile(dts, M))
+    return (f[:, None] * R + g[:, None] * V).reshape(M, N, 3)
+
+
+def _calResiduals(states: np.array, observers: np.array, dts: np.array, u: np.array, w: np.array) -> np.array:
+    """Angular residuals (M, 2N) of the directions predicted from states (M, 6) against the measured ones"""
+    lines = calPositions(states, dts) - observers
+    lines /= np.linalg.norm(lines, axis=-1)[..., None]
+    # Components along the tangent axes of the measured direction: small angles of measured -> predicted
+    return np.stack([np.sum(lines * u, axis=-1), np.sum(lines * w, axis=-1)], axis=-1).reshape(len(states), -1)
+
+
+def fitOrbit(observers: np.array, directions: np.array, times: np.array, r0: np.array = None, v0: np.array = None, epoch: float = None,
+             sigma: float = None, repeated: int = 30, tol: float = 1e-10, damping: float = 1e-3) -> TypeOrbitFit:
+    """Batch least-squares (Levenberg-Marquardt) fit of a two-body state to N angle observations
+    Input:
+        - observers: observers' positions in ECI            (N, 3) [km]
+        - directions: observer to satellite                 (N, 3) [ ]
+        - times: times of the observations                  (N,)   [s]
+        - r0, v0: initial state at epoch, if None: Gauss's method (OrbitCalculate.calculateBatch) on the
+                  first, middle and last observations, refined, at the middle time
+        - sigma: standard deviation of the angle measurements [rad], if None it is estimated from the residuals
+        - repeated: iteration budget, tol: relative state step to stop, damping: initial LM parameter
+    Output: TypeOrbitFit
+
+    Residuals are the two small angles between every measured and predicted direction. The Jacobian is
+    built from central differences, the 13 perturbed states are propagated in one vectorized call.
+    """
+    if (repeated < 0 or tol < 0 or damping < 0):
+        raise ValueError("Repeated must be int. Repeated, Tol and Damping must be positive.")
+
+    observers = np.asarray(observers, dtype='float64')
+    directions = np.asarray(directions, dtype='float64')
+    directions = directions / np.linalg.norm(directions, axis=1)[:, None]
+    times = np.asarray(times, dtype='float64')
+    N = len(times)
+    if N < 3 or observers.shape != (N, 3) or directions.shape != (N, 3):
+        raise ValueError("Observers and Directions must be arrays of shape (N, 3) with N >= 3, Times of shape (N,)")
+
+    if r0 is None or v0 is None:
+        triplet = np.array([0, N // 2, N - 1])
+        r2, v2 = OrbitCalculate.calculateBatch(observers[triplet][None], directions[triplet][None], times[triplet][None], refine=50)
+        state, epoch = np.concatenate([r2[0], v2[0]]), times[N // 2]
+    else:
+        state = np.concatenate([np.asarray(r0, dtype='float64'), np.asarray(v0, dtype='float64')])
+        epoch = times[N // 2] if epoch is None else epoch
+
+    dts = times - epoch
+    u, w = getTangentBasis(directions)
+
+    def evaluate(state: np.array) -> Tuple[np.array, np.array]:
+        # Nominal state and +/- steps of every component in one batch
+        step = np.concatenate([np.full(3, 1e-7 * np.linalg.norm(state[:3])), np.full(3, 1e-7 * np.linalg.norm(state[3:]))])
+        states = np.concatenate([state[None], state + np.diag(step), state - np.diag(step)])
+        residuals = _calResiduals(states, observers, dts, u, w)
+        jacobian = ((residuals[1:7] - residuals[7:]) / (2 * step[:, None])).T
+        return residuals[0], jacobian
+
+    residual, jacobian = evaluate(state)
+    cost = residual @ residual
+    converged = False
+    stalled = False
+    iterations = 0
+    while (iterations < repeated and not converged and not stalled):
+        iterations += 1
+        normal = jacobian.T @ jacobian
+        gradient = jacobian.T @ residual
+        while True:
+            with np.errstate(all='ignore'):
+                delta = np.linalg.solve(normal + damping * np.diag(np.diag(normal)), -gradient)
+                trial = state + delta
+                trial_residual = _calResiduals(trial[None], observers, dts, u, w)[0]
+            trial_cost = trial_residual @ trial_residual
+            if np.isfinite(trial_cost) and trial_cost <= cost:
+                damping = max(damping / 10, 1e-12)
+                break
+            damping *= 10
+            if damping > 1e12:
+                # No step lowers the cost: keep the state, the fit did not converge
+                stalled = True
+                break
+        if stalled:
+            break
+
+        converged = bool(np.all(np.abs(delta) <= tol * np.abs(np.concatenate([np.full(3, np.linalg.norm(state[:3])),
+                                                                                  np.full(3, np.linalg.norm(state[3:]))]))))
+        state = trial
+        residual, jacobian = evaluate(state)
+        cost = residual @ residual
+
+    # Without sigma, the measurement variance is estimated from the residuals
+    weight = 1 / sigma**2 if sigma is not None else max(2 * N - 6, 1) / max(cost, np.finfo(float).tiny)
+    if np.all(np.isfinite(jacobian)):
+        covariance = np.linalg.pinv(weight * jacobian.T @ jacobian)
+    else:
+        covariance = np.full((6, 6), np.nan)
+    residuals = residual.reshape(N, 2)
+    return TypeOrbitFit(state[:3], state[3:], epoch, covariance, residuals, float(np.sqrt(cost / (2 * N))), iterations, converged)
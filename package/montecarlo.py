@@ -0,0 +1,173 @@
+import numpy as np
+from typing import Dict, NamedTuple
+from .utility import getDiffAngle, getTangentBasis
+from .orbital import OrbitCalculate
+
+
+class StreamingStats(object):
+    """Statistics of a stream of samples, scalar (n,) or vector (n, d) batches, with memory independent of the stream length
+        - count, mean, covariance, min, max: exact, batches are merged with Chan's parallel algorithm
+        - percentile: from a uniform reservoir sample of reservoir_size samples (Algorithm R)
+    """
+
+    def __init__(self, reservoir_size: int = 10000, seed=None) -> None:
+        self.count = 0
+        self._mean = None
+        self._comoment = None
+        self._min = None
+        self._max = None
+        self._reservoir = None
+        self._reservoir_size = reservoir_size
+        self._rng = np.random.default_rng(seed)
+        self._scalar = None
+
+    def update(self, values: np.array) -> None:
+        values = np.asarray(values, dtype='float64')
+        if self._scalar is None:
+            self._scalar = values.ndim == 1
+        values = values.reshape(len(values), -1)
+        n = len(values)
+        if n == 0:
+            return
+
+        mean = values.mean(axis=0)
+        centered = values - mean
+        comoment = centered.T @ centered
+        if self.count == 0:
+            self._mean, self._comoment = mean, comoment
+            self._min, self._max = values.min(axis=0), values.max(axis=0)
+            self._reservoir = np.empty((self._reservoir_size, values.shape[1]))
+        else:
+            total = self.count + n
+            delta = mean - self._mean
+            self._mean = self._mean + delta * n / total
+            self._comoment = self._comoment + comoment + np.outer(delta, delta) * self.count * n / total
+            self._min, self._max = np.minimum(self._min, values.min(axis=0)), np.maximum(self._max, values.max(axis=0))
+
+        # Reservoir: fill, then keep the k-th sample with probability size / (k + 1)
+        filled = max(0, min(self._reservoir_size - self.count, n))
+        self._reservoir[self.count:self.count + filled] = values[:filled]
+        if filled < n:
+            seen = self.count + np.arange(filled, n)
+            slots = self._rng.integers(0, seen + 1)
+            keep = slots < self._reservoir_size
+            self._reservoir[slots[keep]] = values[filled:][keep]
+        self.count += n
+
+    def _shape(self, value: np.array):
+        return value[0] if self._scalar else value
+
+    @property
+    def mean(self):
+        return self._shape(self._mean)
+
+    @property
+    def covariance(self) -> np.array:
+        return self._comoment / (self.count - 1) if self.count > 1 else np.full_like(self._comoment, np.nan)
+
+    @property
+    def variance(self):
+        return self._shape(np.diag(self.covariance))
+
+    @property
+    def std(self):
+        return np.sqrt(self.variance)
+
+    @property
+    def min(self):
+        return self._shape(self._min)
+
+    @property
+    def max(self):
+        return self._shape(self._max)
+
+    def percentile(self, q):
+        sample = self._reservoir[:min(self.count, self._reservoir_size)]
+        result = np.percentile(sample, q, axis=0)
+        return result[..., 0][()] if self._scalar else result
+
+    def toDict(self, percentiles=(50, 90, 99)) -> dict:
+        return {"count": self.count, "mean": self.mean, "std": self.std, "min": self.min, "max": self.max,
+                **{f"p{q}": self.percentile(q) for q in percentiles}}
+
+    def __repr__(self):
+        return f"StreamingStats(count: {self.count}, mean: {self.mean}, std: {self.std})"
+
+
+class TypeNoise(NamedTuple):
+    """Measurement noise of runMonteCarlo, standard deviations for "gaussian", half-widths for "uniform"
+        - observer: error of every observer position axis      [km]
+        - angle: error of every direction, per tangent axis     [rad]
+        - time: error of every timestamp                        [s]
+    """
+    observer: float = 0
+    angle: float = 0
+    time: float = 0
+    distribution: str = "gaussian"
+
+
+def _draw(rng, distribution: str, scale: float, shape) -> np.array:
+    if scale == 0:
+        return np.zeros(shape)
+    if distribution == "gaussian":
+        return rng.normal(0, scale, shape)
+    if distribution == "uniform":
+        return rng.uniform(-scale, scale, shape)
+    raise ValueError("Distribution must be gaussian or uniform")
+
+
+def perturbDirections(directions: np.array, angles: np.array) -> np.array:
+    """Tilt unit directions (..., 3) by small angles (..., 2) [rad] along two axes perpendicular to them"""
+    u, w = getTangentBasis(directions)
+    tilted = directions + angles[..., 0:1] * u + angles[..., 1:2] * w
+    return tilted / np.linalg.norm(tilted, axis=-1)[..., None]
+
+
+def runMonteCarlo(observers: np.array, directions: np.array, time_points: np.array, r2_true: np.array, v2_true: np.array, noise: TypeNoise,
+                  trials: int, batch_size: int = 100000, seed=None, refine: int = 0, reservoir_size: int = 10000) -> Dict[str, StreamingStats]:
+    """Error statistics of Gauss's method under measurement noise
+    Input:
+        - observers, directions: noise-free observation triplet     (3, 3) [km], [ ]
+        - time_points: times of the observations                    (3,)   [s]
+        - r2_true, v2_true: true state at time_points[1]            (3,)   [km], [km/s]
+        - noise: TypeNoise
+        - trials: number of noisy triplets, solved batch_size at a time with OrbitCalculate.calculateBatch
+        - refine: refineGauss iterations of every solution
+    Output: StreamingStats of
+        - "position": |r2 - r2_true| [km], "velocity": |v2 - v2_true| [km/s]
+        - "position_angle", "velocity_angle": getDiffAngle of r2, v2 against the truth [deg]
+        - "state": (r2, v2) - (r2_true, v2_true), whose covariance is the 6x6 state error covariance
+    Memory does not grow with trials.
+    """
+    if trials <= 0 or batch_size <= 0:
+        raise ValueError("Trials and Batch size must be positive")
+
+    rng = np.random.default_rng(seed)
+    observers = np.asarray(observers, dtype='float64')
+    directions = np.asarray(directions, dtype='float64')
+    directions = directions / np.linalg.norm(directions, axis=-1)[..., None]
+    time_points = np.asarray(time_points, dtype='float64')
+    r2_true, v2_true = np.asarray(r2_true, dtype='float64'), np.asarray(v2_true, dtype='float64')
+    state_true = np.concatenate([r2_true, v2_true])
+    r2_unit, v2_unit = r2_true / np.linalg.norm(r2_true), v2_true / np.linalg.norm(v2_true)
+
+    names = ("position", "velocity", "position_angle", "velocity_angle", "state")
+    stats = {name: StreamingStats(reservoir_size, seed=rng.integers(2**32)) for name in names}
+
+    done = 0
+    while done < trials:
+        n = min(batch_size, trials - done)
+        noisy_observers = observers + _draw(rng, noise.distribution, noise.observer, (n, 3, 3))
+        noisy_directions = perturbDirections(np.broadcast_to(directions, (n, 3, 3)), _draw(rng, noise.distribution, noise.angle, (n, 3, 2)))
+        noisy_times = time_points + _draw(rng, noise.distribution, noise.time, (n, 3))
+
+        r2, v2 = OrbitCalculate.calculateBatch(noisy_observers, noisy_directions, noisy_times, refine=refine)
+        state = np.concatenate([r2, v2], axis=1) - state_true
+
+        stats["position"].update(np.linalg.norm(state[:, :3], axis=1))
+        stats["velocity"].update(np.linalg.norm(state[:, 3:], axis=1))
+        stats["position_angle"].update(getDiffAngle(r2 / np.linalg.norm(r2, axis=1)[:, None], r2_unit))
+        stats["velocity_angle"].update(getDiffAngle(v2 / np.linalg.norm(v2, axis=1)[:, None], v2_unit))
+        stats["state"].update(state)
+        done += n
+    return stats
@@ -0,0 +1,105 @@
+import numpy as np
+from typing import NamedTuple, Sequence
+from .utility import CONSTANT, TypeLatLong, getGMSTArray, getRieArray
+
+# WGS84 ellipsoid: equatorial radius [km] and flattening
+WGS84_A = 6378.137
+WGS84_F = 1 / 298.257223563
+WGS84_E2 = WGS84_F * (2 - WGS84_F)
+
+
+class TypeLineOfSight(NamedTuple):
+    """Lines of sight from the stations to satellites, shape (K, N) or (K, M, N) for K stations, M satellites, N timepoints
+        - directions: unit vectors in ECI       (..., 3)
+        - ranges: distances                     (...)  [km]
+        - elevations: above the local horizon   (...)  [deg]
+    """
+    directions: np.array
+    ranges: np.array
+    elevations: np.array
+
+
+class StationNetwork(object):
+    """K ground stations kept as arrays, ECEF coordinates and local vertical are calculated once
+
+        network = StationNetwork([21.0, 10.8], [105.8, 106.7], altitude=[0.02, 0.01], ellipsoid=True)
+        positions = network.getPositions(time, dts)                         # (K, N, 3)
+        sight = network.getLineOfSight(satellite_positions, time, dts)      # (N, 3) or (M, N, 3) satellites
+
+    The ECEF -> ECI rotation of a timepoint is shared by every station: GMST and Rie are evaluated once per
+    timepoint for the whole network. Without ellipsoid the Earth is the sphere of radius CONSTANT.R used by
+    toECIfromLatLong, with it the coordinates are geodetic on WGS84.
+    """
+
+    def __init__(self, latitude: np.array, longtitude: np.array, altitude: np.array = 0, names: Sequence[str] = None,
+                 ellipsoid: bool = False) -> None:
+        latitude, longtitude, altitude = np.broadcast_arrays(*(np.atleast_1d(np.asarray(value, dtype='float64'))
+                                                               for value in (latitude, longtitude, altitude)))
+        if latitude.ndim != 1:
+            raise ValueError("Latitude, Longtitude and Altitude must be 1D arrays")
+        if np.any(np.abs(latitude) > 90):
+            raise ValueError("Latitude must be in [-90, 90] degrees")
+        if names is not None and len(names) != len(latitude):
+            raise ValueError("Names must have one name per station")
+        self.latitude, self.longtitude, self.altitude = latitude.copy(), longtitude.copy(), altitude.copy()
+        self.names = None if names is None else list(names)
+        self.ellipsoid = ellipsoid
+
+        # Calculate ECEF coordinates and the local vertical (normal of the ellipsoid or the sphere)
+        phi, lam = np.deg2rad(self.latitude), np.deg2rad(self.longtitude)
+        self.up = np.stack([np.cos(phi) * np.cos(lam), np.cos(phi) * np.sin(lam), np.sin(phi)], axis=-1)
+        if ellipsoid:
+            N = WGS84_A / np.sqrt(1 - WGS84_E2 * np.sin(phi)**2)
+            self.ecef = np.stack([(N + self.altitude) * np.cos(phi) * np.cos(lam), (N + self.altitude) * np.cos(phi) * np.sin(lam),
+                                  (N * (1 - WGS84_E2) + self.altitude) * np.sin(phi)], axis=-1)
+        else:
+            self.ecef = (CONSTANT.R + self.altitude)[:, None] * self.up
+
+    @classmethod
+    def fromLatLongs(cls, observers: Sequence[TypeLatLong], altitude: np.array = 0, names: Sequence[str] = None,
+                     ellipsoid: bool = False) -> "StationNetwork":
+        return cls([observer.latitude for observer in observers], [observer.longtitude for observer in observers],
+                   altitude=altitude, names=names, ellipsoid=ellipsoid)
+
+    def __len__(self) -> int:
+        return len(self.latitude)
+
+    def __getitem__(self, index: int) -> TypeLatLong:
+        """Station index as the TypeLatLong observer of Simulation (altitude and ellipsoid are dropped)"""
+        return TypeLatLong(float(self.latitude[index]), float(self.longtitude[index]))
+
+    def __repr__(self):
+        return f"StationNetwork(stations: {len(self)}, ellipsoid: {self.ellipsoid})"
+
+    @staticmethod
+    def _rotate(Rie: np.array, vectors: np.array) -> np.array:
+        # Rie.T @ vector for every (station, timepoint): (N, 3, 3), (K, 3) -> (K, N, 3), one BLAS product (K, 3) x (3, N * 3)
+        return np.tensordot(vectors, Rie, axes=([1], [1]))
+
+    def getPositions(self, time, dts: np.array = None) -> np.array:
+        """ECI positions of every station, arguments as getGMSTArray        (K, N, 3) [km]"""
+        return self._rotate(getRieArray(np.atleast_1d(getGMSTArray(time, dts))), self.ecef)
+
+    def getLineOfSight(self, satellites: np.array, time, dts: np.array = None) -> TypeLineOfSight:
+        """Lines of sight from every station to satellites in ECI at the timepoints of time/dts
+        Input:
+            - satellites: positions of one satellite (N, 3) or of M satellites (M, N, 3)     [km]
+        Output:
+            - TypeLineOfSight of shape (K, N) or (K, M, N)
+        """
+        satellites = np.asarray(satellites, dtype='float64')
+        if satellites.ndim not in (2, 3) or satellites.shape[-1] != 3:
+            raise ValueError("Satellites must be an array of shape (N, 3) or (M, N, 3)")
+        Rie = getRieArray(np.atleast_1d(getGMSTArray(time, dts)))
+        if satellites.shape[-2] != len(Rie):
+            raise ValueError("Satellites must have one position per timepoint")
+        stations, up = self._rotate(Rie, self.ecef), self._rotate(Rie, self.up)
+        if satellites.ndim == 3:
+            # Satellites on a new axis after the stations: (K, 1, N, 3) against (1, M, N, 3)
+            stations, up = stations[:, None], up[:, None]
+
+        looks = satellites - stations
+        ranges = np.linalg.norm(looks, axis=-1)
+        directions = looks / ranges[..., None]
+        elevations = np.rad2deg(np.arcsin(np.clip(np.sum(directions * up, axis=-1), -1, 1)))
+        return TypeLineOfSight(directions, ranges, elevations)
@@ -1,44 +1,137 @@
 import random
 import numpy as np
 from datetime import datetime, timedelta
-from typing import Tuple
-from .utility import (CONSTANT, TypeOE, TypeLatLong, TypeXYZ, normalize, calMeanAnomaly, calEccentricAnomaly, calVecInPQW, toECIfromLatLong, getRie, getMatECItoPQW)
+from typing import NamedTuple, Tuple
+from .utility import (CONSTANT, TypeOE, TypeLatLong, TypeXYZ, normalize, calEccentricAnomaly, calVecInPQW, toECIfromLatLong, toECIfromLatLongBatch, getRie, getMatECItoPQW,
+                      getMatECItoPQWArray)
+from .propagation import MODELS, calJ2Rates
 from .orbital_elements import calc_oe_from_sv
-import dataclasses
+from .refine import refineGauss
+from . import backend, instrumentation
+import copy
+
+
+class TypeOrbitConstants(NamedTuple):
+    """Per-orbit constants of Simulation, valid while a, e, inclination, right ascension and argument of perigee do not change
+        - toECI: getMatECItoPQW of the orbit, perifocal -> ECI is toECI.T   (3, 3)
+        - mean_motion: 2*pi/T, T the period of calMeanAnomaly (J2 corrected for model "j2")   [rad/s]
+        - b: a*sqrt(1 - e^2), c: a*e                                              [km]
+        - right_ascension_rate, argument_of_perigee_rate: J2 secular drift, 0 for "twobody"  [rad/s]
+    """
+    toECI: np.array
+    mean_motion: float
+    b: float
+    c: float
+    right_ascension_rate: float = 0
+    argument_of_perigee_rate: float = 0
 
 
 class Simulation(object):
-    def __init__(self, OE: TypeOE, observer: TypeLatLong, E0: float = 1, time: datetime = datetime.now()) -> None:
-        self._OE = dataclasses.replace(OE)
+    """Observations of a satellite by a ground observer
+    model: "twobody", or "j2" to drift the right ascension and argument of perigee at their J2 secular rates
+    and advance the mean anomaly with the J2 corrected mean motion
+    """
+
+    def __init__(self, OE: TypeOE, observer: TypeLatLong, E0: float = 1, time: datetime = datetime.now(), model: str = "twobody") -> None:
+        if model not in MODELS:
+            raise ValueError(f"Model must be one of {MODELS}")
+        self.model = model
+        self._OE = copy.copy(OE)
         self.eccentric_anomaly = None
         self._observer = observer
         self._time = time
+        self._constants = None
+        self._constants_key = None
+
+    def _getOrbitConstants(self) -> TypeOrbitConstants:
+        """Cached TypeOrbitConstants, rebuilt when the elements they depend on were mutated (by _update or directly)"""
+        OE = self._OE
+        key = (OE.semimajor_axis, OE.eccentricity, OE.inclination, OE.right_ascension, OE.argument_of_perigee)
+        if key != self._constants_key:
+            a, e = OE.semimajor_axis, OE.eccentricity
+            toECI = getMatECItoPQW(i=OE.inclination, omega=OE.argument_of_perigee, sigma=OE.right_ascension)
+            if self.model == "j2":
+                rates = calJ2Rates(a, e, OE.inclination)
+                self._constants = TypeOrbitConstants(toECI, float(rates.mean_anomaly), a * np.sqrt(1 - e**2), a * e,
+                                                     float(rates.right_ascension), float(rates.argument_of_perigee))
+            else:
+                T = np.sqrt(4 * a**3 * CONSTANT.PI**2 / CONSTANT.G / CONSTANT.M)
+                self._constants = TypeOrbitConstants(toECI, 2 * CONSTANT.PI / T, a * np.sqrt(1 - e**2), a * e)
+            self._constants_key = key
+        return self._constants
+
+    def invalidate(self) -> None:
+        """Drop the cached orbit constants"""
+        self._constants = None
+        self._constants_key = None
 
     def _update(self, dt: float) -> None:
-        self._OE.mean_anomaly = calMeanAnomaly(self._OE.mean_anomaly, self._OE.semimajor_axis, dt)
+        constants = self._getOrbitConstants()
+        self._OE.mean_anomaly = self._OE.mean_anomaly + constants.mean_motion * dt
+        if self.model == "j2":
+            self._OE.right_ascension = self._OE.right_ascension + constants.right_ascension_rate * dt
+            self._OE.argument_of_perigee = self._OE.argument_of_perigee + constants.argument_of_perigee_rate * dt
         self.eccentric_anomaly = calEccentricAnomaly(self._OE.mean_anomaly, self._OE.eccentricity, alias=1)
 
     def _getObserverECI(self, dt: float) -> np.array:
         return toECIfromLatLong(self._observer, time=self._time + timedelta(seconds=dt))
 
-    def _getPosInECI(self) -> np.array:
-        pos_pqw = calVecInPQW(self._OE.semimajor_axis, self._OE.eccentricity, self.eccentric_anomaly)
-        toECI = getMatECItoPQW(i=self._OE.inclination, omega=self._OE.argument_of_perigee, sigma=self._OE.right_ascension)
-        return toECI.T @ pos_pqw
+    def _getPosInECI(self, toECI: np.array = None) -> np.array:
+        constants = self._getOrbitConstants()
+        E = self.eccentric_anomaly
+        if backend.isCompiled():
+            pos_pqw = calVecInPQW(self._OE.semimajor_axis, self._OE.eccentricity, E)
+        else:
+            # calVecInPQW with the cached b, c
+            pos_pqw = np.array([self._OE.semimajor_axis * np.cos(E) - constants.c, constants.b * np.sin(E), 0], dtype='float64')
+        return (constants.toECI if toECI is None else toECI).T @ pos_pqw
+
+    def _getMatECItoPQW(self, dts):
+        """Rotation of the orbit dts seconds later, (3, 3) for a scalar dts or (N, 3, 3)"""
+        constants = self._getOrbitConstants()
+        omega = self._OE.argument_of_perigee + constants.argument_of_perigee_rate * dts
+        sigma = self._OE.right_ascension + constants.right_ascension_rate * dts
+        if np.ndim(dts) == 0:
+            return getMatECItoPQW(i=self._OE.inclination, omega=omega, sigma=sigma)
+        return getMatECItoPQWArray(omega=omega, i=self._OE.inclination, sigma=sigma)
 
     # def _makeAlias(self, min=0, max=1, random_seed=None) -> np.array:
     #     random.seed(random_seed)
     #     return np.array([random.uniform(min, max), random.uniform(min, max), random.uniform(min, max)], dtype="float64")
 
     def getAllCoords(self, dt: float) -> Tuple[np.array, np.array]:
-        mean_anomaly = calMeanAnomaly(self._OE.mean_anomaly, self._OE.semimajor_axis, dt)
+        mean_anomaly = self._OE.mean_anomaly + self._getOrbitConstants().mean_motion * dt
         self.eccentric_anomaly = calEccentricAnomaly(mean_anomaly, self._OE.eccentricity, alias=1)
-        pos = self._getPosInECI()
+        pos = self._getPosInECI(self._getMatECItoPQW(dt) if self.model == "j2" else None)
         # alias = self._makeAlias(0, 0)
         observer = self._getObserverECI(dt)
         direction = pos - observer
         return observer, direction
 
+    def getAllCoordsBatch(self, dts: np.array) -> Tuple[np.array, np.array]:
+        """Vectorized getAllCoords over a time grid
+        Input:
+            - dts: seconds from the simulation time     (N,)    [s]
+        Output:
+            - observers: observer's positions in ECI    (N, 3)  [km]
+            - directions: observer to satellite         (N, 3)  [km]
+        """
+        dts = np.asarray(dts, dtype='float64')
+        constants = self._getOrbitConstants()
+        mean_anomaly = self._OE.mean_anomaly + constants.mean_motion * dts
+        eccentric_anomaly = calEccentricAnomaly(mean_anomaly, self._OE.eccentricity, alias=1)
+        pos_pqw = np.stack([self._OE.semimajor_axis * np.cos(eccentric_anomaly) - constants.c, constants.b * np.sin(eccentric_anomaly),
+                            np.zeros(dts.shape)], axis=-1)
+        if self.model == "j2":
+            # toECI.T @ p with the rotation of every sample
+            pos = np.einsum('nji,nj->ni', self._getMatECItoPQW(dts), pos_pqw)
+        else:
+            # (toECI.T @ p) == (p @ toECI) for every sample
+            pos = pos_pqw @ constants.toECI
+        observers = toECIfromLatLongBatch(self._observer, self._time, dts)
+        directions = pos - observers
+        return observers, directions
+
 
 class OrbitCalculate(object):
 
@@ -58,13 +151,19 @@ class OrbitCalculate(object):
             self.observers.append(observer)
             self.directions.append(direction)
 
-    def calculate(self, time_points: Tuple[float, float, float], r0: float=600, repeated: int=10000, alias: float = 0.1, shouldPrecalculate: bool=True) -> Tuple[np.array, np.array]:
+    def calculate(self, time_points: Tuple[float, float, float], r0: float=None, repeated: int=100, alias: float = 1e-12, shouldPrecalculate: bool=True,
+                  refine: int = 0, refine_tol: float = 1e-10, velocity: str = "lagrange") -> Tuple[np.array, np.array]:
+        """Gauss's method for the three observations in observers/directions
+        If refine > 0, the solution is improved by refineGauss with at most refine iterations
+        (stopping at refine_tol) and v2 is determined by velocity (see refineGauss)
+        """
 
         if (repeated < 0 or alias < 0):
             raise ValueError("Repeated must be int. Repeated and Alias must be positive.")
 
         if(shouldPrecalculate):
-            self.preCalculate(time_points)
+            with instrumentation.stage("precalculate"):
+                self.preCalculate(time_points)
         # print(self.observers, self.directions)
         assert len(self.observers) == 3, "Obeservers must be array of 3 Vec3"
         assert len(self.directions) == 3, "Obeservers must be array of 3 Vec3"
@@ -72,18 +171,23 @@ class OrbitCalculate(object):
         t3 = time_points[2] - time_points[1]
         t = t3 - t1
 
-        D0 = self.directions[0] @ np.cross(self.directions[1], self.directions[2])
-        D11 = self.observers[0] @ np.cross(self.directions[1], self.directions[2])
-        D21 = self.observers[1] @ np.cross(self.directions[1], self.directions[2])
-        D31 = self.observers[2] @ np.cross(self.directions[1], self.directions[2])
+        if backend.isCompiled():
+            r2, v2 = self._calculateCompiled(t1, t3, r0, repeated, alias)
+            return self._refine(time_points, r2, v2, refine, refine_tol, velocity)
 
-        D12 = self.observers[0] @ np.cross(self.directions[0], self.directions[2])
-        D22 = self.observers[1] @ np.cross(self.directions[0], self.directions[2])
-        D32 = self.observers[2] @ np.cross(self.directions[0], self.directions[2])
+        with instrumentation.stage("determinants"):
+            D0 = self.directions[0] @ np.cross(self.directions[1], self.directions[2])
+            D11 = self.observers[0] @ np.cross(self.directions[1], self.directions[2])
+            D21 = self.observers[1] @ np.cross(self.directions[1], self.directions[2])
+            D31 = self.observers[2] @ np.cross(self.directions[1], self.directions[2])
 
-        D13 = self.observers[0] @ np.cross(self.directions[0], self.directions[1])
-        D23 = self.observers[1] @ np.cross(self.directions[0], self.directions[1])
-        D33 = self.observers[2] @ np.cross(self.directions[0], self.directions[1])
+            D12 = self.observers[0] @ np.cross(self.directions[0], self.directions[2])
+            D22 = self.observers[1] @ np.cross(self.directions[0], self.directions[2])
+            D32 = self.observers[2] @ np.cross(self.directions[0], self.directions[2])
+
+            D13 = self.observers[0] @ np.cross(self.directions[0], self.directions[1])
+            D23 = self.observers[1] @ np.cross(self.directions[0], self.directions[1])
+            D33 = self.observers[2] @ np.cross(self.directions[0], self.directions[1])
 
         # Parameters for calculating "r2"
         A = (-D12 * t3 / t + D22 + D32 * t1 / t) / D0
@@ -98,16 +202,9 @@ class OrbitCalculate(object):
         # Solve |r2|
         # Using Newton's method to Solve Equation of |r2|
         # (x^8 + a*x^6 + b*x^3+  c = 0)
-        fx = np.poly1d([1, 0, a, 0, 0, b, 0, 0, c])
-        dx = fx.deriv()
-
-        r = r0
-        counter = 0
-
-        while (counter < repeated and np.abs(fx(r)) > alias):
-            # print(counter)
-            r -= fx(r) / dx(r)
-            counter += 1
+        with instrumentation.stage("root_solve"):
+            self.r2_root = calR2Root(a, b, c, r0=r0, repeated=repeated, tol=alias)
+        r = float(self.r2_root.r)
 
         # Find Other Constants (C1, C3)
         C1 = t3 * (1 + CONSTANT.GM / 6 / r**3 * (t**2 - t3**2)) / t
@@ -116,7 +213,7 @@ class OrbitCalculate(object):
         # Find Distances from Observations to Satellite (mul_p1, mul_p2, mul_p3)
         mul_p1 = (-D11 + D21 / C1 - C3 * D31 / C1) / D0
         mul_p2 = A + CONSTANT.GM * B / r**3
-        mul_p3 = (-C3 * D13 / C1 + D23 / C3 - D33) / D0
+        mul_p3 = (-C1 * D13 / C3 + D23 / C3 - D33) / D0
 
         # Find Position Vectors of Satellite (r1, r2, r3)
         r1 = self.observers[0] + mul_p1 * self.directions[0]
@@ -124,17 +221,212 @@ class OrbitCalculate(object):
         r3 = self.observers[2] + mul_p3 * self.directions[2]
 
         # Find Velocity of Satellite at t2 (v2)
-        f1 = 1 - CONSTANT.GM * t1**2 / 2 / r
-        g1 = t1 - CONSTANT.GM * t1**3 / 6 / r**3
-        f3 = 1 - CONSTANT.GM * t3**2 / 2 / r
-        g3 = t3 - CONSTANT.GM * t3**3 / 6 / r**3
+        with instrumentation.stage("velocity"):
+            f1 = 1 - CONSTANT.GM * t1**2 / 2 / r**3
+            g1 = t1 - CONSTANT.GM * t1**3 / 6 / r**3
+            f3 = 1 - CONSTANT.GM * t3**2 / 2 / r**3
+            g3 = t3 - CONSTANT.GM * t3**3 / 6 / r**3
 
-        v2 = (f1 * r3 - f3 * r1) / (f1 * g3 - f3 * g1)
+            v2 = (f1 * r3 - f3 * r1) / (f1 * g3 - f3 * g1)
         # print("R2, V2",r2, v2)
         # print("OE",calc_oe_from_sv(r2, v2))
+        return self._refine(time_points, r2, v2, refine, refine_tol, velocity)
+
+    def _calculateCompiled(self, t1: float, t3: float, r0: float, repeated: int, alias: float) -> Tuple[np.array, np.array]:
+        """calculate up to v2 with the gaussCore kernel of the compiled backend"""
+        with instrumentation.stage("gauss_core"):
+            r2, v2, r, iterations, converged = backend.getKernel("gaussCore")(
+                np.array(self.observers, dtype='float64'), np.array(self.directions, dtype='float64'), float(t1), float(t3),
+                np.nan if r0 is None else float(r0), int(repeated), float(alias))
+        self.r2_root = TypeR2Root(r, iterations, converged)
+        instrumentation.countSolver("r2_root", iterations, converged)
+        return r2, v2
+
+    def _refine(self, time_points, r2: np.array, v2: np.array, refine: int, refine_tol: float, velocity: str) -> Tuple[np.array, np.array]:
+        if refine > 0:
+            with instrumentation.stage("refine"):
+                r2, v2, _ = refineGauss(np.array(self.observers)[None], np.array(self.directions)[None], np.array(time_points, dtype='float64')[None],
+                                        r2[None], v2[None], repeated=refine, tol=refine_tol, velocity=velocity)
+            r2, v2 = r2[0], v2[0]
+        return r2, v2
+
+    def calculateLeastSquares(self, time_points: np.array, sigma: float = None, repeated: int = 30, tol: float = 1e-10):
+        """Least-squares fit (fitOrbit) of all simulated observations at time_points, seeded by Gauss's method
+        Output: TypeOrbitFit, the state is at the middle time point
+        """
+        from .leastsquares import fitOrbit
+
+        observers, directions = self.sim.getAllCoordsBatch(time_points)
+        return fitOrbit(observers, directions, time_points, sigma=sigma, repeated=repeated, tol=tol)
+
+    @staticmethod
+    def calculateBatch(observers: np.array, directions: np.array, time_points: np.array, r0: float=None, repeated: int=100, alias: float = 1e-12,
+                       refine: int = 0, refine_tol: float = 1e-10, velocity: str = "lagrange", crosses: np.array = None) -> Tuple[np.array, np.array]:
+        """Gauss's method for N observation triplets at once
+        Input:
+            - observers: observers' positions in ECI        (N, 3, 3) [km]
+            - directions: unit directions to satellite      (N, 3, 3) [ ]
+            - time_points: times of the observations        (N, 3)    [s]
+        Output:
+            - r2: satellite's position at time_points[:, 1] (N, 3)    [km]
+            - v2: satellite's velocity at time_points[:, 1] (N, 3)    [km/s]
+        If refine > 0, the solutions are improved by refineGauss as in calculate
+        crosses: precomputed cross products of the directions, see calGaussDeterminants
+        """
+        if (repeated < 0 or alias < 0):
+            raise ValueError("Repeated must be int. Repeated and Alias must be positive.")
+
+        observers = np.asarray(observers, dtype='float64')
+        directions = np.asarray(directions, dtype='float64')
+        time_points = np.asarray(time_points, dtype='float64')
+        if observers.ndim != 3 or observers.shape[1:] != (3, 3) or directions.shape != observers.shape:
+            raise ValueError("Observers and Directions must be arrays of shape (N, 3, 3)")
+        if time_points.shape != observers.shape[:2]:
+            raise ValueError("Time points must be an array of shape (N, 3)")
+
+        t1 = time_points[:, 0] - time_points[:, 1]
+        t3 = time_points[:, 2] - time_points[:, 1]
+        t = t3 - t1
+
+        with instrumentation.stage("determinants"):
+            D0, D = calGaussDeterminants(observers, directions, crosses)
+
+        # Parameters for calculating "r2"
+        A = (-D[:, 0, 1] * t3 / t + D[:, 1, 1] + D[:, 2, 1] * t1 / t) / D0
+        B = (-D[:, 0, 1] * (t**2 - t3**2) * t3 / t + D[:, 2, 1] * (t**2 - t1**2) * t1 / t) / 6 / D0
+        E = np.einsum('ij,ij->i', observers[:, 1], directions[:, 1])
+
+        a = -(A**2 + 2 * A * E + np.einsum('ij,ij->i', observers[:, 1], observers[:, 1]))
+        b = -2 * CONSTANT.GM * B * (A + E)
+        c = -CONSTANT.GM**2 * B**2
+
+        # Solve |r2| for every triplet
+        # (x^8 + a*x^6 + b*x^3+  c = 0)
+        with instrumentation.stage("root_solve"):
+            r = calR2Root(a, b, c, r0=r0, repeated=repeated, tol=alias).r
+
+        # Find Other Constants (C1, C3)
+        C1 = t3 * (1 + CONSTANT.GM / 6 / r**3 * (t**2 - t3**2)) / t
+        C3 = -t1 * (1 + CONSTANT.GM / 6 / r**3 * (t**2 - t1**2)) / t
+
+        # Find Distances from Observations to Satellite (mul_p1, mul_p2, mul_p3)
+        mul_p1 = (-D[:, 0, 0] + D[:, 1, 0] / C1 - C3 * D[:, 2, 0] / C1) / D0
+        mul_p2 = A + CONSTANT.GM * B / r**3
+        mul_p3 = (-C1 * D[:, 0, 2] / C3 + D[:, 1, 2] / C3 - D[:, 2, 2]) / D0
+
+        # Find Position Vectors of Satellite (r1, r2, r3)
+        r1 = observers[:, 0] + mul_p1[:, None] * directions[:, 0]
+        r2 = observers[:, 1] + mul_p2[:, None] * directions[:, 1]
+        r3 = observers[:, 2] + mul_p3[:, None] * directions[:, 2]
+
+        # Find Velocity of Satellite at t2 (v2)
+        with instrumentation.stage("velocity"):
+            f1 = 1 - CONSTANT.GM * t1**2 / 2 / r**3
+            g1 = t1 - CONSTANT.GM * t1**3 / 6 / r**3
+            f3 = 1 - CONSTANT.GM * t3**2 / 2 / r**3
+            g3 = t3 - CONSTANT.GM * t3**3 / 6 / r**3
+
+            v2 = (f1[:, None] * r3 - f3[:, None] * r1) / (f1 * g3 - f3 * g1)[:, None]
+        if refine > 0:
+            with instrumentation.stage("refine"):
+                r2, v2, _ = refineGauss(observers, directions, time_points, r2, v2, repeated=refine, tol=refine_tol, velocity=velocity)
         return r2, v2
 
 
+def calGaussDeterminants(observers: np.array, directions: np.array, crosses: np.array = None) -> Tuple[np.array, np.array]:
+    """Scalar triple products of Gauss's method for N triplets
+    D0 = p1 . (p2 x p3)
+    D[:, i, j] = R(i+1) . Cj     with C1 = p2 x p3, C2 = p1 x p3, C3 = p1 x p2
+    crosses (N, 3, 3) holds C1, C2, C3 if they are already known (e.g. shared between overlapping triplets)
+    """
+    if crosses is None:
+        crosses = np.stack([np.cross(directions[:, 1], directions[:, 2]),
+                            np.cross(directions[:, 0], directions[:, 2]),
+                            np.cross(directions[:, 0], directions[:, 1])], axis=1)
+    D0 = np.einsum('ij,ij->i', directions[:, 0], crosses[:, 0])
+    D = np.einsum('nik,njk->nij', observers, crosses)
+    return D0, D
+
+
+class TypeR2Root(NamedTuple):
+    """Result of calR2Root, every field has the shape of broadcast(a, b, c)
+        - r: selected root                                    [km]
+        - iterations: Newton iterations
+        - converged: relative step below tol and r > 0
+        - roots: positive real roots of every equation (list of arrays), only if all_roots
+    """
+    r: np.array
+    iterations: np.array
+    converged: np.array
+    roots: list = None
+
+
+def calR2Root(a, b, c, r0: float=None, repeated: int=100, tol: float=1e-12, all_roots: bool=False) -> TypeR2Root:
+    """Solve the Gauss equation of |r2|, x^8 + a*x^6 + b*x^3 + c = 0, for arrays of a, b, c
+
+    The polynomial and its derivative are evaluated with a Horner scheme on the sparse terms
+        f  = ((x^2 + a)*x^3 + b)*x^3 + c
+        f' = x^2*((8x^2 + 6a)*x^3 + 3b)
+    Newton starts from r0 or, if None, from sqrt(-a): a = -(A^2 + 2AE + |R2|^2) makes sqrt(-a) the
+    |r2| of the first order (B = 0) solution. Equations that do not converge to a positive root
+    are restarted from Fujiwara's bound 2*max(|a|^(1/2), |b|^(1/5), |c/2|^(1/8)), which lies above
+    every root, so Newton decreases monotonically to the largest real root.
+    The stop criterion is the relative step |dx|/x < tol.
+    """
+    if (repeated < 0 or tol < 0):
+        raise ValueError("Repeated must be int. Repeated and Tol must be positive.")
+
+    a, b, c = np.broadcast_arrays(np.asarray(a, dtype='float64'), np.asarray(b, dtype='float64'), np.asarray(c, dtype='float64'))
+    shape = a.shape
+    a, b, c = a.ravel(), b.ravel(), c.ravel()
+
+    bound = 2 * np.maximum(np.maximum(np.sqrt(np.abs(a)), np.abs(b)**(1 / 5)), np.abs(c / 2)**(1 / 8))
+    if r0 is None:
+        start = np.where(a < 0, np.sqrt(np.abs(a)), bound)
+    else:
+        start = np.broadcast_to(np.asarray(r0, dtype='float64'), shape).ravel()
+
+    r, iterations, converged = _newtonR2(a, b, c, start, repeated, tol)
+    retry = ~converged
+    if retry.any():
+        r_retry, iterations_retry, converged_retry = _newtonR2(a[retry], b[retry], c[retry], bound[retry], repeated, tol)
+        r[retry] = r_retry
+        iterations[retry] += iterations_retry
+        converged[retry] = converged_retry
+
+    roots = None
+    if all_roots:
+        roots = []
+        for a_k, b_k, c_k in zip(a, b, c):
+            candidates = np.roots([1, 0, a_k, 0, 0, b_k, 0, 0, c_k])
+            real = candidates[np.abs(candidates.imag) <= 1e-9 * np.abs(candidates)].real
+            roots.append(np.sort(real[real > 0])[::-1])
+
+    instrumentation.countSolver("r2_root", iterations, converged)
+    return TypeR2Root(r.reshape(shape)[()], iterations.reshape(shape)[()], converged.reshape(shape)[()], roots)
+
+
+def _newtonR2(a: np.array, b: np.array, c: np.array, r: np.array, repeated: int, tol: float) -> Tuple[np.array, np.array, np.array]:
+    """Masked Newton iterations of x^8 + a*x^6 + b*x^3 + c = 0"""
+    r = np.array(r, dtype='float64')
+    iterations = np.zeros(r.shape, dtype='int64')
+    active = np.ones(r.shape, dtype=bool)
+    counter = 0
+    while (counter < repeated and active.any()):
+        x, a_active, b_active, c_active = r[active], a[active], b[active], c[active]
+        x2 = x * x
+        x3 = x2 * x
+        fx = ((x2 + a_active) * x3 + b_active) * x3 + c_active
+        dx = x2 * ((8 * x2 + 6 * a_active) * x3 + 3 * b_active)
+        step = fx / dx
+        r[active] = x - step
+        iterations[active] += 1
+        active[active] = ~(np.abs(step) <= tol * np.abs(x))
+        counter += 1
+    converged = ~active & (r > 0)
+    return r, iterations, converged
+
+
 if __name__ == "__main__":
     OE = TypeOE(eccentricity=0.0012384, inclination=98.1977, right_ascension=27.5125, argument_of_perigee=172.8977, mean_anomaly=187.2418, mean_motion=14.91391657)
     print(OE)
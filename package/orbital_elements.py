@@ -1,7 +1,9 @@
 import numpy as np
-from .utility import CONSTANT, TypeOE
+from .utility import CONSTANT, TypeOE, TypeOEArray
+from . import instrumentation
 
 
+@instrumentation.timed("element_conversion")
 def calc_oe_from_sv(R: np.array, V: np.array) -> TypeOE:
     """ Calculate the orbital elements from the state vectors.
         Input:
@@ -89,3 +91,77 @@ def calc_oe_from_sv(R: np.array, V: np.array) -> TypeOE:
     OE.semimajor_axis = a
 
     return OE
+
+
+@instrumentation.timed("element_conversion")
+def calc_oe_from_sv_batch(R: np.array, V: np.array) -> TypeOEArray:
+    """ Calculate the orbital elements from N state vectors at once.
+        Input:
+            - R: satellites' position vectors       (N, 3) [km]
+            - V: satellites' velocity vectors       (N, 3) [km/s]
+        Output:
+            - TypeOEArray of N elements in the units of calc_oe_from_sv
+        The branches of calc_oe_from_sv become masks:
+            - equatorial (n == 0): right ascension and argument of perigee are 0
+            - circular (e <= eps): argument of perigee is 0, the true anomaly is the argument of latitude
+            - circular and equatorial: the true anomaly is the true longitude (calc_oe_from_sv gives NaN)
+    """
+    R = np.asarray(R, dtype='float64').reshape(-1, 3)
+    V = np.asarray(V, dtype='float64').reshape(-1, 3)
+
+    # Set a number below which the eccentricity is considered to be zero
+    eps = 0.0000000001
+
+    # Calculate the distance, the speed and the radial velocity
+    r = np.linalg.norm(R, axis=1)
+    v = np.linalg.norm(V, axis=1)
+    vr = np.einsum('ij,ij->i', R, V) / r
+
+    # Calculate the specific angular momentum and its magnitude
+    H = np.cross(R, V)
+    h = np.linalg.norm(H, axis=1)
+
+    # Calculate the inclination
+    inclination = np.arccos(np.clip(H[:, 2] / h, -1, 1))
+
+    # Calculate vector N that defines the node line and its magnitude, N = [0, 0, 1] x H
+    N = np.stack([-H[:, 1], H[:, 0], np.zeros(len(H))], axis=1)
+    n = np.linalg.norm(N, axis=1)
+    inclined = n != 0
+    n_safe = np.where(inclined, n, 1)
+
+    # Calculate the right ascension (longitude) of the ascending node
+    ra = np.arccos(np.clip(N[:, 0] / n_safe, -1, 1))
+    ra = np.where(N[:, 1] < 0, 2 * np.pi - ra, ra)
+    ra = np.where(inclined, ra, 0)
+
+    # Calculate the eccentricity
+    E = 1 / CONSTANT.GM * ((v * v - CONSTANT.GM / r)[:, None] * R - (r * vr)[:, None] * V)
+    e = np.linalg.norm(E, axis=1)
+    elliptic = e > eps
+    e_safe = np.where(elliptic, e, 1)
+
+    # Calculate the argument of perigee
+    w = np.arccos(np.clip(np.einsum('ij,ij->i', N, E) / n_safe / e_safe, -1, 1))
+    w = np.where(E[:, 2] < 0, 2 * np.pi - w, w)
+    w = np.where(inclined & elliptic, w, 0)
+
+    # Calculate the true anomaly: from perigee, from the node if circular, from the x axis if also equatorial
+    TA_elliptic = np.arccos(np.clip(np.einsum('ij,ij->i', E, R) / e_safe / r, -1, 1))
+    TA_elliptic = np.where(vr < 0, 2 * np.pi - TA_elliptic, TA_elliptic)
+    TA_circular = np.arccos(np.clip(np.einsum('ij,ij->i', N, R) / n_safe / r, -1, 1))
+    TA_circular = np.where(np.cross(N, R)[:, 2] < 0, 2 * np.pi - TA_circular, TA_circular)
+    TA_longitude = np.arccos(np.clip(R[:, 0] / r, -1, 1))
+    TA_longitude = np.where((R[:, 1] < 0) ^ (H[:, 2] < 0), 2 * np.pi - TA_longitude, TA_longitude)
+    TA = np.where(elliptic, TA_elliptic, np.where(inclined, TA_circular, TA_longitude))
+
+    # Calculate the eccentric anomaly
+    EA = 2 * np.arctan(np.sqrt((1 - e) / (1 + e)) * np.tan(TA / 2))
+
+    # Calculate the mean anomaly
+    MA = EA - e * np.sin(EA)
+
+    # Calculate the semimajor axis
+    a = h * h / CONSTANT.GM / (1 - e * e)
+
+    return TypeOEArray(eccentricity=e, semimajor_axis=a, inclination=inclination, right_ascension=ra, argument_of_perigee=w, mean_anomaly=MA)
@@ -0,0 +1,160 @@
+import numpy as np
+from datetime import datetime
+from typing import List, NamedTuple, Sequence, Union
+from .utility import TypeOE, TypeOEArray, TypeLatLong, toECIfromLatLongBatch
+from .propagation import getPosInECI, propagateCatalog
+
+
+class TypePass(NamedTuple):
+    """A pass of a satellite above an observer's horizon
+    Times are seconds from the simulation time, rise/set are NaN if the pass is cut by the window
+    """
+    satellite: int
+    observer: int
+    rise: float
+    culmination: float
+    set: float
+    max_elevation: float  # [deg]
+
+    def __repr__(self):
+        return f"Pass(satellite={self.satellite}, observer={self.observer}, rise={self.rise:.2f}, culmination={self.culmination:.2f}, set={self.set:.2f}, max_elevation={self.max_elevation:.2f})"
+
+
+def calSinElevation(satellite: np.array, observer: np.array) -> np.array:
+    """Sine of the elevation of satellites above observers' horizon (spherical Earth), (..., 3) ECI inputs"""
+    direction = satellite - observer
+    return np.sum(direction * observer, axis=-1) / np.linalg.norm(direction, axis=-1) / np.linalg.norm(observer, axis=-1)
+
+
+def _toArrays(OE: Union[TypeOE, TypeOEArray], observers: Union[TypeLatLong, Sequence[TypeLatLong]]):
+    if isinstance(OE, TypeOE):
+        OE = TypeOEArray.fromOEs([OE])
+    if isinstance(observers, TypeLatLong):
+        observers = [observers]
+    location = TypeLatLong(np.array([observer.latitude for observer in observers], dtype='float64'),
+                           np.array([observer.longtitude for observer in observers], dtype='float64'))
+    return OE, location
+
+
+def predictPasses(OE: Union[TypeOE, TypeOEArray], observers: Union[TypeLatLong, Sequence[TypeLatLong]], time: datetime, start: float, end: float,
+                  step: float = 60, min_elevation: float = 0, tol: float = 0.01, chunk_size: int = 64) -> List[TypePass]:
+    """Find rise, culmination and set times of satellites over observers between start and end
+    Input:
+        - OE: elements of the satellites at time                        TypeOE or TypeOEArray
+        - observers: ground observers                                   TypeLatLong or a sequence of them
+        - time: epoch of the elements                                   datetime
+        - start, end: search window, seconds from time                  [s]
+        - step: coarse sweep step, passes shorter than step may be missed [s]
+        - min_elevation: elevation mask                                 [deg]
+        - tol: time tolerance of the refined events                     [s]
+        - chunk_size: satellites swept at once
+    Output:
+        - passes ordered by satellite, observer and time
+    The elevation is swept on the coarse grid for all satellites and observers at once,
+    then only the brackets around sign changes (rise/set) and around the coarse maximum
+    (culmination) are refined, by bisection and golden-section search respectively.
+    """
+    if end <= start or step <= 0 or tol <= 0:
+        raise ValueError("End must be after Start. Step and Tol must be positive.")
+
+    OE, location = _toArrays(OE, observers)
+    dts = np.arange(start, end, step, dtype='float64')
+    dts = np.append(dts, end) if dts[-1] < end else dts
+    N = len(dts)
+    sin_min = np.sin(np.deg2rad(min_elevation))
+
+    # Observers in ECI on the coarse grid, shared by every satellite: (K, N, 3)
+    observers_eci = toECIfromLatLongBatch(TypeLatLong(location.latitude[:, None], location.longtitude[:, None]), time, dts)
+
+    def getSinElevation(satellite: np.array, observer: np.array, t: np.array) -> np.array:
+        OE_selected = OE[satellite]
+        satellite_eci = getPosInECI(OE_selected, t)
+        observer_eci = toECIfromLatLongBatch(TypeLatLong(location.latitude[observer], location.longtitude[observer]), time, t)
+        return calSinElevation(satellite_eci, observer_eci) - sin_min
+
+    passes = []
+    for first in range(0, len(OE), chunk_size):
+        chunk = OE[first:first + chunk_size]
+        # Coarse sweep: (m, K, N)
+        positions = propagateCatalog(chunk, dts)
+        f = calSinElevation(positions[:, None], observers_eci[None]) - sin_min
+        up = f > 0
+        if not up.any():
+            continue
+
+        previous = np.zeros_like(up)
+        previous[..., 1:] = up[..., :-1]
+        following = np.zeros_like(up)
+        following[..., :-1] = up[..., 1:]
+        satellite, observer, k_start = np.nonzero(up & ~previous)
+        _, _, k_end = np.nonzero(up & ~following)
+        satellite_global = satellite + first
+
+        # Rise: sign change in [k_start - 1, k_start]
+        rise = np.full(len(k_start), np.nan)
+        has_rise = k_start > 0
+        rise[has_rise] = _bisect(getSinElevation, satellite_global[has_rise], observer[has_rise],
+                                 dts[k_start[has_rise] - 1], dts[k_start[has_rise]], tol)
+
+        # Set: sign change in [k_end, k_end + 1]
+        set_ = np.full(len(k_end), np.nan)
+        has_set = k_end < N - 1
+        set_[has_set] = _bisect(getSinElevation, satellite_global[has_set], observer[has_set],
+                                dts[k_end[has_set]], dts[k_end[has_set] + 1], tol)
+
+        # Culmination: coarse maximum of every run, then golden-section search around it
+        run = np.cumsum((up & ~previous).ravel())[up.ravel()] - 1
+        f_up = f.ravel()[up.ravel()]
+        k_up = np.nonzero(up)[2]
+        order = np.lexsort((-f_up, run))
+        best = order[np.r_[0, np.flatnonzero(np.diff(run[order])) + 1]]
+        k_max = k_up[best]
+        lower = np.fmax(dts[np.maximum(k_max - 1, 0)], np.where(np.isnan(rise), -np.inf, rise))
+        upper = np.fmin(dts[np.minimum(k_max + 1, N - 1)], np.where(np.isnan(set_), np.inf, set_))
+        culmination = _goldenSection(getSinElevation, satellite_global, observer, lower, upper, tol)
+        max_elevation = np.rad2deg(np.arcsin(np.clip(getSinElevation(satellite_global, observer, culmination) + sin_min, -1, 1)))
+
+        passes.extend(TypePass(*values) for values in zip(satellite_global.tolist(), observer.tolist(), rise.tolist(),
+                                                          culmination.tolist(), set_.tolist(), max_elevation.tolist()))
+    return passes
+
+
+def _bisect(func, satellite: np.array, observer: np.array, lower: np.array, upper: np.array, tol: float) -> np.array:
+    """Vectorized bisection of func(satellite, observer, t) = 0 on brackets [lower, upper]"""
+    lower, upper = lower.copy(), upper.copy()
+    if len(lower) == 0:
+        return lower
+    f_lower = func(satellite, observer, lower)
+    iterations = int(np.ceil(np.log2(np.max(upper - lower) / tol))) if np.max(upper - lower) > tol else 0
+    for _ in range(iterations):
+        middle = (lower + upper) / 2
+        f_middle = func(satellite, observer, middle)
+        same = np.sign(f_middle) == np.sign(f_lower)
+        lower = np.where(same, middle, lower)
+        f_lower = np.where(same, f_middle, f_lower)
+        upper = np.where(same, upper, middle)
+    return (lower + upper) / 2
+
+
+def _goldenSection(func, satellite: np.array, observer: np.array, lower: np.array, upper: np.array, tol: float) -> np.array:
+    """Vectorized golden-section search of the maximum of func(satellite, observer, t) on [lower, upper]"""
+    ratio = (np.sqrt(5) - 1) / 2
+    lower, upper = lower.copy(), upper.copy()
+    if len(lower) == 0:
+        return lower
+    width = np.max(upper - lower)
+    iterations = int(np.ceil(np.log(tol / width) / np.log(ratio))) if width > tol else 0
+    x1 = upper - ratio * (upper - lower)
+    x2 = lower + ratio * (upper - lower)
+    f1 = func(satellite, observer, x1)
+    f2 = func(satellite, observer, x2)
+    for _ in range(iterations):
+        left = f1 > f2
+        # Keep [lower, x2] where f1 > f2, else [x1, upper]
+        upper = np.where(left, x2, upper)
+        lower = np.where(left, lower, x1)
+        x_new = np.where(left, upper - ratio * (upper - lower), lower + ratio * (upper - lower))
+        f_new = func(satellite, observer, x_new)
+        x1, x2 = np.where(left, x_new, x2), np.where(left, x1, x_new)
+        f1, f2 = np.where(left, f_new, f2), np.where(left, f1, f_new)
+    return (lower + upper) / 2
@@ -0,0 +1,120 @@
+import numpy as np
+from typing import NamedTuple, Tuple
+from .utility import CONSTANT, OE_FIELDS, TypeOEArray, calMeanAnomaly, solveKepler, calVecInPQW, getMatECItoPQWArray
+from .tle import TypeTLECatalog
+
+
+# Propagation models: "twobody" Kepler motion, "j2" Kepler motion with the secular J2 drift of the elements
+MODELS = ("twobody", "j2")
+
+
+class TypeJ2Rates(NamedTuple):
+    """Secular rates of the elements under J2, broadcast(a, e, i) shaped        [rad/s]
+        - right_ascension: nodal regression     -3/2 n J2 (Re/p)^2 cos(i)
+        - argument_of_perigee: apsidal rotation  3/4 n J2 (Re/p)^2 (5cos^2(i) - 1)
+        - mean_anomaly: corrected mean motion    n + 3/4 n J2 (Re/p)^2 sqrt(1 - e^2) (3cos^2(i) - 1)
+    n = sqrt(GM/a^3), p = a(1 - e^2)
+    """
+    right_ascension: np.array
+    argument_of_perigee: np.array
+    mean_anomaly: np.array
+
+
+def calJ2Rates(a, e, i) -> TypeJ2Rates:
+    a, e, i = (np.asarray(value, dtype='float64') for value in (a, e, i))
+    n = np.sqrt(CONSTANT.GM / a**3)
+    k = 1.5 * n * CONSTANT.J2 * (CONSTANT.R_EQUATOR / (a * (1 - e**2)))**2
+    cos2 = np.cos(i)**2
+    return TypeJ2Rates(-k * np.cos(i), k / 2 * (5 * cos2 - 1), n + k / 2 * np.sqrt(1 - e**2) * (3 * cos2 - 1))
+
+
+def _advanceElements(OE: TypeOEArray, dts: np.array, model: str) -> Tuple[np.array, np.array, np.array]:
+    """Mean anomaly, right ascension and argument of perigee dts seconds after the elements"""
+    if model == "twobody":
+        return calMeanAnomaly(OE.mean_anomaly, OE.semimajor_axis, dts), OE.right_ascension, OE.argument_of_perigee
+    if model == "j2":
+        rates = calJ2Rates(OE.semimajor_axis, OE.eccentricity, OE.inclination)
+        return (OE.mean_anomaly + rates.mean_anomaly * dts, OE.right_ascension + rates.right_ascension * dts,
+                OE.argument_of_perigee + rates.argument_of_perigee * dts)
+    raise ValueError(f"Model must be one of {MODELS}")
+
+
+def getPosInECI(OE: TypeOEArray, dts: np.array, tol: float=1e-12, model: str="twobody") -> np.array:
+    """Positions of satellites dts seconds after their elements, element-wise
+    Input:
+        - OE: orbital elements, fields broadcastable against dts     [km], [rad]
+        - dts: seconds from the elements' epoch                      [s]
+        - model: "twobody", or "j2" to drift the right ascension, argument of perigee and mean anomaly
+                 at their J2 secular rates (the rotation to ECI is then evaluated per sample)
+    Output:
+        - positions in ECI of shape broadcast(fields, dts) + (3,)    [km]
+    """
+    dts = np.asarray(dts, dtype='float64')
+    mean_anomaly, right_ascension, argument_of_perigee = _advanceElements(OE, dts, model)
+    eccentric_anomaly, _ = solveKepler(mean_anomaly, OE.eccentricity, tol=tol)
+    pos_pqw = calVecInPQW(OE.semimajor_axis, OE.eccentricity, eccentric_anomaly)
+    toECI = getMatECItoPQWArray(omega=argument_of_perigee, i=OE.inclination, sigma=right_ascension)
+    # toECI.T @ pos_pqw for every sample
+    return np.einsum('...ji,...j->...i', toECI, pos_pqw)
+
+
+def getStateInECI(OE: TypeOEArray, dts: np.array, tol: float=1e-12, model: str="twobody") -> Tuple[np.array, np.array]:
+    """Positions [km] and velocities [km/s] in ECI, broadcasting as getPosInECI
+    v_pqw = sqrt(GM*a)/r * [-sinE, sqrt(1-e^2)*cosE, 0],    r = a*(1 - e*cosE)
+    With model "j2" the velocity is the two-body velocity on the drifted orbit
+    """
+    dts = np.asarray(dts, dtype='float64')
+    a, e = OE.semimajor_axis, OE.eccentricity
+    mean_anomaly, right_ascension, argument_of_perigee = _advanceElements(OE, dts, model)
+    eccentric_anomaly, _ = solveKepler(mean_anomaly, e, tol=tol)
+    pos_pqw = calVecInPQW(a, e, eccentric_anomaly)
+    cosE, sinE = np.cos(eccentric_anomaly), np.sin(eccentric_anomaly)
+    speed = np.sqrt(CONSTANT.GM * a) / (a * (1 - e * cosE))
+    vel_pqw = np.stack(np.broadcast_arrays(-speed * sinE, speed * np.sqrt(1 - e**2) * cosE, np.zeros(np.shape(speed))), axis=-1)
+    toECI = getMatECItoPQWArray(omega=argument_of_perigee, i=OE.inclination, sigma=right_ascension)
+    return np.einsum('...ji,...j->...i', toECI, pos_pqw), np.einsum('...ji,...j->...i', toECI, vel_pqw)
+
+
+def propagateCatalog(OE: TypeOEArray, dts: np.array, chunk_size: int=None, out: np.array=None, tol: float=1e-12, model: str="twobody") -> np.array:
+    """Propagate M satellites over N timepoints
+    Input:
+        - OE: orbital elements of M satellites                       TypeOEArray
+        - dts: seconds from the elements' epoch, shared (N,) or per satellite (M, N)
+        - chunk_size: satellites propagated at once, bounds the temporary memory to O(chunk_size * N)
+        - out: optional (M, N, 3) float64 array to write into (e.g. a np.memmap)
+        - model: propagation model of getPosInECI
+    Output:
+        - positions in ECI                                           (M, N, 3) [km]
+    """
+    dts = np.asarray(dts, dtype='float64')
+    M = len(OE)
+    if dts.ndim == 1:
+        N = dts.shape[0]
+    elif dts.ndim == 2 and dts.shape[0] == M:
+        N = dts.shape[1]
+    else:
+        raise ValueError("Dts must be an array of shape (N,) or (M, N)")
+
+    if out is None:
+        out = np.empty((M, N, 3), dtype='float64')
+    elif out.shape != (M, N, 3):
+        raise ValueError(f"Out must be an array of shape {(M, N, 3)}")
+
+    chunk_size = M if chunk_size is None else chunk_size
+    if chunk_size <= 0:
+        raise ValueError("Chunk size must be positive")
+
+    for start in range(0, M, chunk_size):
+        end = min(start + chunk_size, M)
+        chunk = OE[start:end]
+        # (m, 1) elements against (N,) or (m, N) timepoints
+        columns = TypeOEArray(*(getattr(chunk, name)[:, None] for name in OE_FIELDS))
+        out[start:end] = getPosInECI(columns, dts if dts.ndim == 1 else dts[start:end], tol=tol, model=model)
+    return out
+
+
+def propagateTLE(catalog: TypeTLECatalog, times: np.array, chunk_size: int=None, out: np.array=None, tol: float=1e-12, model: str="twobody") -> np.array:
+    """Propagate every satellite of a TLE catalog to the UTC datetime64 times (N,), returns (M, N, 3) [km]"""
+    times = np.asarray(times, dtype='datetime64[us]')
+    dts = (times[None, :] - catalog.epochs[:, None]) / np.timedelta64(1, 's')
+    return propagateCatalog(catalog.OE, dts, chunk_size=chunk_size, out=out, tol=tol, model=model)
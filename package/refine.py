@@ -0,0 +1,180 @@
+import numpy as np
+from typing import Tuple
+from .utility import CONSTANT
+from . import instrumentation
+
+
+def calStumpffC(z: np.array) -> np.array:
+    """Stumpff function C(z) = (1 - cos(sqrt(z))) / z, z < 0 uses cosh, z ~ 0 uses the series"""
+    z = np.asarray(z, dtype='float64')
+    small = np.abs(z) < 1e-8
+    z_safe = np.where(small, 1, z)
+    positive = np.sqrt(np.abs(z_safe))
+    C = np.where(z_safe > 0, (1 - np.cos(positive)) / z_safe, (np.cosh(positive) - 1) / -z_safe)
+    return np.where(small, 1 / 2 - z / 24, C)
+
+
+def calStumpffS(z: np.array) -> np.array:
+    """Stumpff function S(z) = (sqrt(z) - sin(sqrt(z))) / sqrt(z)^3, z < 0 uses sinh, z ~ 0 uses the series"""
+    z = np.asarray(z, dtype='float64')
+    small = np.abs(z) < 1e-8
+    z_safe = np.where(small, 1, z)
+    positive = np.sqrt(np.abs(z_safe))
+    S = np.where(z_safe > 0, (positive - np.sin(positive)) / positive**3, (np.sinh(positive) - positive) / positive**3)
+    return np.where(small, 1 / 6 - z / 120, S)
+
+
+def solveUniversalAnomaly(r0: np.array, vr0: np.array, alpha: np.array, dt: np.array, tol: float=1e-12, repeated: int=50) -> np.array:
+    """
+    Newton solver of the universal Kepler equation for chi [km^0.5], element-wise
+    sqrt(GM)*dt = r0*vr0/sqrt(GM) * chi^2 * C(z) + (1 - alpha*r0) * chi^3 * S(z) + r0*chi,    z = alpha*chi^2
+        - r0: distance [km], vr0: radial velocity [km/s], alpha: 1/a [1/km], dt: time of flight [s]
+    """
+    r0, vr0, alpha, dt = np.broadcast_arrays(*(np.asarray(value, dtype='float64') for value in (r0, vr0, alpha, dt)))
+    sqrt_GM = np.sqrt(CONSTANT.GM)
+    chi = np.array(sqrt_GM * np.abs(alpha) * dt, dtype='float64')
+    active = np.ones(chi.shape, dtype=bool)
+    counter = 0
+    while (counter < repeated and active.any()):
+        x, r, vr, a, t = chi[active], r0[active], vr0[active], alpha[active], dt[active]
+        z = a * x**2
+        C, S = calStumpffC(z), calStumpffS(z)
+        F = r * vr / sqrt_GM * x**2 * C + (1 - a * r) * x**3 * S + r * x - sqrt_GM * t
+        dF = r * vr / sqrt_GM * x * (1 - z * S) + (1 - a * r) * x**2 * C + r
+        step = F / dF
+        chi[active] = x - step
+        active[active] = np.abs(step) > tol * np.maximum(np.abs(x), 1)
+        counter += 1
+    return chi
+
+
+def calLagrangeCoefficients(R: np.array, V: np.array, dt: np.array) -> Tuple[np.array, np.array]:
+    """Exact Lagrange coefficients f, g of the state (R, V) (N, 3) after dt (N,) seconds, universal variables"""
+    r = np.linalg.norm(R, axis=-1)
+    vr = np.sum(R * V, axis=-1) / r
+    alpha = 2 / r - np.sum(V * V, axis=-1) / CONSTANT.GM
+    chi = solveUniversalAnomaly(r, vr, alpha, dt)
+    z = alpha * chi**2
+    f = 1 - chi**2 / r * calStumpffC(z)
+    g = dt - chi**3 / np.sqrt(CONSTANT.GM) * calStumpffS(z)
+    return f, g
+
+
+def calGibbs(r1: np.array, r2: np.array, r3: np.array) -> np.array:
+    """Gibbs's method: velocity at r2 from three coplanar position vectors (N, 3) [km] -> (N, 3) [km/s]"""
+    n1, n2, n3 = (np.linalg.norm(r, axis=-1)[..., None] for r in (r1, r2, r3))
+    C12, C23, C31 = np.cross(r1, r2), np.cross(r2, r3), np.cross(r3, r1)
+    N = n1 * C23 + n2 * C31 + n3 * C12
+    D = C12 + C23 + C31
+    S = r1 * (n2 - n3) + r2 * (n3 - n1) + r3 * (n1 - n2)
+    n, d = np.linalg.norm(N, axis=-1)[..., None], np.linalg.norm(D, axis=-1)[..., None]
+    return np.sqrt(CONSTANT.GM / n / d) * (np.cross(D, r2) / n2 + S)
+
+
+def calHerrickGibbs(r1: np.array, r2: np.array, r3: np.array, t1: np.array, t3: np.array) -> np.array:
+    """
+    Herrick-Gibbs velocity at r2 for closely spaced positions (N, 3) [km]
+    t1 = time1 - time2 (< 0), t3 = time3 - time2 (> 0) as in OrbitCalculate [s]
+    """
+    t1, t3 = np.asarray(t1, dtype='float64')[..., None], np.asarray(t3, dtype='float64')[..., None]
+    dt21, dt32, dt31 = -t1, t3, t3 - t1
+    n1, n2, n3 = (np.linalg.norm(r, axis=-1)[..., None] for r in (r1, r2, r3))
+    GM = CONSTANT.GM
+    return (-dt32 * (1 / (dt21 * dt31) + GM / (12 * n1**3)) * r1
+            + (dt32 - dt21) * (1 / (dt21 * dt32) + GM / (12 * n2**3)) * r2
+            + dt21 * (1 / (dt32 * dt31) + GM / (12 * n3**3)) * r3)
+
+
+def refineGauss(observers: np.array, directions: np.array, time_points: np.array, r2: np.array, v2: np.array,
+                repeated: int=50, tol: float=1e-10, velocity: str="lagrange", herrick_gibbs_angle: float=1) -> Tuple[np.array, np.array, np.array]:
+    """Iterative improvement of Gauss's method (N triplets)
+    Input:
+        - observers, directions, time_points: as OrbitCalculate.calculateBatch
+        - r2, v2: initial Gauss solution                    (N, 3) [km], [km/s]
+        - repeated: iteration budget
+        - tol: relative change of the slant ranges to stop
+        - velocity: final v2 from "lagrange" (f, g), "gibbs", "herrick-gibbs" or
+                    "auto" (Herrick-Gibbs if r1, r2, r3 are within herrick_gibbs_angle [deg], else Gibbs)
+    Output:
+        - r2, v2 refined                                    (N, 3) [km], [km/s]
+        - iterations of every triplet                       (N,)
+
+    The truncated f, g series of the initial solution are replaced by exact Lagrange coefficients
+    from universal variables, the slant ranges are recomputed and the loop repeats until they settle.
+    """
+    from .orbital import calGaussDeterminants
+
+    if velocity not in ("lagrange", "gibbs", "herrick-gibbs", "auto"):
+        raise ValueError("Velocity must be one of lagrange, gibbs, herrick-gibbs, auto")
+    if (repeated < 0 or tol < 0):
+        raise ValueError("Repeated must be int. Repeated and Tol must be positive.")
+
+    observers = np.asarray(observers, dtype='float64')
+    directions = np.asarray(directions, dtype='float64')
+    time_points = np.asarray(time_points, dtype='float64')
+    t1 = time_points[:, 0] - time_points[:, 1]
+    t3 = time_points[:, 2] - time_points[:, 1]
+    D0, D = calGaussDeterminants(observers, directions)
+
+    r2, v2 = np.array(r2, dtype='float64'), np.array(v2, dtype='float64')
+    # r1, r3 of the initial solution, only used if no iteration is run
+    f1, g1 = calLagrangeCoefficients(r2, v2, t1)
+    f3, g3 = calLagrangeCoefficients(r2, v2, t3)
+    r1 = f1[:, None] * r2 + g1[:, None] * v2
+    r3 = f3[:, None] * r2 + g3[:, None] * v2
+
+    rho = np.full((len(r2), 3), np.inf)
+    iterations = np.zeros(len(r2), dtype='int64')
+    active = np.ones(len(r2), dtype=bool)
+    counter = 0
+
+    while (counter < repeated and active.any()):
+        index = np.flatnonzero(active)
+        # A diverging triplet (e.g. hyperbolic blow-up of a poor initial guess) is stopped below, keeping its last finite state
+        with np.errstate(all='ignore'):
+            R, V = r2[index], v2[index]
+            f1, g1 = calLagrangeCoefficients(R, V, t1[index])
+            f3, g3 = calLagrangeCoefficients(R, V, t3[index])
+
+            denominator = f1 * g3 - f3 * g1
+            c1 = g3 / denominator
+            c3 = -g1 / denominator
+
+            Dn, D0n = D[index], D0[index]
+            rho_new = np.stack([(-Dn[:, 0, 0] + Dn[:, 1, 0] / c1 - c3 / c1 * Dn[:, 2, 0]) / D0n,
+                                (-c1 * Dn[:, 0, 1] + Dn[:, 1, 1] - c3 * Dn[:, 2, 1]) / D0n,
+                                (-c1 / c3 * Dn[:, 0, 2] + Dn[:, 1, 2] / c3 - Dn[:, 2, 2]) / D0n], axis=1)
+
+            positions = observers[index] + rho_new[..., None] * directions[index]
+            velocity_new = (f1[:, None] * positions[:, 2] - f3[:, None] * positions[:, 0]) / denominator[:, None]
+
+        finite = np.all(np.isfinite(positions), axis=(1, 2)) & np.all(np.isfinite(velocity_new), axis=1)
+        update = index[finite]
+        r1[update], r2[update], r3[update] = positions[finite, 0], positions[finite, 1], positions[finite, 2]
+        v2[update] = velocity_new[finite]
+        iterations[update] += 1
+
+        settled = np.all(np.abs(rho_new[finite] - rho[update]) <= tol * np.abs(rho_new[finite]), axis=1)
+        rho[update] = rho_new[finite]
+        active[update[settled]] = False
+        active[index[~finite]] = False
+        counter += 1
+
+    if velocity != "lagrange":
+        v2 = _getVelocityFromPositions(r1, r2, r3, t1, t3, velocity, herrick_gibbs_angle)
+    instrumentation.countSolver("refine", iterations, ~active)
+    return r2, v2, iterations
+
+
+def _getVelocityFromPositions(r1: np.array, r2: np.array, r3: np.array, t1: np.array, t3: np.array, velocity: str, herrick_gibbs_angle: float) -> np.array:
+    if velocity == "gibbs":
+        return calGibbs(r1, r2, r3)
+    if velocity == "herrick-gibbs":
+        return calHerrickGibbs(r1, r2, r3, t1, t3)
+
+    def angle(u: np.array, v: np.array) -> np.array:
+        cos = np.sum(u * v, axis=-1) / np.linalg.norm(u, axis=-1) / np.linalg.norm(v, axis=-1)
+        return np.rad2deg(np.arccos(np.clip(cos, -1, 1)))
+
+    close = np.maximum(angle(r1, r2), angle(r2, r3)) < herrick_gibbs_angle
+    return np.where(close[:, None], calHerrickGibbs(r1, r2, r3, t1, t3), calGibbs(r1, r2, r3))
@@ -0,0 +1,280 @@
+"""Asyncio front end of the batched Gauss's method
+
+    async with OrbitService(max_batch=256, max_latency=0.002) as service:
+        r2, v2 = await service.calculate(observers, directions, time_points)
+        await service.serveUnix("/tmp/doan.sock")    # optional transport, one JSON request per line
+
+Requests are queued and collected into micro-batches: a batch is closed when it holds max_batch requests or
+max_latency seconds after its first request arrived, then OrbitCalculate.calculateBatch solves it in a worker
+(a thread by default, any concurrent.futures executor works) while the next batch is collected.
+The queue holds at most max_queue requests: calculate waits for room, calculateNowait raises asyncio.QueueFull.
+stop finishes the batch being solved; queued requests and callers still waiting for room fail with
+RuntimeError("service stopped"), as do calls made after it.
+"""
+import asyncio
+import json
+import time
+from concurrent.futures import Executor, ThreadPoolExecutor
+from typing import List, NamedTuple, Optional, Tuple
+import numpy as np
+from .orbital import OrbitCalculate
+from .instrumentation import Metrics
+
+
+class TypeOrbitRequest(NamedTuple):
+    """One queued triplet of OrbitService
+        - observers: observers' positions in ECI        (3, 3) [km]
+        - directions: unit directions to satellite      (3, 3) [ ]
+        - time_points: times of the observations        (3,)   [s]
+        - future: resolved with (r2, v2)
+        - arrival: time.perf_counter() when queued      [s]
+    """
+    observers: np.array
+    directions: np.array
+    time_points: np.array
+    future: asyncio.Future
+    arrival: float
+
+
+def _solveBatch(observers: np.array, directions: np.array, time_points: np.array, options: dict) -> Tuple[np.array, np.array]:
+    # Module level, so a ProcessPoolExecutor can pickle it
+    return OrbitCalculate.calculateBatch(observers, directions, time_points, **options)
+
+
+class OrbitService(object):
+    """Micro-batching orbit determination service, see the module docstring
+
+    Metrics:
+        - queue_depth: requests waiting now, max_queue_depth: the most seen
+        - batch_sizes: number of batches of every size                  (max_batch + 1,)
+        - metrics: instrumentation.Metrics with the stages "request" (queueing to result, per request)
+          and "solve" (per batch), counters service.requests, service.batches, service.rejected, service.failed
+    """
+
+    def __init__(self, max_batch: int = 256, max_latency: float = 0.002, max_queue: int = 4096, executor: Executor = None,
+                 repeated: int = 100, alias: float = 1e-12, refine: int = 0, refine_tol: float = 1e-10, velocity: str = "lagrange") -> None:
+        if max_batch < 1 or max_queue < 1 or max_latency < 0:
+            raise ValueError("Max batch and Max queue must be positive. Max latency must not be negative.")
+        self.max_batch = max_batch
+        self.max_latency = max_latency
+        self.max_queue = max_queue
+        self._options = dict(repeated=repeated, alias=alias, refine=refine, refine_tol=refine_tol, velocity=velocity)
+        self._executor = executor
+        self._own_executor = executor is None
+
+        self.metrics = Metrics()
+        self.batch_sizes = np.zeros(max_batch + 1, dtype='int64')
+        self.max_queue_depth = 0
+        self._queue: Optional[asyncio.Queue] = None
+        self._runner: Optional[asyncio.Task] = None
+        self._stopping = False
+        self._servers = []
+
+    @property
+    def running(self) -> bool:
+        return self._runner is not None and not self._runner.done()
+
+    @property
+    def queue_depth(self) -> int:
+        return 0 if self._queue is None else self._queue.qsize()
+
+    async def start(self) -> None:
+        if self.running:
+            return
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="OrbitService")
+        self._queue = asyncio.Queue(maxsize=self.max_queue)
+        self._stopping = False
+        self._runner = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self) -> None:
+        """Close the transports, fail the queued requests, finish the batch being solved and shut the own worker down"""
+        self._stopping = True
+        for server in self._servers:
+            server.close()
+            await server.wait_closed()
+        self._servers = []
+        if self.running:
+            await self._drain()
+            self._queue.put_nowait(None)
+            await self._runner
+        self._runner = None
+        if self._own_executor and self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+    async def __aenter__(self) -> "OrbitService":
+        await self.start()
+        return self
+
+    async def __aexit__(self, *args) -> None:
+        await self.stop()
+
+    async def _drain(self) -> None:
+        """Fail the queued requests until the queue stays empty
+        Every request taken out wakes a caller blocked in calculate, which queues its request and fails it itself
+        """
+        while not self._queue.empty():
+            while not self._queue.empty():
+                request = self._queue.get_nowait()
+                if request is not None and not request.future.done():
+                    request.future.set_exception(RuntimeError("service stopped"))
+            await asyncio.sleep(0)
+
+    def _makeRequest(self, observers: np.array, directions: np.array, time_points: np.array) -> TypeOrbitRequest:
+        if self._stopping:
+            raise RuntimeError("service stopped")
+        if not self.running:
+            raise RuntimeError("OrbitService is not running")
+        observers = np.asarray(observers, dtype='float64')
+        directions = np.asarray(directions, dtype='float64')
+        time_points = np.asarray(time_points, dtype='float64')
+        if observers.shape != (3, 3) or directions.shape != (3, 3) or time_points.shape != (3,):
+            raise ValueError("Observers and Directions must be arrays of shape (3, 3), Time points of shape (3,)")
+        directions = directions / np.linalg.norm(directions, axis=1)[:, None]
+        return TypeOrbitRequest(observers, directions, time_points, asyncio.get_running_loop().create_future(), time.perf_counter())
+
+    def _queued(self) -> None:
+        self.metrics.count("service.requests")
+        self.max_queue_depth = max(self.max_queue_depth, self._queue.qsize())
+
+    async def calculate(self, observers: np.array, directions: np.array, time_points: np.array) -> Tuple[np.array, np.array]:
+        """r2, v2 of one triplet as OrbitCalculate.calculate, waits while the queue is full"""
+        request = self._makeRequest(observers, directions, time_points)
+        await self._queue.put(request)
+        if self._stopping:
+            # The room was made by stop
+            if not request.future.done():
+                request.future.set_exception(RuntimeError("service stopped"))
+        else:
+            self._queued()
+        return await request.future
+
+    def calculateNowait(self, observers: np.array, directions: np.array, time_points: np.array) -> asyncio.Future:
+        """Future of r2, v2 of one triplet, raises asyncio.QueueFull instead of waiting"""
+        request = self._makeRequest(observers, directions, time_points)
+        try:
+            self._queue.put_nowait(request)
+        except asyncio.QueueFull:
+            self.metrics.count("service.rejected")
+            raise
+        self._queued()
+        return request.future
+
+    async def _collect(self, first: TypeOrbitRequest) -> Tuple[List[TypeOrbitRequest], bool]:
+        """Batch starting with first, closed at max_batch or max_latency after its arrival -> (batch, stop)"""
+        batch = [first]
+        deadline = first.arrival + self.max_latency
+        while len(batch) < self.max_batch:
+            if self._queue.empty():
+                timeout = deadline - time.perf_counter()
+                if timeout <= 0:
+                    break
+                try:
+                    request = await asyncio.wait_for(self._queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+            else:
+                request = self._queue.get_nowait()
+            if request is None:
+                return batch, True
+            batch.append(request)
+        return batch, False
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        stop = False
+        while not stop:
+            first = await self._queue.get()
+            if first is None:
+                break
+            batch, stop = await self._collect(first)
+            batch = [request for request in batch if not request.future.done()]
+            if not batch:
+                continue
+            self.batch_sizes[len(batch)] += 1
+            self.metrics.count("service.batches")
+
+            observers = np.stack([request.observers for request in batch])
+            directions = np.stack([request.directions for request in batch])
+            time_points = np.stack([request.time_points for request in batch])
+            start = time.perf_counter()
+            try:
+                r2, v2 = await loop.run_in_executor(self._executor, _solveBatch, observers, directions, time_points, self._options)
+            except Exception as error:
+                self.metrics.count("service.failed", len(batch))
+                for request in batch:
+                    if not request.future.done():
+                        request.future.set_exception(error)
+                continue
+            end = time.perf_counter()
+            self.metrics.observe("solve", end - start)
+            for k, request in enumerate(batch):
+                if not request.future.done():
+                    request.future.set_result((r2[k], v2[k]))
+                self.metrics.observe("request", end - request.arrival)
+
+    def getStats(self) -> dict:
+        batches = int(self.batch_sizes.sum())
+        sizes = np.flatnonzero(self.batch_sizes)
+        return {"queue_depth": self.queue_depth, "max_queue_depth": self.max_queue_depth, "batches": batches,
+                "mean_batch_size": float(np.arange(len(self.batch_sizes)) @ self.batch_sizes / batches) if batches else 0.0,
+                "batch_sizes": {int(size): int(self.batch_sizes[size]) for size in sizes}, **self.metrics.toDict()}
+
+    def toPrometheus(self, prefix: str = "doan_service") -> str:
+        """Metrics, queue depth gauges and the batch size histogram in the Prometheus text exposition format"""
+        lines = [f"# TYPE {prefix}_queue_depth gauge", f"{prefix}_queue_depth {self.queue_depth}",
+                 f"# TYPE {prefix}_queue_depth_max gauge", f"{prefix}_queue_depth_max {self.max_queue_depth}",
+                 f"# TYPE {prefix}_batch_size histogram"]
+        cumulative = np.cumsum(self.batch_sizes)
+        bounds = [bound for bound in (1, 2, 4, 8, 16, 32, 64, 128, 256, 512, 1024) if bound < self.max_batch] + [self.max_batch]
+        for bound in bounds:
+            lines.append(f'{prefix}_batch_size_bucket{{le="{bound}"}} {cumulative[bound]}')
+        lines.append(f'{prefix}_batch_size_bucket{{le="+Inf"}} {cumulative[-1]}')
+        lines.append(f"{prefix}_batch_size_sum {np.arange(len(self.batch_sizes)) @ self.batch_sizes}")
+        lines.append(f"{prefix}_batch_size_count {cumulative[-1]}")
+        return self.metrics.toPrometheus(prefix) + "\n".join(lines) + "\n"
+
+    async def serveUnix(self, path: str, max_pending: int = 1024) -> asyncio.AbstractServer:
+        """Serve newline-delimited JSON on a Unix socket, stopped with the service
+        Request:  {"id": any, "observers": [[x, y, z] * 3], "directions": [[x, y, z] * 3], "time_points": [t1, t2, t3]}
+        Response: {"id": any, "r2": [x, y, z], "v2": [vx, vy, vz]} or {"id": any, "error": message}, in completion order
+        At most max_pending requests of a connection are in flight, then reading the connection pauses
+        """
+        server = await asyncio.start_unix_server(lambda reader, writer: self._handleConnection(reader, writer, max_pending), path=path)
+        self._servers.append(server)
+        return server
+
+    async def _handleConnection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter, max_pending: int) -> None:
+        pending = asyncio.Semaphore(max_pending)
+        tasks = set()
+
+        async def respond(line: bytes) -> None:
+            identifier = None
+            try:
+                message = json.loads(line)
+                identifier = message.get("id")
+                r2, v2 = await self.calculate(message["observers"], message["directions"], message["time_points"])
+                response = {"id": identifier, "r2": r2.tolist(), "v2": v2.tolist()}
+            except Exception as error:
+                response = {"id": identifier, "error": f"{type(error).__name__}: {error}"}
+            finally:
+                pending.release()
+            writer.write(json.dumps(response).encode() + b"\n")
+            await writer.drain()
+
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                if not line.strip():
+                    continue
+                await pending.acquire()
+                task = asyncio.get_running_loop().create_task(respond(line))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+            if tasks:
+                await asyncio.gather(*tasks)
+        finally:
+            writer.close()
@@ -0,0 +1,135 @@
+import numpy as np
+from typing import AsyncIterable, AsyncIterator, Iterable, Iterator, NamedTuple, Optional, Tuple
+from .orbital import OrbitCalculate
+
+
+class TypeMeasurement(NamedTuple):
+    """One observation of a sensor feed
+        - time: seconds from a common epoch             [s]
+        - observer: observer's position in ECI  (3,)    [km]
+        - direction: observer to satellite      (3,)    [ ], normalized on arrival
+    """
+    time: float
+    observer: np.array
+    direction: np.array
+
+
+class TypeStreamSolution(NamedTuple):
+    """Gauss solution of the triplet selected for a new measurement
+        - indices: sequence numbers of the measurements (i, j, k), k is the new one
+        - time_points: their times          (3,)    [s]
+        - r2, v2: state at time_points[1]   (3,)    [km], [km/s]
+    """
+    indices: Tuple[int, int, int]
+    time_points: np.array
+    r2: np.array
+    v2: np.array
+
+
+class StreamingOrbitCalculate(object):
+    """Sliding-window Gauss's method over a stream of measurements
+
+    The last capacity measurements are kept in a ring buffer. Every new measurement k is the last point of
+    at most one triplet (i, j, k): j is the newest buffered measurement with t_k - t_j >= min_spacing,
+    i the newest with t_j - t_i >= min_spacing, and the triplet must span at most max_span seconds.
+    Triplets with nearly coplanar directions (|D0| < min_determinant) are skipped.
+
+    The cross products p_a x p_b of Gauss's determinants are cached per pair of sequence numbers, so the
+    pair (i, j) of a new triplet is reused from an earlier triplet that ended in j. Cached products
+    are dropped with their measurements, memory is bounded by capacity.
+    """
+
+    def __init__(self, capacity: int = 64, min_spacing: float = 10, max_span: float = np.inf, min_determinant: float = 1e-12,
+                 repeated: int = 100, alias: float = 1e-12, refine: int = 0, refine_tol: float = 1e-10, velocity: str = "lagrange") -> None:
+        if capacity < 3 or min_spacing < 0 or max_span <= 0:
+            raise ValueError("Capacity must be at least 3. Min spacing and Max span must be positive.")
+        self.capacity = capacity
+        self.min_spacing = min_spacing
+        self.max_span = max_span
+        self.min_determinant = min_determinant
+        self._options = dict(repeated=repeated, alias=alias, refine=refine, refine_tol=refine_tol, velocity=velocity)
+
+        self._times = np.empty(capacity)
+        self._observers = np.empty((capacity, 3))
+        self._directions = np.empty((capacity, 3))
+        self._crosses = {}
+        self.count = 0
+        self.cross_hits = 0
+        self.cross_misses = 0
+
+    def __len__(self) -> int:
+        return min(self.count, self.capacity)
+
+    def _cross(self, a: int, b: int) -> np.array:
+        key = (a, b)
+        cross = self._crosses.get(key)
+        if cross is None:
+            self.cross_misses += 1
+            cross = np.cross(self._directions[a % self.capacity], self._directions[b % self.capacity])
+            self._crosses[key] = cross
+        else:
+            self.cross_hits += 1
+        return cross
+
+    def _select(self, k: int) -> Optional[Tuple[int, int]]:
+        """Middle and first measurement of the triplet ending in k, None if there is none"""
+        oldest = max(0, k + 1 - self.capacity)
+        sequence = np.arange(k - 1, oldest - 1, -1)
+        times = self._times[sequence % self.capacity]
+        t_k = self._times[k % self.capacity]
+
+        middle = np.flatnonzero(t_k - times >= self.min_spacing)
+        if len(middle) == 0:
+            return None
+        t_j = times[middle[0]]
+        first = np.flatnonzero((t_j - times >= self.min_spacing) & (t_k - times <= self.max_span))
+        if len(first) == 0:
+            return None
+        return int(sequence[first[0]]), int(sequence[middle[0]])
+
+    def update(self, measurement: Tuple[float, np.array, np.array]) -> Optional[TypeStreamSolution]:
+        """Add a measurement (time, observer, direction), return the solution of its triplet or None"""
+        time, observer, direction = measurement
+        direction = np.asarray(direction, dtype='float64')
+        if self.count > 0 and time <= self._times[(self.count - 1) % self.capacity]:
+            raise ValueError("Measurements must arrive in increasing time")
+
+        k = self.count
+        slot = k % self.capacity
+        self._times[slot] = time
+        self._observers[slot] = observer
+        self._directions[slot] = direction / np.linalg.norm(direction)
+        self.count += 1
+        # Drop the crosses of the measurement overwritten in the ring buffer
+        oldest = k + 1 - self.capacity
+        if oldest > 0:
+            self._crosses = {key: value for key, value in self._crosses.items() if key[0] >= oldest}
+
+        selection = self._select(k)
+        if selection is None:
+            return None
+        i, j = selection
+        crosses = np.stack([self._cross(j, k), self._cross(i, k), self._cross(i, j)])
+        slots = np.array([i, j, k]) % self.capacity
+        directions = self._directions[slots]
+        if abs(directions[0] @ crosses[0]) < self.min_determinant:
+            return None
+
+        time_points = self._times[slots]
+        r2, v2 = OrbitCalculate.calculateBatch(self._observers[slots][None], directions[None], time_points[None],
+                                               crosses=crosses[None], **self._options)
+        return TypeStreamSolution((i, j, k), time_points, r2[0], v2[0])
+
+    def process(self, measurements: Iterable[Tuple[float, np.array, np.array]]) -> Iterator[TypeStreamSolution]:
+        """Solutions of an iterator of measurements, as they become available"""
+        for measurement in measurements:
+            solution = self.update(measurement)
+            if solution is not None:
+                yield solution
+
+    async def processAsync(self, measurements: AsyncIterable[Tuple[float, np.array, np.array]]) -> AsyncIterator[TypeStreamSolution]:
+        """Solutions of an async iterator of measurements, as they become available"""
+        async for measurement in measurements:
+            solution = self.update(measurement)
+            if solution is not None:
+                yield solution
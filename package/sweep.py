@@ -0,0 +1,106 @@
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from datetime import datetime
+from multiprocessing import RawArray
+from typing import Tuple
+from .utility import OE_FIELDS, TypeOE, TypeOEArray, TypeLatLong, toECIfromLatLongBatch
+from .propagation import getStateInECI
+from .orbital import OrbitCalculate
+
+
+@dataclass(eq=False)
+class TypeSweepResult:
+    """Result of runSweep, arrays are indexed [offset, spacing, perturbation]
+        - r2, v2: Gauss solutions at the middle time point          (G1, G2, G3, 3) [km], [km/s]
+        - r2_true, v2_true: states of the perturbed elements         (G1, G2, G3, 3) [km], [km/s]
+    """
+    observer_offsets: np.array
+    spacings: np.array
+    perturbations: np.array
+    r2: np.array
+    v2: np.array
+    r2_true: np.array
+    v2_true: np.array
+
+
+# Sweep parameters and shared output arrays of a worker process, set once by _initWorker
+_worker = {}
+
+
+def _initWorker(OE: TypeOE, observer: TypeLatLong, time: datetime, center: float, observer_offsets: np.array, spacings: np.array,
+                perturbations: np.array, buffer, shape: Tuple[int, int], refine: int) -> None:
+    _worker.update(OE=OE, observer=observer, time=time, center=center, observer_offsets=observer_offsets, spacings=spacings,
+                   perturbations=perturbations, refine=refine,
+                   output=np.frombuffer(buffer, dtype='float64').reshape(shape))
+
+
+def _solveChunk(start: int, end: int) -> int:
+    """Solve the grid points [start, end) and write them into the shared output"""
+    parameters = _worker
+    shape = (len(parameters["observer_offsets"]), len(parameters["spacings"]), len(parameters["perturbations"]))
+    i_offset, i_spacing, i_perturbation = np.unravel_index(np.arange(start, end), shape)
+
+    # Perturbed elements, one column per grid point: (n, 1) against the (n, 3) time points
+    perturbation = parameters["perturbations"][i_perturbation]
+    OE = TypeOEArray(*(getattr(parameters["OE"], name) + perturbation[:, k, None] for k, name in enumerate(OE_FIELDS)))
+    spacing = parameters["spacings"][i_spacing]
+    time_points = parameters["center"] + spacing[:, None] * np.array([-1, 0, 1], dtype='float64')
+
+    satellite, velocity = getStateInECI(OE, time_points)
+    observers = toECIfromLatLongBatch(parameters["observer"], parameters["time"], time_points)
+    directions = satellite - observers
+    directions /= np.linalg.norm(directions, axis=-1)[..., None]
+    # As OrbitCalculate.preCalculate, the offset is an error of the observers' positions, not of the directions
+    observers += parameters["observer_offsets"][i_offset][:, None, :]
+
+    r2, v2 = OrbitCalculate.calculateBatch(observers, directions, time_points, refine=parameters["refine"])
+    output = parameters["output"]
+    output[start:end, 0:3] = r2
+    output[start:end, 3:6] = v2
+    output[start:end, 6:9] = satellite[:, 1]
+    output[start:end, 9:12] = velocity[:, 1]
+    return end - start
+
+
+def runSweep(OE: TypeOE, observer: TypeLatLong, time: datetime, observer_offsets: np.array=None, spacings: np.array=None,
+             perturbations: np.array=None, center: float=4000, refine: int=0, workers: int=None, chunk_size: int=4096) -> TypeSweepResult:
+    """Gauss's method over the grid observer_offsets x spacings x perturbations, distributed over a process pool
+    Input:
+        - OE, observer, time: as Simulation
+        - observer_offsets: errors added to the observers' positions, (G1, 3) or (G1,) for the same error on all axes [km]
+        - spacings: the time points are (center - spacing, center, center + spacing)    (G2,) [s]
+        - perturbations: added to the elements' fields in the order of OE_FIELDS       (G3, 6)
+        - refine: refineGauss iterations of every solution
+        - workers: processes of the pool, 0 solves in this process
+        - chunk_size: grid points of one task
+    Every task only sends (start, end), the results are written by the workers into shared memory.
+    """
+    observer_offsets = np.zeros((1, 3)) if observer_offsets is None else np.asarray(observer_offsets, dtype='float64')
+    if observer_offsets.ndim == 1:
+        observer_offsets = np.repeat(observer_offsets[:, None], 3, axis=1)
+    spacings = np.array([100.0]) if spacings is None else np.atleast_1d(np.asarray(spacings, dtype='float64'))
+    perturbations = np.zeros((1, 6)) if perturbations is None else np.asarray(perturbations, dtype='float64').reshape(-1, 6)
+    if chunk_size <= 0:
+        raise ValueError("Chunk size must be positive")
+
+    grid_shape = (len(observer_offsets), len(spacings), len(perturbations))
+    size = int(np.prod(grid_shape))
+    buffer = RawArray('d', size * 12)
+    arguments = (OE, observer, time, center, observer_offsets, spacings, perturbations, buffer, (size, 12), refine)
+    chunks = [(start, min(start + chunk_size, size)) for start in range(0, size, chunk_size)]
+
+    if workers == 0:
+        _initWorker(*arguments)
+        for start, end in chunks:
+            _solveChunk(start, end)
+        _worker.clear()
+    elif chunks:
+        # An empty grid has no chunks, the pool is not started for it
+        with ProcessPoolExecutor(max_workers=workers, initializer=_initWorker, initargs=arguments) as executor:
+            starts, ends = zip(*chunks)
+            for _ in executor.map(_solveChunk, starts, ends):
+                pass
+
+    output = np.frombuffer(buffer, dtype='float64').reshape(grid_shape + (12,))
+    return TypeSweepResult(observer_offsets, spacings, perturbations, output[..., 0:3], output[..., 3:6], output[..., 6:9], output[..., 9:12])
@@ -0,0 +1,147 @@
+import numpy as np
+from dataclasses import dataclass
+from typing import Iterator, Iterable, List, NamedTuple, Tuple, Union, TextIO
+from .utility import TypeOEArray
+
+
+@dataclass(eq=False)
+class TypeTLECatalog:
+    """Satellites of a Two-Line-Element catalog as a structure of arrays
+        - names: satellite names (line 0, empty if the catalog has no name lines)  (M,)
+        - catalog_numbers: satellite catalog numbers                                (M,)
+        - epochs: element set epochs (UTC)                                          (M,) datetime64[us]
+        - mean_motion: mean motion                                                  (M,) [rev/day]
+        - OE: orbital elements at the epochs                                        TypeOEArray [km], [rad]
+    """
+    names: np.array
+    catalog_numbers: np.array
+    epochs: np.array
+    mean_motion: np.array
+    OE: TypeOEArray
+
+    def __len__(self) -> int:
+        return len(self.catalog_numbers)
+
+    def __getitem__(self, index) -> "TypeTLECatalog":
+        if np.ndim(index) == 0 and not isinstance(index, slice):
+            index = [index]
+        return TypeTLECatalog(self.names[index], self.catalog_numbers[index], self.epochs[index], self.mean_motion[index], self.OE[index])
+
+    def __repr__(self):
+        return f"TLECatalog(size: {len(self)})"
+
+
+class TypeSkippedTLE(NamedTuple):
+    """Malformed record left out by iterTLE with errors="skip"
+        - line_number: line of the input where the record starts (1-based)
+        - lines: the lines of the record, name line included
+        - reason: what is wrong with it
+    """
+    line_number: int
+    lines: Tuple[str, ...]
+    reason: str
+
+
+def checksumTLE(line: str) -> bool:
+    """Modulo 10 checksum of a TLE line: digits count their value, '-' counts 1"""
+    total = sum(int(char) if char.isdigit() else char == '-' for char in line[:68])
+    return total % 10 == int(line[68])
+
+
+def iterTLE(lines: Iterable[str], validate: bool=False, errors: str="raise", skipped: List[TypeSkippedTLE]=None) -> Iterator[Tuple[str, str, str]]:
+    """Stream (name, line1, line2) records from TLE text, both 2-line and 3-line formats
+    Malformed records (a line shorter than 69 characters, a line 1 or line 2 without the other one, a wrong
+    checksum if validate) raise ValueError with their line number, or with errors="skip" they are left out
+    and appended to skipped as TypeSkippedTLE
+    """
+    if errors not in ("raise", "skip"):
+        raise ValueError("Errors must be raise or skip")
+
+    def reject(line_number: int, record: Tuple[str, ...], reason: str) -> None:
+        if errors == "raise":
+            raise ValueError(f"Malformed TLE record at line {line_number}: {reason}")
+        if skipped is not None:
+            skipped.append(TypeSkippedTLE(line_number, tuple(line for line in record if line), reason))
+
+    name = ""
+    line1 = None
+    start = 0
+    for line_number, line in enumerate(lines, 1):
+        line = line.rstrip("\r\n")
+        if not line.strip():
+            continue
+        if line1 is not None:
+            if line.startswith("2 "):
+                if len(line1) < 69 or len(line) < 69:
+                    reject(start, (name, line1, line), "line 1 and line 2 must have 69 characters")
+                elif validate and not (checksumTLE(line1) and checksumTLE(line)):
+                    reject(start, (name, line1, line), "wrong checksum")
+                else:
+                    yield name, line1, line
+                name = ""
+                line1 = None
+                continue
+            reject(start, (name, line1), f"expected line 2 after line 1, got: {line!r}")
+            name = ""
+            line1 = None
+        # Line 1 starts the record, unless a name line already did
+        if line.startswith("1 "):
+            line1 = line
+            start = start if name else line_number
+        elif line.startswith("2 "):
+            reject(line_number, (name, line), "line 2 without line 1")
+            name = ""
+        else:
+            name = line.strip()
+            start = line_number
+
+    if line1 is not None:
+        reject(start, (name, line1), "incomplete TLE record at the end of input")
+
+
+def _parseChunk(records) -> Tuple[np.array, np.array, np.array, np.array]:
+    """Convert the fixed columns of a chunk of records in bulk"""
+    names = np.array([record[0] for record in records], dtype=object)
+    line1 = [record[1] for record in records]
+    line2 = [record[2] for record in records]
+
+    catalog_numbers = np.array([line[2:7] for line in line1], dtype='int64')
+
+    # Epoch: YYDDD.DDDDDDDD, years 57-99 are 19xx
+    year = np.array([line[18:20] for line in line1], dtype='int64')
+    year = np.where(year < 57, 2000 + year, 1900 + year)
+    day = np.array([line[20:32] for line in line1], dtype='float64')
+    epochs = (year - 1970).astype('datetime64[Y]').astype('datetime64[us]') + np.round((day - 1) * 86400e6).astype('timedelta64[us]')
+
+    elements = np.array([(line[8:16], line[17:25], "0." + line[26:33].strip(), line[34:42], line[43:51], line[52:63]) for line in line2], dtype='float64')
+    elements.shape = (len(records), 6)
+    return names, catalog_numbers, epochs, elements
+
+
+def readTLE(source: Union[str, TextIO], validate: bool=False, chunk_size: int=8192, errors: str="raise",
+            skipped: List[TypeSkippedTLE]=None) -> TypeTLECatalog:
+    """Read a whole TLE catalog (path or open text file) into a TypeTLECatalog
+    Angles are converted to [rad] and semimajor axes are calculated from mean motion in bulk
+    If validate, records with a wrong checksum are malformed; errors and skipped as iterTLE
+    """
+    if isinstance(source, str):
+        with open(source, "r") as file:
+            return readTLE(file, validate=validate, chunk_size=chunk_size, errors=errors, skipped=skipped)
+
+    chunks = []
+    records = []
+    for record in iterTLE(source, validate=validate, errors=errors, skipped=skipped):
+        records.append(record)
+        if len(records) == chunk_size:
+            chunks.append(_parseChunk(records))
+            records = []
+    if records or not chunks:
+        chunks.append(_parseChunk(records))
+
+    names, catalog_numbers, epochs, elements = (np.concatenate(column) for column in zip(*chunks))
+
+    inclination, right_ascension, eccentricity, argument_of_perigee, mean_anomaly, mean_motion = elements.T
+    OE = TypeOEArray.fromMeanMotion(eccentricity=eccentricity, mean_motion=mean_motion,
+                                    inclination=np.deg2rad(inclination), right_ascension=np.deg2rad(right_ascension),
+                                    argument_of_perigee=np.deg2rad(argument_of_perigee), mean_anomaly=np.deg2rad(mean_anomaly))
+    return TypeTLECatalog(names, catalog_numbers, epochs, np.ascontiguousarray(mean_motion), OE)
@@ -1,7 +1,9 @@
-from typing import TypedDict, NamedTuple
+from typing import TypedDict, NamedTuple, Tuple
 from dataclasses import dataclass
 import numpy as np
 from datetime import datetime
+from functools import lru_cache
+from . import backend, instrumentation
 
 
 class CONSTANT():
@@ -15,6 +17,8 @@ class CONSTANT():
     M = 5.972 * 10**24  # Earth Mass (kg)
     R = 6367.5  # Earth Radius(km)
     GM = G * M  # Earth's standard gravitational parameter [km^3.s^-2]
+    J2 = 1.08262668 * 10**-3  # Earth's second zonal harmonic
+    R_EQUATOR = 6378.137  # Earth Equatorial Radius(km), reference radius of J2
 
 
 @dataclass
@@ -43,7 +47,8 @@ class TypeOE:
     argument_of_perigee: float
     mean_anomaly: float
 
-    static = CONSTANT.GM**(1 / 3)
+    # No per-instance dict: millions of element sets are held at once
+    __slots__ = ("eccentricity", "semimajor_axis", "inclination", "right_ascension", "argument_of_perigee", "mean_anomaly")
 
     """Using mean_motion to CALCULATE semimajor_axis IF semimajor_axis is NOT PROVIDED"""
 
@@ -55,8 +60,7 @@ class TypeOE:
         self.mean_anomaly = mean_anomaly
 
         if semimajor_axis is None:
-            if mean_motion is not None:
-                self.semimajor_axis = CONSTANT.GM**(1 / 3) / (2 * CONSTANT.PI * mean_motion / 86400)**(2 / 3)
+            self.semimajor_axis = None if mean_motion is None else calSemimajorAxis(mean_motion)
         else:
             self.semimajor_axis = semimajor_axis
 
@@ -64,6 +68,64 @@ class TypeOE:
         return f"OE(eccentricity: {self.eccentricity}, semimajor_axis: {self.semimajor_axis}, inclination: {self.inclination},right_ascension: {self.right_ascension}, argument_of_perigee: {self.argument_of_perigee}, mean_anomaly: {self.mean_anomaly})"
 
 
+@dataclass(eq=False)
+class TypeOEArray:
+    """Orbital elements of M satellites as a structure of arrays
+    Every field is a float64 array of shape (M,) in the units of TypeOE ([km], [rad])
+    Indexing with an int returns a TypeOE, indexing with a slice or an index array returns a TypeOEArray
+    Fields of the common shape are kept without copying, so fromRecords gives views into an OE_DTYPE array
+    """
+    eccentricity: np.array
+    semimajor_axis: np.array
+    inclination: np.array
+    right_ascension: np.array
+    argument_of_perigee: np.array
+    mean_anomaly: np.array
+
+    def __post_init__(self):
+        fields = [np.asarray(getattr(self, name), dtype='float64') for name in OE_FIELDS]
+        shape = np.broadcast_shapes(*(value.shape for value in fields))
+        for name, value in zip(OE_FIELDS, fields):
+            setattr(self, name, np.atleast_1d(value if value.shape == shape else np.array(np.broadcast_to(value, shape))))
+
+    @classmethod
+    def fromMeanMotion(cls, eccentricity: np.array, mean_motion: np.array, inclination: np.array, right_ascension: np.array, argument_of_perigee: np.array, mean_anomaly: np.array) -> "TypeOEArray":
+        """Using mean_motion[rev/day] to CALCULATE semimajor_axis of all satellites at once"""
+        return cls(eccentricity, calSemimajorAxis(mean_motion), inclination, right_ascension, argument_of_perigee, mean_anomaly)
+
+    @classmethod
+    def fromOEs(cls, OEs) -> "TypeOEArray":
+        return cls(*(np.array([getattr(OE, name) for OE in OEs], dtype='float64') for name in OE_FIELDS))
+
+    @classmethod
+    def fromRecords(cls, records: np.array) -> "TypeOEArray":
+        """Zero-copy view of an OE_DTYPE array, writes through the fields change the records"""
+        return cls(*(records[name] for name in OE_FIELDS))
+
+    def toRecords(self) -> np.array:
+        """Copy into an OE_DTYPE array, one 48-byte record per satellite"""
+        records = np.empty(self.eccentricity.shape, dtype=OE_DTYPE)
+        for name in OE_FIELDS:
+            records[name] = getattr(self, name)
+        return records
+
+    def __len__(self) -> int:
+        return len(self.eccentricity)
+
+    def __getitem__(self, index):
+        if np.ndim(index) == 0 and not isinstance(index, slice):
+            return TypeOE(**{name: float(getattr(self, name)[index]) for name in OE_FIELDS})
+        return TypeOEArray(*(getattr(self, name)[index] for name in OE_FIELDS))
+
+    def __repr__(self):
+        return f"OEArray(size: {len(self)})"
+
+
+OE_FIELDS = ("eccentricity", "semimajor_axis", "inclination", "right_ascension", "argument_of_perigee", "mean_anomaly")
+# Record layout of TypeOE for large catalogs, see TypeOEArray.fromRecords / toRecords
+OE_DTYPE = np.dtype([(name, 'float64') for name in OE_FIELDS])
+
+
 class TypeLatLong(NamedTuple):
     """The "latitude" (abbreviation: Lat., φ, or phi) of a point on Earth's surface is the angle between the equatorial plane and the straight line that passes through that point and through (or close to) the center of the Earth.
     Lines joining points of the same latitude trace circles on the surface of Earth called parallels, as they are parallel to the Equator and to each other. 
@@ -81,10 +143,19 @@ class TypeLatLong(NamedTuple):
     latitude: float
     longtitude: float
 
+    @classmethod
+    def fromRecords(cls, records: np.array) -> "TypeLatLong":
+        """Zero-copy TypeLatLong of (K,) arrays viewing a LATLONG_DTYPE array, for toECIfromLatLongBatch"""
+        return cls(records["latitude"], records["longtitude"])
+
     def __repr__(self):
         return f"LatLong(Latitude={self.latitude}, Longtitude={self.longtitude})"
 
 
+# Record layout of TypeLatLong for large observer sets [deg]
+LATLONG_DTYPE = np.dtype([("latitude", 'float64'), ("longtitude", 'float64')])
+
+
 class TypeXYZ(NamedTuple):
     """Every point that is expressed in ellipsoidal coordinates can be expressed as an rectilinear x y z (Cartesian) coordinate.
     Cartesian coordinates simplify many mathematical calculations. The Cartesian systems of different datums are not equivalent.
@@ -97,8 +168,20 @@ class TypeXYZ(NamedTuple):
         return f"Coordinate(X={self.x:0.4f}, Y={self.y:0.4f}, Z={self.z:g})"
 
 
+# Calculate Semimajor Axis from Mean Motion
+def calSemimajorAxis(mean_motion):
+    """
+    Semimajor Axis a(km) of Satellite which Mean Motion n(rev/day), works on arrays
+    Kepler III
+    a^3 * n^2 = GM
+    """
+    return CONSTANT.GM**(1 / 3) / (2 * CONSTANT.PI * np.asarray(mean_motion, dtype='float64') / 86400)**(2 / 3)
+
+
 # CosinMatrix Transfrom ECI to PQW:
 def getMatECItoPQW(omega: float=0, i: float=0, sigma: float=0) -> np.array:
+    if backend.isCompiled():
+        return backend.getKernel("matECItoPQW")(float(omega), float(i), float(sigma))
 
     RzO = np.array([[np.cos(omega), np.sin(omega), 0], [-np.sin(omega), np.cos(omega), 0], [0, 0, 1]])
     RzS = np.array([[np.cos(sigma), np.sin(sigma), 0], [-np.sin(sigma), np.cos(sigma), 0], [0, 0, 1]])
@@ -107,6 +190,30 @@ def getMatECItoPQW(omega: float=0, i: float=0, sigma: float=0) -> np.array:
     return RzO @ RxI @ RzS
 
 
+# Stacked CosinMatrices Transfrom ECI to PQW for arrays of angles
+def getMatECItoPQWArray(omega: np.array=0, i: np.array=0, sigma: np.array=0) -> np.array:
+    """
+    Same as getMatECItoPQW, returns an array of shape broadcast(omega, i, sigma) + (3, 3)
+    """
+    omega, i, sigma = np.broadcast_arrays(np.asarray(omega, dtype='float64'), np.asarray(i, dtype='float64'), np.asarray(sigma, dtype='float64'))
+    cosO, sinO = np.cos(omega), np.sin(omega)
+    cosI, sinI = np.cos(i), np.sin(i)
+    cosS, sinS = np.cos(sigma), np.sin(sigma)
+
+    # RzO @ RxI @ RzS multiplied out
+    mat = np.empty(omega.shape + (3, 3))
+    mat[..., 0, 0] = cosO * cosS - sinO * cosI * sinS
+    mat[..., 0, 1] = cosO * sinS + sinO * cosI * cosS
+    mat[..., 0, 2] = sinO * sinI
+    mat[..., 1, 0] = -sinO * cosS - cosO * cosI * sinS
+    mat[..., 1, 1] = -sinO * sinS + cosO * cosI * cosS
+    mat[..., 1, 2] = cosO * sinI
+    mat[..., 2, 0] = sinI * sinS
+    mat[..., 2, 1] = -sinI * cosS
+    mat[..., 2, 2] = cosI
+    return mat
+
+
 # Calculate Mean Abnomaly
 def calMeanAnomaly(M0: float, a: float, dt: float) -> float:
     """
@@ -129,12 +236,81 @@ def calEccentricAnomaly(M, e, E0=1, repeated=10000, alias=0.1) -> float:
     Using Kepler Equation to solve E(rad)
     M = E - e * sin(E)
     """
+    if np.ndim(M) == 0 and np.ndim(e) == 0:
+        if backend.isCompiled():
+            E0, counter, _ = backend.getKernel("keplerE")(float(M), float(e), float(E0), int(repeated), float(alias))
+        else:
+            counter = 0
+            while(counter < repeated and np.abs(M + e * np.sin(E0) - E0) > alias):
+                E0 -= (E0 - e * np.sin(E0) - M) / (1 - e * np.cos(E0))
+                counter += 1
+
+        if instrumentation.isEnabled():
+            instrumentation.countSolver("kepler", counter, np.abs(M + e * np.sin(E0) - E0) <= alias)
+        return E0
+
+    # Array input: same iteration, only the unconverged elements are updated
+    M, e = np.broadcast_arrays(np.asarray(M, dtype='float64'), np.asarray(e, dtype='float64'))
+    E = np.array(np.broadcast_to(E0, M.shape), dtype='float64')
+    active = np.abs(M + e * np.sin(E) - E) > alias
+    iterations = 0
     counter = 0
-    while(counter < repeated and np.abs(M + e * np.sin(E0) - E0) > alias):
-        E0 -= (E0 - e * np.sin(E0) - M) / (1 - e * np.cos(E0))
+    while(counter < repeated and active.any()):
+        E_active, e_active, M_active = E[active], e[active], M[active]
+        E_active -= (E_active - e_active * np.sin(E_active) - M_active) / (1 - e_active * np.cos(E_active))
+        E[active] = E_active
+        iterations += E_active.size
+        active[active] = np.abs(M_active + e_active * np.sin(E_active) - E_active) > alias
         counter += 1
 
-    return E0
+    if instrumentation.isEnabled():
+        instrumentation.countSolver("kepler", iterations, ~active)
+    return E
+
+
+def solveKepler(M, e, tol: float=1e-12, repeated: int=50) -> Tuple[np.array, np.array]:
+    """
+    Vectorized Newton solver of Kepler Equation for E(rad), 0 <= e < 1
+    M = E - e * sin(E)
+
+    M is wrapped into [-pi, pi) and E is started from the third order series
+    E0 = M + e*sinM + e^2/2*sin2M + e^3/8*(3sin3M - sinM)
+    (or M + 0.85*e*sign(sinM) for e > 0.8), so a handful of steps reach |dE| < tol.
+    Returns E with the shape of broadcast(M, e) and the number of iterations of every element
+    """
+    if (repeated < 0 or tol < 0):
+        raise ValueError("Repeated must be int. Repeated and Tol must be positive.")
+
+    M, e = np.broadcast_arrays(np.asarray(M, dtype='float64'), np.asarray(e, dtype='float64'))
+    if np.any((e < 0) | (e >= 1)):
+        raise ValueError("Eccentricity must be in [0, 1)")
+
+    # Solve for the wrapped mean anomaly, E(M + 2k*pi) = E(M) + 2k*pi
+    turns = np.floor((M + CONSTANT.PI) / (2 * CONSTANT.PI))
+    M = M - 2 * CONSTANT.PI * turns
+
+    sinM = np.sin(M)
+    E = np.where(e > 0.8,
+                 M + 0.85 * e * np.sign(sinM),
+                 M + e * sinM + e**2 / 2 * np.sin(2 * M) + e**3 / 8 * (3 * np.sin(3 * M) - sinM))
+    E = np.atleast_1d(E)
+    e_flat, M_flat = np.atleast_1d(e), np.atleast_1d(M)
+
+    iterations = np.zeros(E.shape, dtype='int64')
+    active = np.ones(E.shape, dtype=bool)
+    counter = 0
+    while(counter < repeated and active.any()):
+        E_active, e_active = E[active], e_flat[active]
+        dE = (E_active - e_active * np.sin(E_active) - M_flat[active]) / (1 - e_active * np.cos(E_active))
+        E[active] = E_active - dE
+        iterations[active] += 1
+        active[active] = np.abs(dE) > tol
+        counter += 1
+
+    if instrumentation.isEnabled():
+        instrumentation.countSolver("kepler", iterations, ~active)
+    E = E.reshape(M.shape) + 2 * CONSTANT.PI * turns
+    return E[()], iterations.reshape(M.shape)[()]
 
 
 def calVecInPQW(a: float, e: float, E: float) -> np.array:
@@ -145,9 +321,13 @@ def calVecInPQW(a: float, e: float, E: float) -> np.array:
     c=a*e
     b=a*sqrt(1-e**2)
     """
+    if np.ndim(E) == 0 and backend.isCompiled():
+        return backend.getKernel("vecInPQW")(float(a), float(e), float(E))
     b = a * np.sqrt(1 - e**2)
     c = a * e
-    return np.array([a * np.cos(E) - c, b * np.sin(E), 0], dtype='float64')
+    if np.ndim(E) == 0:
+        return np.array([a * np.cos(E) - c, b * np.sin(E), 0], dtype='float64')
+    return np.stack([a * np.cos(E) - c, b * np.sin(E), np.zeros(np.shape(E))], axis=-1).astype('float64')
 
 
 # Calculate GTMS in a arbitary Timepoint: datetime.datetime()
@@ -173,6 +353,39 @@ def getGMST(time: datetime = datetime.now()) -> float:
     return GMST
 
 
+# Calculate GMST for an Array of Timepoints
+def getGMSTArray(time, dts: np.array=None) -> np.array:
+    """
+    Same formula as getGMST, evaluated for
+        - time: np.datetime64 array of timepoints (UT), dts omitted
+        - time: epoch (datetime.datetime or np.datetime64) and dts: seconds from it
+    Fractions of a second are kept instead of being truncated
+    """
+    if dts is None:
+        time = np.asarray(time, dtype='datetime64[us]')
+        day = time.astype('datetime64[D]')
+        seconds = (time - day) / np.timedelta64(1, 's')
+        days = day.astype('int64')
+    else:
+        dts = np.asarray(dts, dtype='float64')
+        epoch = np.datetime64(time, 'us')
+        day = epoch.astype('datetime64[D]')
+        # Split Seconds from 0:00 UT of that day into whole Days and Seconds of the Day
+        seconds = (epoch - day) / np.timedelta64(1, 's') + dts
+        days = np.floor(seconds / 86400)
+        seconds = seconds - days * 86400
+        days = days + day.astype('int64')
+
+    # JND at 0:00 UT, 2440587.5 is 1970-01-01 0:00 UT
+    JND = 2440587.5 + days
+    T0 = (JND - 2451545) / 36525
+    G0 = 100.4606184 + 36000.77004 * T0 + 0.000387933 * T0**2 - 0.00000002583 * T0**3
+
+    GMST = G0 + 360.98564724 * seconds / 86400
+    GMST = GMST - GMST // 360 * 360
+    return GMST
+
+
 # Rotation Frame from ECEF to ECI
 def getRie(time: datetime=datetime.now()) -> np.array:
     gmst = getGMST(time)
@@ -181,17 +394,96 @@ def getRie(time: datetime=datetime.now()) -> np.array:
     return Rie
 
 
+# Stacked Rotation Frames from ECEF to ECI for GMST[deg] Array
+def getRieArray(gmst: np.array) -> np.array:
+    rad = CONSTANT.PI * np.asarray(gmst, dtype='float64') / 180
+    cos, sin = np.cos(rad), np.sin(rad)
+    Rie = np.zeros(rad.shape + (3, 3))
+    Rie[..., 0, 0] = cos
+    Rie[..., 0, 1] = sin
+    Rie[..., 1, 0] = -sin
+    Rie[..., 1, 1] = cos
+    Rie[..., 2, 2] = 1
+    return Rie
+
+
+# GMST[deg] and Stacked Rotation Frames from ECEF to ECI in one call
+def getGMSTAndRie(time, dts: np.array=None, unique: bool=False) -> Tuple[np.array, np.array]:
+    """
+    Arguments as getGMSTArray, returns GMST (N,) and Rie (N, 3, 3)
+    If unique, repeated timepoints are calculated once
+    """
+    if not unique:
+        gmst = getGMSTArray(time, dts)
+        return gmst, getRieArray(gmst)
+
+    if dts is None:
+        values, inverse = np.unique(np.asarray(time, dtype='datetime64[us]'), return_inverse=True)
+        gmst = getGMSTArray(values)
+    else:
+        values, inverse = np.unique(np.asarray(dts, dtype='float64'), return_inverse=True)
+        gmst = getGMSTArray(time, values)
+    Rie = getRieArray(gmst)
+    inverse = inverse.reshape(np.shape(time) if dts is None else np.shape(dts))
+    return gmst[inverse], Rie[inverse]
+
+
+@lru_cache(maxsize=4096)
+def _getGMSTCached(key: int) -> float:
+    return float(getGMSTArray(np.datetime64(key, 's')))
+
+
+@lru_cache(maxsize=4096)
+def _getRieCached(key: int) -> np.array:
+    Rie = getRieArray(np.asarray(_getGMSTCached(key)))
+    Rie.setflags(write=False)
+    return Rie
+
+
+def _getCacheKey(time) -> int:
+    # Timepoint in whole seconds, truncated as getGMST does
+    return int(np.datetime64(time, 's').astype('int64'))
+
+
+# Rotation Frame from ECEF to ECI, cached on the Timepoint
+def getRieCached(time) -> np.array:
+    """
+    getRie for a datetime.datetime or np.datetime64 timepoint, read-only result
+    Repeated timepoints hit a LRU cache keyed on the timepoint in whole seconds:
+    as getGMST, fractions of a second are truncated, so cache=True and cache=False agree
+    """
+    return _getRieCached(_getCacheKey(time))
+
+
 # Coordinates in Lad and Long in ECI
-def toECIfromLatLong(location: TypeLatLong, time: datetime=datetime.now()) -> np.array:
+def toECIfromLatLong(location: TypeLatLong, time: datetime=datetime.now(), cache: bool=False) -> np.array:
+    if backend.isCompiled():
+        gmst = _getGMSTCached(_getCacheKey(time)) if cache else getGMST(time)
+        return backend.getKernel("eciFromLatLong")(float(location.latitude), float(location.longtitude), gmst)
 
     x = CONSTANT.R * np.cos(np.deg2rad(location.latitude)) * np.cos(np.deg2rad(location.longtitude))
     y = CONSTANT.R * np.cos(np.deg2rad(location.latitude)) * np.sin(np.deg2rad(location.longtitude))
     z = CONSTANT.R * np.sin(np.deg2rad(location.latitude))
     coord = np.array([x, y, z])
-    coord = getRie(time).T @ coord
+    Rie = getRieCached(time) if cache else getRie(time)
+    coord = Rie.T @ coord
     return coord
 
 
+# Coordinates in Lad and Long in ECI for Timepoints given as Seconds from time
+def toECIfromLatLongBatch(location: TypeLatLong, time: datetime, dts: np.array) -> np.array:
+    """
+    location's latitude/longtitude may be arrays, they are broadcast against dts
+    Returns an array of shape broadcast(latitude, longtitude, dts) + (3,)
+    """
+    x = CONSTANT.R * np.cos(np.deg2rad(location.latitude)) * np.cos(np.deg2rad(location.longtitude))
+    y = CONSTANT.R * np.cos(np.deg2rad(location.latitude)) * np.sin(np.deg2rad(location.longtitude))
+    z = CONSTANT.R * np.sin(np.deg2rad(location.latitude))
+    coord = np.stack(np.broadcast_arrays(x, y, z), axis=-1)
+    # Rie.T @ coord for every Rie
+    return np.einsum('...ji,...j->...i', getRieArray(getGMSTArray(time, dts)), coord)
+
+
 def normalize(vec: np.array) -> np.array:
     """Normalize 1D Vector Array 
     """
@@ -205,11 +497,22 @@ def getDiffAngle(u: np.array, v: np.array, in_degrees=True) -> float:
     """Return the angle of two vectors
     if in_degrees, return angle in Degree 
     else return in Radian
+    u, v may also be (N, 3) arrays of vectors, then N angles are returned
     """
-    rad = np.arccos(np.clip(np.dot(u, v), -1, 1), dtype=np.float64)
+    rad = np.arccos(np.clip(np.sum(np.asarray(u, dtype=np.float64) * np.asarray(v, dtype=np.float64), axis=-1), -1, 1), dtype=np.float64)
     if not in_degrees:
         return rad
-    return np.rad2deg(np.arccos(np.clip(np.dot(u, v), -1, 1), dtype=np.float64), dtype=np.float64)
+    return np.rad2deg(rad, dtype=np.float64)
+
+
+def getTangentBasis(directions: np.array) -> Tuple[np.array, np.array]:
+    """Two unit axes u, w perpendicular to every unit direction (..., 3), (direction, u, w) is right-handed
+    u is built from the z axis, or from the x axis for directions close to z
+    """
+    helper = np.where(np.abs(directions[..., 2:3]) < 0.9, [0, 0, 1.0], [1.0, 0, 0])
+    u = np.cross(directions, helper)
+    u /= np.linalg.norm(u, axis=-1)[..., None]
+    return u, np.cross(directions, u)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,55 @@
+import pytest
+import numpy as np
+import numpy.testing as npt
+from datetime import datetime
+from package.utility import TypeOEArray, TypeLatLong
+from package.association import AssociationIndex
+
+
+@pytest.fixture
+def getIndex():
+    rng = np.random.default_rng(0)
+    M = 20000
+    OE = TypeOEArray(eccentricity=rng.uniform(0, 0.05, M), semimajor_axis=rng.uniform(6800, 42000, M),
+                     inclination=rng.uniform(0, np.pi, M), right_ascension=rng.uniform(0, 2 * np.pi, M),
+                     argument_of_perigee=rng.uniform(0, 2 * np.pi, M), mean_anomaly=rng.uniform(0, 2 * np.pi, M))
+    time = datetime(year=2020, month=4, day=15, hour=18, minute=22, second=4)
+    return AssociationIndex(OE, TypeLatLong(21.047198, 105.800237), time, max_radius=2)
+
+
+def bruteForce(index: AssociationIndex, directions: np.array, radius: float):
+    directions = directions / np.linalg.norm(directions, axis=1)[:, None]
+    angle = np.rad2deg(np.arccos(np.clip(directions @ index.looks.T, -1, 1)))
+    return set(zip(*np.nonzero(angle <= radius)))
+
+
+def test_query_equalsBruteForce(getIndex):
+    rng = np.random.default_rng(1)
+    directions = np.concatenate([getIndex.looks[rng.integers(0, 20000, 50)] + rng.normal(0, 0.01, (50, 3)),
+                                 rng.normal(size=(50, 3))])
+    matches = getIndex.query(directions, 1.5)
+    assert set(zip(matches.query, matches.satellite)) == bruteForce(getIndex, directions, 1.5)
+    assert np.all(np.diff(matches.query) >= 0)
+
+    index, angle = getIndex.nearest(directions, 1.5)
+    for k in range(len(directions)):
+        if index[k] >= 0:
+            npt.assert_allclose(angle[k], matches.angle[matches.query == k].min())
+        else:
+            assert not np.any(matches.query == k)
+
+
+@pytest.mark.parametrize("dt", [1.0, 600.0])
+def test_update(getIndex, dt):
+    moved = getIndex.update(dt)
+    assert getIndex.rebuilds == (1 if moved <= 0.1 * 20000 else 2)
+    npt.assert_allclose(getIndex.looks, getIndex.getLookVectors(dt))
+    assert np.all(np.diff(getIndex._sorted_keys) >= 0)
+    directions = np.random.default_rng(2).normal(size=(100, 3))
+    matches = getIndex.query(directions, 2)
+    assert set(zip(matches.query, matches.satellite)) == bruteForce(getIndex, directions, 2)
+
+
+def test_query_badRadius(getIndex):
+    with pytest.raises(ValueError):
+        getIndex.query(np.array([1.0, 0, 0]), 3)
@@ -0,0 +1,117 @@
+import pytest
+import numpy as np
+import numpy.testing as npt
+from datetime import datetime
+from package import backend, utility, _kernels
+from package.utility import CONSTANT, TypeOE, TypeLatLong, calEccentricAnomaly, calVecInPQW, getMatECItoPQW, toECIfromLatLong
+from package.orbital import Simulation, OrbitCalculate
+
+
+@pytest.fixture
+def getOE():
+    return TypeOE(semimajor_axis=6876.6644, eccentricity=0.0020122, inclination=1.6971285,
+                  right_ascension=2.7791209, argument_of_perigee=1.6541096, mean_anomaly=0.2653564)
+
+
+def calculateAll(OE):
+    time = datetime(year=2020, month=4, day=15, hour=18, minute=22, second=4)
+    orbit = OrbitCalculate(Simulation(OE, TypeLatLong(10, 20), time=time))
+    return [orbit.calculate(points, refine=refine) for points in ([3800, 3900, 4050], [3900, 4000, 4100]) for refine in (0, 5)], \
+        [calEccentricAnomaly(M, 0.3, alias=1e-12) for M in (0.1, 2.0, 5.0)], \
+        [calVecInPQW(7000, 0.1, E) for E in (0.1, 2.0)], \
+        [getMatECItoPQW(1.0, 0.5, 2.0)], \
+        [toECIfromLatLong(TypeLatLong(21.0, 105.8), time)]
+
+
+def test_kernels_equalNumpy(getOE, monkeypatch):
+    expected = calculateAll(getOE)
+    # The kernels run as Python in place of their compiled versions
+    monkeypatch.setattr(backend, "isCompiled", lambda: True)
+    monkeypatch.setattr(backend, "getKernel", lambda name: getattr(_kernels, name))
+    for result, reference in zip(calculateAll(getOE), expected):
+        npt.assert_allclose(np.array(result, dtype='float64'), np.array(reference, dtype='float64'), rtol=1e-12, atol=1e-12)
+
+
+def test_simulation_usesKernels(getOE, monkeypatch):
+    expected = Simulation(getOE, TypeLatLong(10, 20)).getAllCoords(3900)
+    names = []
+    monkeypatch.setattr(backend, "isCompiled", lambda: True)
+    monkeypatch.setattr(backend, "getKernel", lambda name: names.append(name) or getattr(_kernels, name))
+    result = Simulation(getOE, TypeLatLong(10, 20)).getAllCoords(3900)
+    assert "vecInPQW" in names
+    npt.assert_allclose(result, expected, rtol=1e-12)
+
+
+def test_setBackend():
+    with pytest.raises(ValueError):
+        backend.setBackend("fortran")
+    previous = backend.getBackend()
+    try:
+        assert backend.setBackend("auto") == ("numba" if backend.isNumbaAvailable() else "numpy")
+        if not backend.isNumbaAvailable():
+            with pytest.raises(ImportError):
+                backend.setBackend("numba")
+    finally:
+        backend.setBackend(previous)
+
+
+def test_numba_equalsNumpy(getOE):
+    pytest.importorskip("numba")
+    expected = calculateAll(getOE)
+    previous = backend.getBackend()
+    try:
+        backend.setBackend("numba")
+        for result, reference in zip(calculateAll(getOE), expected):
+            npt.assert_allclose(np.array(result, dtype='float64'), np.array(reference, dtype='float64'), rtol=1e-12, atol=1e-12)
+    finally:
+        backend.setBackend(previous)
+
+
+def test_kernels_constants():
+    assert (_kernels.GM, _kernels.R_EARTH, _kernels.PI) == (CONSTANT.GM, CONSTANT.R, CONSTANT.PI)
+
+
+class FakeNumba(object):
+    """numba.njit stand-in recording the cache flag every function was compiled with"""
+
+    def __init__(self):
+        self.cache = {}
+
+    def njit(self, cache=False):
+        def compile(function):
+            def dispatcher(*args):
+                return function(*args)
+            dispatcher.py_func = function
+            self.cache[function.__name__] = cache
+            return dispatcher
+        return compile
+
+
+def test_setBackend_recompiles(monkeypatch):
+    fake = FakeNumba()
+    monkeypatch.setattr(backend, "numba", fake)
+    previous = backend.getBackend(), backend._state["cache"]
+    try:
+        backend.setBackend("numba", cache=False)
+        backend.getKernel("keplerE")
+        assert fake.cache == {"_cross": False, "_dot": False, "_newtonR2": False, "keplerE": False}
+        # A later cache flag reaches the kernels and the helpers they call
+        backend.setBackend("numba", cache=True)
+        E, _, converged = backend.getKernel("keplerE")(0.1, 0.3, 0.1, 100, 1e-12)
+        assert fake.cache == {"_cross": True, "_dot": True, "_newtonR2": True, "keplerE": True}
+        assert converged and E == pytest.approx(calEccentricAnomaly(0.1, 0.3, alias=1e-12))
+    finally:
+        backend.setBackend(*previous)
+    assert all(not hasattr(getattr(_kernels, helper), "py_func") for helper in _kernels.HELPERS)
+
+
+def test_toECIfromLatLong_compiledCache(monkeypatch):
+    monkeypatch.setattr(backend, "isCompiled", lambda: True)
+    monkeypatch.setattr(backend, "getKernel", lambda name: getattr(_kernels, name))
+    time = datetime(year=2020, month=4, day=15, hour=18, minute=22, second=4, microsecond=750000)
+    location = TypeLatLong(21.0, 105.8)
+    npt.assert_allclose(toECIfromLatLong(location, time, cache=True), toECIfromLatLong(location, time), rtol=1e-12)
+    # The compiled path reads GMST from the cache too
+    hits = utility._getGMSTCached.cache_info().hits
+    toECIfromLatLong(location, time.replace(microsecond=0), cache=True)
+    assert utility._getGMSTCached.cache_info().hits == hits + 1
@@ -0,0 +1,28 @@
+import json
+from benchmarks.run import compareResults, main
+from benchmarks.suite import CASES
+
+
+def test_compareResults():
+    baseline = {"a[1]": {"median": 1.0}, "b[1]": {"median": 1.0}, "c[1]": {"median": 1.0}, "old[1]": {"median": 1.0}}
+    current = {"a[1]": {"median": 1.1}, "b[1]": {"median": 1.5}, "c[1]": {"median": 0.5}, "new[1]": {"median": 1.0}}
+    report = {row["case"]: row["status"] for row in compareResults(current, baseline, threshold=0.2)}
+    assert report == {"a[1]": "same", "b[1]": "regression", "c[1]": "improvement"}
+
+
+def test_main_saveAndCompare(tmp_path):
+    path = str(tmp_path / "baseline.json")
+    assert main(["--filter", "^solveKepler$", "--sizes", "10", "--repeat", "1", "--save", path]) == 0
+    with open(path) as file:
+        saved = json.load(file)
+    assert set(saved["results"]) == {"solveKepler[10]"}
+    # Against a baseline 1000 times faster the run is a regression
+    saved["results"]["solveKepler[10]"]["median"] /= 1000
+    with open(path, "w") as file:
+        json.dump(saved, file)
+    assert main(["--filter", "^solveKepler$", "--sizes", "10", "--repeat", "1", "--compare", path]) == 1
+
+
+def test_cases_run():
+    for name, (setup, _) in CASES.items():
+        setup(3)()
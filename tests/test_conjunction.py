@@ -0,0 +1,80 @@
+import pytest
+import numpy as np
+import numpy.testing as npt
+from package.utility import CONSTANT, TypeOEArray
+from package.propagation import propagateCatalog
+from package.conjunction import calApsides, filterApsides, findCloseObjects, screenConjunctions
+
+
+@pytest.fixture
+def getCatalog():
+    rng = np.random.default_rng(0)
+    M = 200
+    return TypeOEArray(eccentricity=rng.uniform(0, 0.01, M), semimajor_axis=rng.uniform(6900, 7000, M),
+                       inclination=rng.uniform(0, np.pi, M), right_ascension=rng.uniform(0, 2 * np.pi, M),
+                       argument_of_perigee=rng.uniform(0, 2 * np.pi, M), mean_anomaly=rng.uniform(0, 2 * np.pi, M))
+
+
+def test_findCloseObjects_containsAllClosePairs():
+    positions = np.random.default_rng(1).uniform(-100, 100, (500, 3))
+    first, second = findCloseObjects(positions, 15)
+    assert np.all(first < second)
+    assert len(set(zip(first, second))) == len(first)
+    i, j = np.triu_indices(len(positions), 1)
+    close = np.linalg.norm(positions[i] - positions[j], axis=1) < 15
+    assert set(zip(i[close], j[close])) <= set(zip(first, second))
+
+
+def test_filterApsides():
+    OE = TypeOEArray(eccentricity=np.array([0, 0.1, 0]), semimajor_axis=np.array([7000, 7000, 7650]), inclination=np.zeros(3),
+                     right_ascension=np.zeros(3), argument_of_perigee=np.zeros(3), mean_anomaly=np.zeros(3))
+    perigee, apogee = calApsides(OE)
+    npt.assert_allclose(apogee, [7000, 7700, 7650])
+    keep = filterApsides(perigee, apogee, np.array([0, 0, 1]), np.array([1, 2, 2]), threshold=5)
+    npt.assert_array_equal(keep, [True, False, True])
+
+
+def test_screenConjunctions_equalsBruteForce(getCatalog):
+    conjunctions = screenConjunctions(getCatalog, 0, 1800, step=10, threshold=30)
+    assert len(conjunctions) > 0
+
+    dts = np.arange(0, 1800.001, 0.5)
+    positions = propagateCatalog(getCatalog, dts)
+    i, j = np.triu_indices(len(getCatalog), 1)
+    closest = np.full(len(i), np.inf)
+    for k in range(len(dts)):
+        closest = np.minimum(closest, np.linalg.norm(positions[i, k] - positions[j, k], axis=1))
+    closest = dict(zip(zip(i, j), closest))
+
+    assert {(c.primary, c.secondary) for c in conjunctions} == {pair for pair, d in closest.items() if d < 30}
+    for conjunction in conjunctions:
+        assert conjunction.miss_distance < 30
+        assert conjunction.miss_distance <= closest[conjunction.primary, conjunction.secondary] + 1e-6
+
+
+def test_screenConjunctions_nodeCrossing():
+    # Circular orbits of the same radius through the same node meet there every half period
+    OE = TypeOEArray(eccentricity=np.zeros(3), semimajor_axis=np.array([7000, 7000, 9000]), inclination=np.array([0.5, 1.2, 0.5]),
+                     right_ascension=np.zeros(3), argument_of_perigee=np.zeros(3), mean_anomaly=np.zeros(3))
+    period = 2 * np.pi * np.sqrt(7000**3 / CONSTANT.GM)
+    conjunctions = screenConjunctions(OE, 100, 1.6 * period, step=30, threshold=1, tol=1e-4)
+    assert [(c.primary, c.secondary) for c in conjunctions] == [(0, 1), (0, 1), (0, 1)]
+    npt.assert_allclose([c.tca for c in conjunctions], [period / 2, period, 1.5 * period], atol=1e-3)
+    npt.assert_allclose([c.miss_distance for c in conjunctions], 0, atol=1e-2)
+    speed = np.sqrt(CONSTANT.GM / 7000)
+    npt.assert_allclose([c.relative_speed for c in conjunctions], 2 * speed * np.sin(0.35), rtol=1e-6)
+
+
+def test_screenConjunctions_offsets(getCatalog):
+    # Elements at an epoch 500 s before time 0 screen as the catalog propagated to time 0
+    conjunctions = screenConjunctions(getCatalog, 500, 2000, threshold=30)
+    shifted = screenConjunctions(getCatalog, 0, 1500, threshold=30, offsets=np.full(len(getCatalog), 500.0))
+    assert [(c.primary, c.secondary) for c in conjunctions] == [(c.primary, c.secondary) for c in shifted]
+    npt.assert_allclose([c.tca for c in conjunctions], [c.tca + 500 for c in shifted], atol=1e-2)
+
+
+def test_screenConjunctions_invalid(getCatalog):
+    with pytest.raises(ValueError):
+        screenConjunctions(getCatalog, 10, 0)
+    with pytest.raises(ValueError):
+        screenConjunctions(getCatalog, 0, 10, offsets=np.zeros(3))
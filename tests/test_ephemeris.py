@@ -0,0 +1,80 @@
+import io
+import pytest
+import numpy as np
+import numpy.testing as npt
+from package.utility import TypeOEArray
+from package.propagation import getStateInECI, propagateTLE
+from package.tle import readTLE
+from package.ephemeris import Ephemeris, writeEphemeris, writeTLEEphemeris
+
+CUTE = """CUTE-1 (CO-55)
+1 27844U 03031E   20215.58257093  .00000039  00000-0  37433-4 0  9997
+2 27844  98.6816 222.6204 0008652 284.1732  75.8485 14.22249147886657
+"""
+
+
+@pytest.fixture
+def getOEs():
+    rng = np.random.default_rng(1)
+    M = 5
+    return TypeOEArray(eccentricity=rng.uniform(0, 0.3, M), semimajor_axis=rng.uniform(6800, 42000, M),
+                       inclination=rng.uniform(0, np.pi, M), right_ascension=rng.uniform(0, 2 * np.pi, M),
+                       argument_of_perigee=rng.uniform(0, 2 * np.pi, M), mean_anomaly=rng.uniform(0, 2 * np.pi, M))
+
+
+def test_writeEphemeris_records(getOEs, tmp_path):
+    times = np.arange(0, 3600, 60.0)
+    ephemeris = writeEphemeris(str(tmp_path / "a.eph"), getOEs, times, epoch=np.datetime64("2020-04-15T18:22:04"),
+                               source="random", chunk_size=2)
+    assert isinstance(ephemeris.states, np.memmap)
+    assert len(ephemeris) == 5 and ephemeris.source == "random" and ephemeris.catalog_numbers is None
+    assert ephemeris.epoch == np.datetime64("2020-04-15T18:22:04")
+    positions, velocities = getStateInECI(TypeOEArray(*(getattr(getOEs, name)[:, None] for name in ("eccentricity", "semimajor_axis",
+                                          "inclination", "right_ascension", "argument_of_perigee", "mean_anomaly"))), times)
+    npt.assert_array_equal(ephemeris.states[..., :3], positions)
+    npt.assert_array_equal(ephemeris.states[..., 3:], velocities)
+
+
+@pytest.mark.parametrize("method, atol", [("hermite", 1e-3), ("lagrange", 1e-6)])
+def test_Ephemeris_interpolate(getOEs, tmp_path, method, atol):
+    writeEphemeris(str(tmp_path / "a.eph"), getOEs, np.arange(0, 7200, 30.0))
+    ephemeris = Ephemeris(str(tmp_path / "a.eph"))
+    satellites = np.array([0, 4, 2, 2])
+    t = np.array([0, 1234.5, 7170, 4000.1])
+    positions, velocities = ephemeris.interpolate(satellites, t, method=method)
+    expected_positions, expected_velocities = getStateInECI(getOEs[satellites], t)
+    npt.assert_allclose(positions, expected_positions, atol=atol)
+    npt.assert_allclose(velocities, expected_velocities, atol=atol)
+    with pytest.raises(ValueError):
+        ephemeris.interpolate(0, 7200)
+
+
+def test_writeTLEEphemeris(tmp_path):
+    catalog = readTLE(io.StringIO(CUTE))
+    times = np.datetime64("2020-08-03T00:00:00") + np.arange(0, 600, 10).astype('timedelta64[s]')
+    ephemeris = writeTLEEphemeris(str(tmp_path / "tle.eph"), catalog, times, source="CUTE")
+    npt.assert_array_equal(ephemeris.catalog_numbers, [27844])
+    npt.assert_allclose(ephemeris.states[..., :3], propagateTLE(catalog, times), atol=1e-9)
+    positions, _ = ephemeris.interpolate(0, ephemeris.toSeconds(times[3]))
+    npt.assert_allclose(positions, ephemeris.states[0, 3, :3], atol=1e-9)
+
+
+def test_writeEphemeris_largeCatalog(tmp_path):
+    # The catalog numbers are a binary block, the header does not grow with the catalog
+    rng = np.random.default_rng(2)
+    M = 5000
+    OE = TypeOEArray(eccentricity=rng.uniform(0, 0.05, M), semimajor_axis=rng.uniform(6800, 8000, M),
+                     inclination=rng.uniform(0, np.pi, M), right_ascension=rng.uniform(0, 2 * np.pi, M),
+                     argument_of_perigee=rng.uniform(0, 2 * np.pi, M), mean_anomaly=rng.uniform(0, 2 * np.pi, M))
+    catalog_numbers = np.arange(10000, 10000 + M) * 7
+    times = np.arange(0, 600, 60.0)
+    writeEphemeris(str(tmp_path / "large.eph"), OE, times, catalog_numbers=catalog_numbers, chunk_size=1024)
+    ephemeris = Ephemeris(str(tmp_path / "large.eph"))
+    assert len(ephemeris) == M
+    npt.assert_array_equal(ephemeris.catalog_numbers, catalog_numbers)
+    npt.assert_array_equal(ephemeris.times, times)
+    positions, velocities = getStateInECI(OE[[0, M - 1]], times[:, None])
+    npt.assert_allclose(ephemeris.states[[0, M - 1]].transpose(1, 0, 2)[..., :3], positions)
+    npt.assert_allclose(ephemeris.states[[0, M - 1]].transpose(1, 0, 2)[..., 3:], velocities)
+    with pytest.raises(ValueError):
+        writeEphemeris(str(tmp_path / "bad.eph"), OE, times, catalog_numbers=catalog_numbers[:3])
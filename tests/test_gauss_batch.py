@@ -0,0 +1,77 @@
+import pytest
+import numpy as np
+import numpy.testing as npt
+from datetime import datetime
+from package.utility import TypeOE, TypeOEArray, TypeLatLong, toECIfromLatLongBatch
+from package.propagation import propagateCatalog
+from package.orbital import Simulation, OrbitCalculate, calR2Root
+
+
+@pytest.fixture
+def getOE():
+    return TypeOE(semimajor_axis=6876.6644, eccentricity=0.0020122, inclination=1.6971285,
+                  right_ascension=2.7791209, argument_of_perigee=1.6541096, mean_anomaly=0.2653564)
+
+
+def test_calculateBatch_equalsScalar(getOE):
+    time = datetime(year=2020, month=4, day=15, hour=18, minute=22, second=4)
+    observers, directions, time_points, expected = [], [], [], []
+    for k in range(10):
+        points = [3800 + 20 * k, 3900 + 20 * k, 4050 + 20 * k]
+        orbit = OrbitCalculate(Simulation(getOE, TypeLatLong(10, 20), time=time))
+        expected.append(orbit.calculate(points))
+        observers.append(orbit.observers)
+        directions.append(orbit.directions)
+        time_points.append(points)
+
+    r2, v2 = OrbitCalculate.calculateBatch(np.array(observers), np.array(directions), np.array(time_points))
+    npt.assert_allclose(r2, np.array([r for r, _ in expected]), rtol=1e-9)
+    npt.assert_allclose(v2, np.array([v for _, v in expected]), rtol=1e-9)
+
+
+@pytest.mark.parametrize("times", [[24850, 24950, 25050.0], [24850, 24910, 25030.0], [24850, 24970, 25000.0]])
+def test_calculate_unrefinedAgainstKnownOrbit(times):
+    # Kepler-consistent observations of an elliptic orbit, the first Gauss estimate without refinement.
+    # With f = 1 - GM*t^2/2/r (instead of /r^3) and rho3 = (-C3*D13/C1 + ...) v2 was off by hundreds
+    # of km/s whenever the spacing was not symmetric.
+    OE = TypeOEArray.fromOEs([TypeOE(semimajor_axis=7200, eccentricity=0.05, inclination=1.6971285,
+                                     right_ascension=2.7791209, argument_of_perigee=1.6541096, mean_anomaly=0.2653564)])
+    times = np.array(times)
+    r = propagateCatalog(OE, times)[0]
+    v = (propagateCatalog(OE, times[1:2] + 1e-3) - propagateCatalog(OE, times[1:2] - 1e-3))[0, 0] / 2e-3
+    observers = toECIfromLatLongBatch(TypeLatLong(21.0, 105.8), datetime(year=2020, month=4, day=15, hour=18, minute=22, second=4), times)
+    directions = (r - observers) / np.linalg.norm(r - observers, axis=1)[:, None]
+
+    r2, v2 = OrbitCalculate.calculateBatch(observers[None], directions[None], times[None])
+    assert np.linalg.norm(r2[0] - r[1]) < 10
+    assert np.linalg.norm(v2[0] - v) < 0.05
+
+    orbit = OrbitCalculate(None)
+    orbit.observers, orbit.directions = list(observers), list(directions)
+    r2_scalar, v2_scalar = orbit.calculate(times, shouldPrecalculate=False)
+    npt.assert_allclose(r2_scalar, r2[0], rtol=1e-9)
+    npt.assert_allclose(v2_scalar, v2[0], rtol=1e-9)
+
+
+def test_calculateBatch_badShape():
+    with pytest.raises(ValueError):
+        OrbitCalculate.calculateBatch(np.zeros((2, 3)), np.zeros((2, 3)), np.zeros((2, 3)))
+
+
+def test_calR2Root_equalsPolynomialRoots():
+    rng = np.random.default_rng(2)
+    r2 = rng.uniform(6600, 42000, 50)
+    a = -rng.uniform(0.9, 1.1, 50) * r2**2
+    b = rng.uniform(-1e16, 1e17, 50)
+    c = -(r2**8 + a * r2**6 + b * r2**3)
+    root = calR2Root(a, b, c, all_roots=True)
+    assert root.converged.all()
+    npt.assert_allclose(root.r, r2, rtol=1e-10)
+    for r, roots in zip(root.r, root.roots):
+        assert np.isclose(roots, r, rtol=1e-8).any()
+
+
+def test_calR2Root_farStart():
+    root = calR2Root(-40545865.25270044, 7.03193575710549e+16, -7.256604168309236e+29, r0=1e9)
+    assert root.converged
+    npt.assert_allclose(root.r, 6871.747826809439, rtol=1e-12)
@@ -0,0 +1,85 @@
+import threading
+import pytest
+import numpy as np
+from datetime import datetime
+from package import instrumentation
+from package.instrumentation import instrument
+from package.utility import TypeOE, TypeLatLong, calEccentricAnomaly, solveKepler
+from package.orbital import Simulation, OrbitCalculate
+
+
+@pytest.fixture
+def getOrbit():
+    OE = TypeOE(semimajor_axis=6876.6644, eccentricity=0.0020122, inclination=1.6971285,
+                right_ascension=2.7791209, argument_of_perigee=1.6541096, mean_anomaly=0.2653564)
+    return OrbitCalculate(Simulation(OE, TypeLatLong(10, 20), time=datetime(year=2020, month=4, day=15, hour=18, minute=22, second=4)))
+
+
+def test_instrument_calculate(getOrbit):
+    stages = []
+    with instrument(callback=lambda name, seconds: stages.append(name)) as metrics:
+        getOrbit.calculate([3800, 3900, 4050], refine=5)
+        getOrbit.calculate([3800, 3900, 4050])
+    assert not instrumentation.isEnabled()
+    snapshot = metrics.toDict()
+    for name in ("precalculate", "determinants", "root_solve", "velocity", "refine"):
+        assert name in stages
+        assert snapshot["stages"][name]["sum"] >= snapshot["stages"][name]["max"] > 0
+    assert snapshot["stages"]["root_solve"]["count"] == 2
+    assert snapshot["counters"]["r2_root.calls"] == 2
+    assert snapshot["counters"]["r2_root.not_converged"] == 0
+    assert snapshot["counters"]["kepler.calls"] == 6
+
+    text = metrics.toPrometheus()
+    assert 'doan_stage_seconds_count{stage="root_solve"} 2' in text
+    assert 'doan_stage_seconds_bucket{stage="root_solve",le="+Inf"} 2' in text
+    assert 'doan_events_total{name="r2_root.calls"} 2' in text
+
+
+def test_instrument_notConverged():
+    with instrument() as metrics:
+        calEccentricAnomaly(np.array([0.1, 2.0]), 0.5, alias=1e-12, repeated=1)
+        solveKepler(np.linspace(0, 6, 10), 0.1)
+    assert metrics.counters["kepler.calls"] == 12
+    assert metrics.counters["kepler.not_converged"] == 2
+
+
+def test_instrument_disabled(getOrbit):
+    metrics = instrumentation.Metrics()
+    getOrbit.calculate([3800, 3900, 4050])
+    assert instrumentation.stage("root_solve") is instrumentation.stage("velocity")
+    assert metrics.toDict() == {"stages": {}, "counters": {}}
+
+
+def test_instrument_threads():
+    # Two threads inside their own blocks at the same time, each sees only its own calls
+    barrier = threading.Barrier(2)
+    results = {}
+
+    def worker(name: str, calls: int) -> None:
+        with instrument() as metrics:
+            barrier.wait()
+            for _ in range(calls):
+                solveKepler(np.linspace(0, 6, 10), 0.1)
+            barrier.wait()
+        results[name] = metrics.counters["kepler.calls"]
+
+    threads = [threading.Thread(target=worker, args=("a", 1)), threading.Thread(target=worker, args=("b", 3))]
+    for thread in threads:
+        thread.start()
+    with instrument() as outside:
+        for thread in threads:
+            thread.join()
+    assert results == {"a": 10, "b": 30}
+    assert outside.counters == {}
+
+
+def test_instrument_nested():
+    with instrument() as outer:
+        solveKepler(0.5, 0.1)
+        with instrument() as inner:
+            solveKepler(np.ones(4), 0.1)
+        solveKepler(0.5, 0.1)
+    assert outer.counters["kepler.calls"] == 2
+    assert inner.counters["kepler.calls"] == 4
+    assert not instrumentation.isEnabled()
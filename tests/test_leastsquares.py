@@ -0,0 +1,71 @@
+import pytest
+import numpy as np
+import numpy.testing as npt
+from datetime import datetime
+from package.utility import TypeOE, TypeOEArray, TypeLatLong, toECIfromLatLongBatch
+from package.propagation import getStateInECI
+from package.orbital import Simulation, OrbitCalculate
+from package.leastsquares import fitOrbit, calPositions
+
+
+@pytest.fixture
+def getOE():
+    return TypeOE(semimajor_axis=7200, eccentricity=0.05, inclination=1.6971285,
+                  right_ascension=2.7791209, argument_of_perigee=1.6541096, mean_anomaly=0.2653564)
+
+
+@pytest.fixture
+def getObservations(getOE):
+    times = np.linspace(24850, 25400, 60)
+    satellite, _ = getStateInECI(TypeOEArray.fromOEs([getOE]), times)
+    observers = toECIfromLatLongBatch(TypeLatLong(21.0, 105.8), datetime(year=2020, month=4, day=15, hour=18, minute=22, second=4), times)
+    return observers, satellite - observers, times
+
+
+def test_calPositions(getOE):
+    OE = TypeOEArray.fromOEs([getOE])
+    r, v = getStateInECI(OE, [0.0])
+    dts = np.array([-300.0, 0, 1000.0])
+    npt.assert_allclose(calPositions(np.concatenate([r, v], axis=1), dts)[0], getStateInECI(OE, dts)[0], atol=1e-6)
+
+
+def test_fitOrbit_exact(getOE, getObservations):
+    fit = fitOrbit(*getObservations)
+    r, v = getStateInECI(TypeOEArray.fromOEs([getOE]), [fit.epoch])
+    assert fit.converged
+    npt.assert_allclose(fit.r, r[0], atol=1e-6)
+    npt.assert_allclose(fit.v, v[0], atol=1e-8)
+
+
+def test_fitOrbit_stalled(getObservations):
+    # At rest 1 m from the geocentre no damped step lowers the cost, the fit must not report convergence
+    with np.errstate(all='ignore'):
+        fit = fitOrbit(*getObservations, r0=[1e-3, 0, 0], v0=[0, 0, 0])
+    assert fit.converged is False
+    assert fit.iterations == 1
+    npt.assert_array_equal(fit.r, [1e-3, 0, 0])
+
+
+def test_fitOrbit_noise(getOE, getObservations):
+    observers, directions, times = getObservations
+    directions = directions / np.linalg.norm(directions, axis=1)[:, None]
+    r, v = getStateInECI(TypeOEArray.fromOEs([getOE]), [times[30]])
+    rng = np.random.default_rng(0)
+    errors = []
+    for _ in range(20):
+        fit = fitOrbit(observers, directions + rng.normal(0, 1e-5, directions.shape), times, sigma=1e-5)
+        errors.append(np.concatenate([fit.r - r[0], fit.v - v[0]]))
+        assert fit.covariance.shape == (6, 6)
+        npt.assert_allclose(fit.rms, 1e-5, rtol=0.3)
+    # The covariance predicts the spread of the fitted states
+    npt.assert_allclose(np.std(errors, axis=0), np.sqrt(np.diag(fit.covariance)), rtol=0.6)
+
+
+def test_calculateLeastSquares_equalsFitOrbit(getOE):
+    sim = Simulation(getOE, TypeLatLong(21.0, 105.8), time=datetime(year=2020, month=4, day=15, hour=18, minute=22, second=4))
+    time_points = np.linspace(24850, 25400, 21)
+    fit = OrbitCalculate(sim).calculateLeastSquares(time_points)
+    expected = fitOrbit(*sim.getAllCoordsBatch(time_points), time_points)
+    assert fit.epoch == time_points[10]
+    npt.assert_allclose(fit.r, expected.r)
+    npt.assert_allclose(fit.v, expected.v)
@@ -0,0 +1,59 @@
+import pytest
+import numpy as np
+import numpy.testing as npt
+from datetime import datetime
+from package.utility import TypeOE, TypeOEArray, TypeLatLong, toECIfromLatLongBatch
+from package.propagation import getStateInECI
+from package.orbital import OrbitCalculate
+from package.montecarlo import StreamingStats, TypeNoise, runMonteCarlo, perturbDirections
+
+
+@pytest.fixture
+def getObservations():
+    OE = TypeOEArray.fromOEs([TypeOE(semimajor_axis=7200, eccentricity=0.05, inclination=1.6971285,
+                                     right_ascension=2.7791209, argument_of_perigee=1.6541096, mean_anomaly=0.2653564)])
+    time = datetime(year=2020, month=4, day=15, hour=18, minute=22, second=4)
+    time_points = np.array([24900.0, 25100.0, 25300.0])
+    satellite, velocity = getStateInECI(OE, time_points)
+    observers = toECIfromLatLongBatch(TypeLatLong(21.0, 105.8), time, time_points)
+    return observers, satellite - observers, time_points, satellite[1], velocity[1]
+
+
+def test_StreamingStats_equalsNumpy():
+    values = np.random.default_rng(0).normal(size=(1000, 3))
+    stats = StreamingStats(reservoir_size=1000)
+    for chunk in np.array_split(values, 7):
+        stats.update(chunk)
+    assert stats.count == 1000
+    npt.assert_allclose(stats.mean, values.mean(axis=0))
+    npt.assert_allclose(stats.covariance, np.cov(values.T))
+    npt.assert_allclose(stats.min, values.min(axis=0))
+    # The reservoir holds every sample while the stream is not longer than it
+    npt.assert_allclose(stats.percentile(90), np.percentile(values, 90, axis=0))
+
+
+def test_runMonteCarlo_noNoise(getObservations):
+    observers, directions, time_points, r2_true, v2_true = getObservations
+    stats = runMonteCarlo(observers, directions, time_points, r2_true, v2_true, TypeNoise(), trials=10, batch_size=3)
+    unit = directions / np.linalg.norm(directions, axis=1)[:, None]
+    r2, _ = OrbitCalculate.calculateBatch(observers[None], unit[None], time_points[None])
+    assert stats["position"].count == 10
+    npt.assert_allclose(stats["position"].mean, np.linalg.norm(r2[0] - r2_true))
+    npt.assert_allclose(stats["position"].std, 0, atol=1e-6)
+
+
+def test_runMonteCarlo_noise(getObservations):
+    noise = TypeNoise(observer=0.01, angle=1e-5, time=1e-3)
+    stats = runMonteCarlo(*getObservations, noise, trials=2000, batch_size=512, seed=1, refine=30)
+    again = runMonteCarlo(*getObservations, noise, trials=2000, batch_size=512, seed=1, refine=30)
+    npt.assert_allclose(stats["state"].covariance, again["state"].covariance)
+    assert stats["state"].covariance.shape == (6, 6)
+    assert 0 < stats["position"].mean < 5
+    assert stats["position"].percentile(50) < stats["position"].percentile(99) <= stats["position"].max
+
+
+def test_perturbDirections():
+    directions = np.array([[1.0, 0, 0], [0, 0, 1.0]])
+    tilted = perturbDirections(directions, np.array([[1e-3, 0], [0, 2e-3]]))
+    npt.assert_allclose(np.linalg.norm(tilted, axis=1), 1)
+    npt.assert_allclose(np.arccos(np.sum(tilted * directions, axis=1)), [1e-3, 2e-3], rtol=1e-5)
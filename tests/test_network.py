@@ -0,0 +1,78 @@
+import pytest
+import numpy as np
+import numpy.testing as npt
+from datetime import datetime
+from package.utility import TypeOEArray, TypeLatLong, toECIfromLatLongBatch, getRie
+from package.propagation import propagateCatalog
+from package.network import StationNetwork, WGS84_A, WGS84_F
+
+
+@pytest.fixture
+def getTime():
+    return datetime(year=2020, month=4, day=15, hour=18, minute=22, second=4)
+
+
+@pytest.fixture
+def getNetwork():
+    return StationNetwork([21.047198, 10.8, -33.9, 64.1], [105.800237, 106.7, 18.4, -21.9], names=["HN", "HCM", "CPT", "REK"])
+
+
+def test_getPositions_equalsToECIfromLatLongBatch(getNetwork, getTime):
+    dts = np.linspace(0, 86400, 50)
+    positions = getNetwork.getPositions(getTime, dts)
+    assert positions.shape == (4, 50, 3)
+    for k in range(len(getNetwork)):
+        npt.assert_allclose(positions[k], toECIfromLatLongBatch(getNetwork[k], getTime, dts), atol=1e-9)
+
+
+def test_wgs84(getTime):
+    network = StationNetwork([0, 90, 45], [0, 0, 30], altitude=[0, 0, 1.5], ellipsoid=True)
+    npt.assert_allclose(network.ecef[0], [WGS84_A, 0, 0], atol=1e-9)
+    npt.assert_allclose(network.ecef[1], [0, 0, WGS84_A * (1 - WGS84_F)], atol=1e-9)
+    # The altitude is along the normal of the ellipsoid
+    ground = StationNetwork(45, 30, ellipsoid=True).ecef[0]
+    npt.assert_allclose(network.ecef[2] - ground, 1.5 * network.up[2], atol=1e-9)
+    # At t = 0 the ECI positions are Rie.T @ ECEF
+    npt.assert_allclose(network.getPositions(getTime, [0])[:, 0], network.ecef @ getRie(getTime), atol=1e-9)
+
+
+def test_getLineOfSight(getNetwork, getTime):
+    rng = np.random.default_rng(0)
+    M = 5
+    OE = TypeOEArray(eccentricity=rng.uniform(0, 0.01, M), semimajor_axis=rng.uniform(6800, 7200, M), inclination=rng.uniform(0, np.pi, M),
+                     right_ascension=rng.uniform(0, 2 * np.pi, M), argument_of_perigee=rng.uniform(0, 2 * np.pi, M),
+                     mean_anomaly=rng.uniform(0, 2 * np.pi, M))
+    dts = np.linspace(0, 3600, 20)
+    satellites = propagateCatalog(OE, dts)
+    sight = getNetwork.getLineOfSight(satellites, getTime, dts)
+    assert sight.directions.shape == (4, M, 20, 3) and sight.elevations.shape == (4, M, 20)
+
+    stations = getNetwork.getPositions(getTime, dts)
+    looks = satellites[None] - stations[:, None]
+    npt.assert_allclose(sight.ranges, np.linalg.norm(looks, axis=-1))
+    npt.assert_allclose(sight.directions, looks / sight.ranges[..., None])
+    up = stations / np.linalg.norm(stations, axis=-1)[..., None]
+    npt.assert_allclose(sight.elevations, np.rad2deg(np.arcsin(np.sum(sight.directions * up[:, None], axis=-1))), atol=1e-9)
+
+    one = getNetwork.getLineOfSight(satellites[2], getTime, dts)
+    assert one.ranges.shape == (4, 20)
+    npt.assert_allclose(one.elevations, sight.elevations[:, 2])
+
+
+def test_getLineOfSight_zenith(getTime):
+    network = StationNetwork.fromLatLongs([TypeLatLong(21.0, 105.8)], ellipsoid=True)
+    station = network.getPositions(getTime, [0.0])[0, 0]
+    # Zenith is the normal of the ellipsoid, the geocentric direction is below it
+    zenith = station + 500 * getRie(getTime).T @ network.up[0]
+    npt.assert_allclose(network.getLineOfSight(zenith[None], getTime, [0.0]).elevations, 90)
+    geocentric = station + 500 * station / np.linalg.norm(station)
+    assert 89 < network.getLineOfSight(geocentric[None], getTime, [0.0]).elevations[0, 0] < 90
+
+
+def test_invalid(getNetwork, getTime):
+    with pytest.raises(ValueError):
+        StationNetwork([95], [0])
+    with pytest.raises(ValueError):
+        StationNetwork([0, 1], [0, 1], names=["A"])
+    with pytest.raises(ValueError):
+        getNetwork.getLineOfSight(np.zeros((3, 3)), getTime, np.zeros(4))
@@ -0,0 +1,32 @@
+import numpy as np
+import numpy.testing as npt
+from package.utility import CONSTANT, OE_FIELDS
+from package.orbital_elements import calc_oe_from_sv, calc_oe_from_sv_batch
+
+
+def test_calc_oe_from_sv_batch_equalsScalar():
+    rng = np.random.default_rng(0)
+    R = rng.normal(size=(200, 3)) * 7000
+    V = np.cross([0, 0, 1.0], R)
+    speed = np.sqrt(CONSTANT.GM / np.linalg.norm(R, axis=1)) * rng.uniform(0.8, 1.2, 200)
+    V = V / np.linalg.norm(V, axis=1)[:, None] * speed[:, None] + rng.normal(size=(200, 3)) * 0.3
+
+    OE = calc_oe_from_sv_batch(R, V)
+    assert len(OE) == 200
+    for k in range(len(R)):
+        expected = calc_oe_from_sv(R[k], V[k])
+        npt.assert_allclose([getattr(OE, name)[k] for name in OE_FIELDS], [getattr(expected, name) for name in OE_FIELDS], rtol=1e-10, atol=1e-12)
+
+
+def test_calc_oe_from_sv_batch_circularEquatorial():
+    speed = np.sqrt(CONSTANT.GM / 7000)
+    R = np.array([[7000, 0, 0], [0, 7000, 0], [0, -7000, 0], [0, -7000, 0]], dtype='float64')
+    V = np.array([[0, speed, 0], [-speed, 0, 0], [speed, 0, 0], [-speed, 0, 0]], dtype='float64')
+    OE = calc_oe_from_sv_batch(R, V)
+    npt.assert_allclose(OE.eccentricity, 0, atol=1e-12)
+    npt.assert_allclose(OE.semimajor_axis, 7000)
+    npt.assert_allclose(OE.inclination, [0, 0, 0, np.pi])
+    npt.assert_allclose(OE.right_ascension, 0)
+    npt.assert_allclose(OE.argument_of_perigee, 0)
+    # True longitude, measured in the direction of motion
+    npt.assert_allclose(OE.mean_anomaly, [0, np.pi / 2, -np.pi / 2, np.pi / 2], atol=1e-12)
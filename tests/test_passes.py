@@ -0,0 +1,44 @@
+import pytest
+import numpy as np
+import numpy.testing as npt
+from datetime import datetime
+from package.utility import TypeOE, TypeOEArray, TypeLatLong, toECIfromLatLongBatch
+from package.propagation import getPosInECI
+from package.passes import predictPasses, calSinElevation
+
+
+@pytest.fixture
+def getOE():
+    return TypeOE(semimajor_axis=6876.6644, eccentricity=0.0020122, inclination=1.6971285,
+                  right_ascension=2.7791209, argument_of_perigee=1.6541096, mean_anomaly=0.2653564)
+
+
+def test_predictPasses_bruteForce(getOE):
+    observer = TypeLatLong(21.047198, 105.800237)
+    time = datetime(year=2020, month=4, day=15, hour=18, minute=22, second=4)
+    passes = predictPasses(getOE, observer, time, 0, 86400, step=60, min_elevation=5, tol=0.01)
+
+    # Fine sampling, every 0.25 s
+    dts = np.arange(0, 86400, 0.25)
+    positions = getPosInECI(TypeOEArray.fromOEs([getOE]), dts)
+    elevation = np.rad2deg(np.arcsin(calSinElevation(positions, toECIfromLatLongBatch(observer, time, dts))))
+    up = elevation > 5
+    rises = dts[1:][up[1:] & ~up[:-1]]
+    sets = dts[:-1][up[:-1] & ~up[1:]]
+
+    assert len(passes) == len(rises) > 0
+    npt.assert_allclose([p.rise for p in passes], rises, atol=0.3)
+    npt.assert_allclose([p.set for p in passes], sets, atol=0.3)
+    for p in passes:
+        window = (dts >= p.rise) & (dts <= p.set)
+        assert p.rise < p.culmination < p.set
+        npt.assert_allclose(p.max_elevation, elevation[window].max(), atol=0.01)
+
+
+def test_predictPasses_manyObservers(getOE):
+    observers = [TypeLatLong(21.047198, 105.800237), TypeLatLong(0, 0), TypeLatLong(-60, 30)]
+    time = datetime(year=2020, month=4, day=15, hour=18, minute=22, second=4)
+    passes = predictPasses(TypeOEArray.fromOEs([getOE, getOE]), observers, time, 0, 86400)
+    for k, observer in enumerate(observers):
+        single = predictPasses(getOE, observer, time, 0, 86400)
+        assert [p.culmination for p in passes if p.observer == k and p.satellite == 1] == pytest.approx([p.culmination for p in single])
@@ -0,0 +1,69 @@
+import pytest
+import numpy as np
+import numpy.testing as npt
+from package.utility import OE_FIELDS, TypeOE, TypeOEArray, calMeanAnomaly, calEccentricAnomaly, calVecInPQW, getMatECItoPQW
+from package.propagation import propagateCatalog, getPosInECI, getStateInECI, calJ2Rates
+
+
+def getScalarPos(OE: TypeOE, dt: float) -> np.array:
+    mean_anomaly = calMeanAnomaly(OE.mean_anomaly, OE.semimajor_axis, dt)
+    eccentric_anomaly = calEccentricAnomaly(mean_anomaly, OE.eccentricity, alias=1e-13)
+    toECI = getMatECItoPQW(i=OE.inclination, omega=OE.argument_of_perigee, sigma=OE.right_ascension)
+    return toECI.T @ calVecInPQW(OE.semimajor_axis, OE.eccentricity, eccentric_anomaly)
+
+
+@pytest.fixture
+def getOEs():
+    rng = np.random.default_rng(1)
+    M = 7
+    return TypeOEArray(eccentricity=rng.uniform(0, 0.3, M), semimajor_axis=rng.uniform(6800, 42000, M),
+                       inclination=rng.uniform(0, np.pi, M), right_ascension=rng.uniform(0, 2 * np.pi, M),
+                       argument_of_perigee=rng.uniform(0, 2 * np.pi, M), mean_anomaly=rng.uniform(0, 2 * np.pi, M))
+
+
+@pytest.mark.parametrize("chunk_size", [None, 1, 3])
+def test_propagateCatalog_equalsScalar(getOEs, chunk_size):
+    dts = np.linspace(-5000, 90000, num=11)
+    positions = propagateCatalog(getOEs, dts, chunk_size=chunk_size)
+    assert positions.shape == (len(getOEs), len(dts), 3)
+    expected = np.array([[getScalarPos(getOEs[m], dt) for dt in dts] for m in range(len(getOEs))])
+    npt.assert_allclose(positions, expected, atol=1e-6)
+
+
+def test_propagateCatalog_perSatelliteTimes(getOEs):
+    dts = np.arange(len(getOEs) * 4, dtype='float64').reshape(len(getOEs), 4) * 500
+    positions = propagateCatalog(getOEs, dts, chunk_size=2)
+    npt.assert_allclose(positions[5, 2], getScalarPos(getOEs[5], dts[5, 2]), atol=1e-6)
+    with pytest.raises(ValueError):
+        propagateCatalog(getOEs, dts[:3])
+
+
+def test_calJ2Rates():
+    day = 86400
+    # ISS: the node regresses about 5 degrees per day
+    iss = calJ2Rates(6778, 0.0005, np.deg2rad(51.6))
+    assert np.rad2deg(iss.right_ascension) * day == pytest.approx(-5.0, abs=0.1)
+    # Sun-synchronous orbit at 700 km: the node follows the Sun, 360 degrees per year
+    sso = calJ2Rates(7078.137, 0, np.deg2rad(98.19))
+    assert np.rad2deg(sso.right_ascension) * day == pytest.approx(360 / 365.2422, abs=0.005)
+    # Critical inclination: no apsidal rotation
+    assert calJ2Rates(7000, 0.1, np.arccos(np.sqrt(1 / 5))).argument_of_perigee == pytest.approx(0, abs=1e-15)
+
+
+def test_getPosInECI_j2(getOEs):
+    dts = np.linspace(0, 5 * 86400, num=6)
+    columns = TypeOEArray(*(getattr(getOEs, name)[:, None] for name in OE_FIELDS))
+    positions = getPosInECI(columns, dts, model="j2")
+    npt.assert_allclose(positions, propagateCatalog(getOEs, dts, model="j2"))
+
+    # The drifted elements propagated by two-body motion for 0 s
+    rates = calJ2Rates(columns.semimajor_axis, columns.eccentricity, columns.inclination)
+    drifted = TypeOEArray(columns.eccentricity, columns.semimajor_axis, columns.inclination, columns.right_ascension + rates.right_ascension * dts,
+                          columns.argument_of_perigee + rates.argument_of_perigee * dts, columns.mean_anomaly + rates.mean_anomaly * dts)
+    npt.assert_allclose(positions, getPosInECI(drifted, 0), atol=1e-6)
+    npt.assert_allclose(getStateInECI(columns, dts, model="j2")[0], positions)
+    # The drift is kilometres over days
+    assert np.linalg.norm(positions[:, -1] - propagateCatalog(getOEs, dts)[:, -1], axis=-1).max() > 10
+
+    with pytest.raises(ValueError):
+        getPosInECI(getOEs, 0, model="j4")
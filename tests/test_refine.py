@@ -0,0 +1,59 @@
+import pytest
+import numpy as np
+import numpy.testing as npt
+from datetime import datetime
+from package.utility import TypeOE, TypeOEArray, TypeLatLong, toECIfromLatLongBatch
+from package.propagation import getPosInECI
+from package.orbital import OrbitCalculate
+from package.refine import refineGauss, calLagrangeCoefficients, calGibbs, calHerrickGibbs
+
+
+@pytest.fixture
+def getOE():
+    return TypeOEArray.fromOEs([TypeOE(semimajor_axis=7200, eccentricity=0.05, inclination=1.6971285,
+                                       right_ascension=2.7791209, argument_of_perigee=1.6541096, mean_anomaly=0.2653564)])
+
+
+def getVelocity(OE, t: float) -> np.array:
+    return ((getPosInECI(OE, [t + 0.001]) - getPosInECI(OE, [t - 0.001])) / 0.002)[0]
+
+
+def getObservations(OE, time_points: np.array):
+    time = datetime(year=2020, month=4, day=15, hour=18, minute=22, second=4)
+    satellite = getPosInECI(OE, time_points)
+    observers = toECIfromLatLongBatch(TypeLatLong(21.0, 105.8), time, time_points)
+    directions = satellite - observers
+    directions /= np.linalg.norm(directions, axis=1)[:, None]
+    return satellite, observers, directions
+
+
+def test_calLagrangeCoefficients(getOE):
+    R, V = getPosInECI(getOE, [0.0]), getVelocity(getOE, 0.0)[None]
+    for dt in (-600.0, 100.0, 3000.0):
+        f, g = calLagrangeCoefficients(R, V, np.array([dt]))
+        npt.assert_allclose(f[:, None] * R + g[:, None] * V, getPosInECI(getOE, [dt]), atol=1e-6)
+
+
+@pytest.mark.parametrize("velocity", ["lagrange", "gibbs", "auto"])
+def test_refineGauss_longArc(getOE, velocity):
+    # A pass above the observer, spacings where the truncated f, g series is km-level off
+    time_points = np.array([24900.0, 25100.0, 25360.0])
+    satellite, observers, directions = getObservations(getOE, time_points)
+    r2, v2 = OrbitCalculate.calculateBatch(observers[None], directions[None], time_points[None])
+    assert np.linalg.norm(r2[0] - satellite[1]) > 1
+
+    r2, v2, iterations = refineGauss(observers[None], directions[None], time_points[None], r2, v2, velocity=velocity)
+    npt.assert_allclose(r2[0], satellite[1], atol=1e-5)
+    npt.assert_allclose(v2[0], getVelocity(getOE, time_points[1]), atol=1e-6)
+    assert 0 < iterations[0] < 50
+
+    r2_refined, _ = OrbitCalculate.calculateBatch(observers[None], directions[None], time_points[None], refine=50, velocity=velocity)
+    npt.assert_allclose(r2_refined, r2)
+
+
+def test_GibbsAndHerrickGibbs(getOE):
+    time_points = np.array([-20.0, 0.0, 25.0])
+    positions = getPosInECI(getOE, time_points)
+    expected = getVelocity(getOE, 0.0)
+    npt.assert_allclose(calGibbs(*positions[:, None]), expected[None], atol=1e-4)
+    npt.assert_allclose(calHerrickGibbs(*positions[:, None], -20.0, 25.0), expected[None], atol=1e-6)
@@ -0,0 +1,154 @@
+import asyncio
+import json
+import threading
+import pytest
+import numpy as np
+import numpy.testing as npt
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+from package.utility import TypeOE, TypeLatLong
+from package.orbital import Simulation, OrbitCalculate
+from package.service import OrbitService
+
+
+@pytest.fixture
+def getTriplets():
+    OE = TypeOE(semimajor_axis=6876.6644, eccentricity=0.0020122, inclination=1.6971285,
+                right_ascension=2.7791209, argument_of_perigee=1.6541096, mean_anomaly=0.2653564)
+    sim = Simulation(OE, TypeLatLong(10, 20), time=datetime(year=2020, month=4, day=15, hour=18, minute=22, second=4))
+    time_points = np.array([[3800 + 5 * k, 3900 + 5 * k, 4050 + 5 * k] for k in range(40)], dtype='float64')
+    observers, directions = sim.getAllCoordsBatch(time_points.ravel())
+    directions = directions / np.linalg.norm(directions, axis=1)[:, None]
+    return observers.reshape(-1, 3, 3), directions.reshape(-1, 3, 3), time_points
+
+
+def test_service_equalsBatch(getTriplets):
+    observers, directions, time_points = getTriplets
+
+    async def run():
+        async with OrbitService(max_batch=16, max_latency=0.05) as service:
+            results = await asyncio.gather(*(service.calculate(observers[k], directions[k], time_points[k]) for k in range(len(time_points))))
+            return results, service.getStats()
+
+    results, stats = asyncio.run(run())
+    r2, v2 = OrbitCalculate.calculateBatch(observers, directions, time_points)
+    npt.assert_allclose(np.array([r for r, _ in results]), r2, rtol=1e-12)
+    npt.assert_allclose(np.array([v for _, v in results]), v2, rtol=1e-12)
+    # 40 concurrent requests are solved in batches of at most 16
+    assert stats["batches"] == 3 and max(stats["batch_sizes"]) == 16
+    assert stats["counters"]["service.requests"] == 40
+    assert stats["stages"]["request"]["count"] == 40
+    assert stats["queue_depth"] == 0
+
+
+def test_service_latencyBudget(getTriplets):
+    observers, directions, time_points = getTriplets
+
+    async def run():
+        async with OrbitService(max_batch=256, max_latency=0.01) as service:
+            first = await service.calculate(observers[0], directions[0], time_points[0])
+            second = await service.calculate(observers[1], directions[1], time_points[1])
+            return first, second, service.getStats()
+
+    _, _, stats = asyncio.run(run())
+    # Sequential requests do not wait for a full batch
+    assert stats["batch_sizes"] == {1: 2}
+    assert stats["stages"]["request"]["max"] < 1
+
+
+def test_service_backpressure(getTriplets):
+    observers, directions, time_points = getTriplets
+
+    async def run():
+        async with OrbitService(max_batch=4, max_queue=3) as service:
+            futures = [service.calculateNowait(observers[k], directions[k], time_points[k]) for k in range(3)]
+            with pytest.raises(asyncio.QueueFull):
+                service.calculateNowait(observers[3], directions[3], time_points[3])
+            assert service.queue_depth == 3
+            # calculate waits for room instead
+            waiting = [service.calculate(observers[k], directions[k], time_points[k]) for k in range(3, 10)]
+            results = await asyncio.gather(*futures, *waiting)
+            return results, service
+
+    results, service = asyncio.run(run())
+    assert len(results) == 10
+    assert service.metrics.counters["service.rejected"] == 1
+    assert service.max_queue_depth == 3
+    text = service.toPrometheus()
+    assert "doan_service_queue_depth 0" in text
+    assert 'doan_service_batch_size_bucket{le="+Inf"}' in text
+
+
+def test_service_stopWhileFull(getTriplets):
+    observers, directions, time_points = getTriplets
+    busy = threading.Event()
+    executor = ThreadPoolExecutor(max_workers=1)
+    # The worker is busy, so the first batch waits in the executor and the queue fills up
+    executor.submit(busy.wait)
+
+    async def run():
+        service = OrbitService(max_batch=1, max_latency=0, max_queue=2, executor=executor)
+        await service.start()
+        solving = service.calculateNowait(observers[0], directions[0], time_points[0])
+        await asyncio.sleep(0.01)
+        queued = [service.calculateNowait(observers[k], directions[k], time_points[k]) for k in (1, 2)]
+        blocked = [asyncio.ensure_future(service.calculate(observers[k], directions[k], time_points[k])) for k in range(3, 8)]
+        await asyncio.sleep(0.01)
+        assert service.queue_depth == 2 and not any(task.done() for task in blocked)
+
+        stopping = asyncio.ensure_future(service.stop())
+        await asyncio.sleep(0.01)
+        with pytest.raises(RuntimeError, match="service stopped"):
+            await service.calculate(observers[8], directions[8], time_points[8])
+        busy.set()
+        await asyncio.wait_for(stopping, 5)
+        return await asyncio.wait_for(asyncio.gather(solving, *queued, *blocked, return_exceptions=True), 5)
+
+    results = asyncio.run(run())
+    executor.shutdown()
+    # The batch being solved is finished, everything queued or waiting for room fails
+    r2, v2 = OrbitCalculate.calculateBatch(observers[:1], directions[:1], time_points[:1])
+    npt.assert_allclose(results[0][0], r2[0], rtol=1e-12)
+    assert all(isinstance(result, RuntimeError) and str(result) == "service stopped" for result in results[1:])
+
+
+def test_service_invalid(getTriplets):
+    observers, directions, time_points = getTriplets
+
+    async def run():
+        service = OrbitService()
+        with pytest.raises(RuntimeError):
+            await service.calculate(observers[0], directions[0], time_points[0])
+        async with service:
+            with pytest.raises(ValueError):
+                await service.calculate(observers[0, :2], directions[0], time_points[0])
+
+    asyncio.run(run())
+    with pytest.raises(ValueError):
+        OrbitService(max_batch=0)
+
+
+@pytest.mark.skipif(not hasattr(asyncio, "start_unix_server"), reason="Unix sockets are not available")
+def test_service_unixSocket(getTriplets, tmp_path):
+    observers, directions, time_points = getTriplets
+    path = str(tmp_path / "doan.sock")
+
+    async def run():
+        async with OrbitService(max_latency=0.01) as service:
+            await service.serveUnix(path, max_pending=4)
+            reader, writer = await asyncio.open_unix_connection(path)
+            for k in range(10):
+                message = {"id": k, "observers": observers[k].tolist(), "directions": directions[k].tolist(), "time_points": time_points[k].tolist()}
+                writer.write(json.dumps(message).encode() + b"\n")
+            writer.write(b'{"id": "bad", "observers": [1, 2]}\n')
+            await writer.drain()
+            responses = [json.loads(await reader.readline()) for _ in range(11)]
+            writer.close()
+            return responses
+
+    responses = {response["id"]: response for response in asyncio.run(run())}
+    r2, v2 = OrbitCalculate.calculateBatch(observers[:10], directions[:10], time_points[:10])
+    for k in range(10):
+        npt.assert_allclose(responses[k]["r2"], r2[k], rtol=1e-12)
+        npt.assert_allclose(responses[k]["v2"], v2[k], rtol=1e-12)
+    assert "error" in responses["bad"]
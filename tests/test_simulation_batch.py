@@ -0,0 +1,66 @@
+import pytest
+import numpy as np
+import numpy.testing as npt
+from datetime import datetime
+from package.utility import TypeOE, TypeLatLong, getMatECItoPQW, calMeanAnomaly, calVecInPQW
+from package.orbital import Simulation
+from package.propagation import calJ2Rates
+
+
+def test_getAllCoordsBatch_equalsScalar():
+    OE = TypeOE(semimajor_axis=6876.6644, eccentricity=0.0020122, inclination=1.6971285,
+                right_ascension=2.7791209, argument_of_perigee=1.6541096, mean_anomaly=0.2653564)
+    time = datetime(year=2020, month=4, day=15, hour=18, minute=22, second=4)
+    sim = Simulation(OE, TypeLatLong(21.047198, 105.800237), time=time)
+    dts = np.arange(0, 100000, 2503, dtype='float64')
+
+    observers, directions = sim.getAllCoordsBatch(dts)
+    expected = [sim.getAllCoords(dt) for dt in dts]
+    assert observers.shape == directions.shape == (len(dts), 3)
+    npt.assert_allclose(observers, np.array([observer for observer, _ in expected]), atol=1e-6)
+    npt.assert_allclose(directions, np.array([direction for _, direction in expected]), atol=1e-6)
+
+
+def test_orbitConstants_invalidation():
+    OE = TypeOE(semimajor_axis=6876.6644, eccentricity=0.0020122, inclination=1.6971285,
+                right_ascension=2.7791209, argument_of_perigee=1.6541096, mean_anomaly=0.2653564)
+    sim = Simulation(OE, TypeLatLong(21.047198, 105.800237), time=datetime(year=2020, month=4, day=15, hour=18, minute=22, second=4))
+    constants = sim._getOrbitConstants()
+    npt.assert_allclose(constants.toECI, getMatECItoPQW(i=OE.inclination, omega=OE.argument_of_perigee, sigma=OE.right_ascension))
+    npt.assert_allclose(calMeanAnomaly(0, OE.semimajor_axis, 100), constants.mean_motion * 100)
+
+    # Advancing the mean anomaly keeps the cache, mutating the orbit rebuilds it
+    sim._update(100)
+    assert sim._getOrbitConstants() is constants
+    sim._OE.inclination = 0.5
+    assert sim._getOrbitConstants().toECI == pytest.approx(getMatECItoPQW(i=0.5, omega=OE.argument_of_perigee, sigma=OE.right_ascension))
+    sim.eccentric_anomaly = 1.0
+    npt.assert_allclose(sim._getPosInECI(), sim._getOrbitConstants().toECI.T @ calVecInPQW(OE.semimajor_axis, OE.eccentricity, 1.0))
+
+
+def test_j2_getAllCoordsBatch_equalsScalar():
+    OE = TypeOE(semimajor_axis=6876.6644, eccentricity=0.0020122, inclination=1.6971285,
+                right_ascension=2.7791209, argument_of_perigee=1.6541096, mean_anomaly=0.2653564)
+    time = datetime(year=2020, month=4, day=15, hour=18, minute=22, second=4)
+    observer = TypeLatLong(21.047198, 105.800237)
+    sim = Simulation(OE, observer, time=time, model="j2")
+    dts = np.arange(0, 3 * 86400, 7001, dtype='float64')
+
+    _, directions = sim.getAllCoordsBatch(dts)
+    expected = [sim.getAllCoords(dt) for dt in dts]
+    npt.assert_allclose(directions, np.array([direction for _, direction in expected]), atol=1e-6)
+    # Both models start from the same position, the node and the perigee drift afterwards
+    twobody = Simulation(OE, observer, time=time)
+    npt.assert_allclose(directions[0], twobody.getAllCoords(0)[1], atol=1e-9)
+    drift = calJ2Rates(OE.semimajor_axis, OE.eccentricity, OE.inclination)
+    npt.assert_allclose(sim._getMatECItoPQW(dts[-1]), getMatECItoPQW(i=OE.inclination, omega=OE.argument_of_perigee + drift.argument_of_perigee * dts[-1],
+                                                                     sigma=OE.right_ascension + drift.right_ascension * dts[-1]))
+
+    # _update drifts the node and the perigee by the same rates
+    rates = sim._getOrbitConstants()
+    sim._update(86400)
+    assert sim._OE.right_ascension == pytest.approx(OE.right_ascension + rates.right_ascension_rate * 86400)
+    assert sim._OE.argument_of_perigee == pytest.approx(OE.argument_of_perigee + rates.argument_of_perigee_rate * 86400)
+    assert Simulation(OE, observer, time=time)._getOrbitConstants().right_ascension_rate == 0
+    with pytest.raises(ValueError):
+        Simulation(OE, observer, time=time, model="sgp4")
@@ -0,0 +1,57 @@
+import asyncio
+import pytest
+import numpy as np
+import numpy.testing as npt
+from datetime import datetime
+from package.utility import TypeOE, TypeLatLong
+from package.orbital import Simulation, OrbitCalculate
+from package.stream import StreamingOrbitCalculate, TypeMeasurement
+
+
+@pytest.fixture
+def getMeasurements():
+    OE = TypeOE(semimajor_axis=6876.6644, eccentricity=0.0020122, inclination=1.6971285,
+                right_ascension=2.7791209, argument_of_perigee=1.6541096, mean_anomaly=0.2653564)
+    sim = Simulation(OE, TypeLatLong(10, 20), time=datetime(year=2020, month=4, day=15, hour=18, minute=22, second=4))
+    dts = np.arange(3800, 4100, 10.0)
+    observers, directions = sim.getAllCoordsBatch(dts)
+    return [TypeMeasurement(t, R, p) for t, R, p in zip(dts, observers, directions)]
+
+
+def test_stream_equalsBatch(getMeasurements):
+    stream = StreamingOrbitCalculate(capacity=8, min_spacing=30)
+    solutions = list(stream.process(getMeasurements))
+    assert len(solutions) == len(getMeasurements) - 6
+    for solution in solutions:
+        i, j, k = solution.indices
+        assert k - j == j - i == 3
+        triplet = [getMeasurements[n] for n in (i, j, k)]
+        directions = np.array([m.direction / np.linalg.norm(m.direction) for m in triplet])
+        r2, v2 = OrbitCalculate.calculateBatch(np.array([m.observer for m in triplet])[None], directions[None],
+                                               np.array([m.time for m in triplet])[None])
+        npt.assert_allclose(solution.r2, r2[0], rtol=1e-12)
+        npt.assert_allclose(solution.v2, v2[0], rtol=1e-12)
+    # From the second triplet on, the pair (i, j) was the pair (j, k) of an earlier triplet
+    assert stream.cross_hits == len(solutions) - 3
+    assert len(stream._crosses) <= 3 * stream.capacity
+
+
+def test_stream_async(getMeasurements):
+    async def feed():
+        for measurement in getMeasurements:
+            yield measurement
+
+    async def collect():
+        return [solution async for solution in StreamingOrbitCalculate(min_spacing=30, max_span=60).processAsync(feed())]
+
+    solutions = asyncio.run(collect())
+    expected = list(StreamingOrbitCalculate(min_spacing=30, max_span=60).process(getMeasurements))
+    assert [s.indices for s in solutions] == [s.indices for s in expected]
+    npt.assert_allclose([s.r2 for s in solutions], [s.r2 for s in expected])
+
+
+def test_stream_badOrder(getMeasurements):
+    stream = StreamingOrbitCalculate()
+    stream.update(getMeasurements[1])
+    with pytest.raises(ValueError):
+        stream.update(getMeasurements[0])
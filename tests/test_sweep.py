@@ -0,0 +1,40 @@
+import pytest
+import numpy as np
+import numpy.testing as npt
+from datetime import datetime
+from package.utility import TypeOE, TypeLatLong
+from package.sweep import runSweep
+
+
+@pytest.fixture
+def getParameters():
+    OE = TypeOE(semimajor_axis=6876.6644, eccentricity=0.0020122, inclination=1.6971285,
+                right_ascension=2.7791209, argument_of_perigee=1.6541096, mean_anomaly=0.2653564)
+    time = datetime(year=2020, month=4, day=15, hour=18, minute=22, second=4)
+    return OE, TypeLatLong(0, 0), time
+
+
+def test_runSweep_shape(getParameters):
+    perturbations = np.zeros((4, 6))
+    perturbations[:, 5] = np.linspace(0, 0.01, 4)
+    result = runSweep(*getParameters, observer_offsets=np.linspace(0, 400, 5), spacings=[50, 100, 200],
+                      perturbations=perturbations, refine=50, workers=0, chunk_size=7)
+    assert result.r2.shape == result.v2.shape == result.r2_true.shape == (5, 3, 4, 3)
+    # Without an observer error the refined Gauss solution is the truth (the truncated series alone is off by 2-40 km)
+    npt.assert_allclose(result.r2[0], result.r2_true[0], atol=1e-4)
+    npt.assert_allclose(result.v2[0], result.v2_true[0], atol=1e-7)
+    assert np.linalg.norm(result.r2[-1, 0, 0] - result.r2_true[-1, 0, 0]) > 10
+
+
+def test_runSweep_processPool(getParameters):
+    offsets = np.random.default_rng(0).normal(size=(9, 3)) * 10
+    serial = runSweep(*getParameters, observer_offsets=offsets, spacings=[60, 120], workers=0)
+    parallel = runSweep(*getParameters, observer_offsets=offsets, spacings=[60, 120], workers=2, chunk_size=4)
+    npt.assert_array_equal(parallel.r2, serial.r2)
+    npt.assert_array_equal(parallel.v2, serial.v2)
+
+
+@pytest.mark.parametrize("workers", [0, 2])
+def test_runSweep_emptyGrid(getParameters, workers):
+    result = runSweep(*getParameters, observer_offsets=np.zeros((3, 3)), spacings=[], workers=workers)
+    assert result.r2.shape == result.v2_true.shape == (3, 0, 1, 3)
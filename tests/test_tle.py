@@ -0,0 +1,61 @@
+import io
+import os
+import pytest
+import numpy as np
+import numpy.testing as npt
+from package.tle import readTLE, iterTLE, checksumTLE
+
+CATALOG = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "CubeSat.txt")
+
+CUTE = """CUTE-1 (CO-55)
+1 27844U 03031E   20215.58257093  .00000039  00000-0  37433-4 0  9997
+2 27844  98.6816 222.6204 0008652 284.1732  75.8485 14.22249147886657
+"""
+
+
+def test_readTLE_record():
+    catalog = readTLE(io.StringIO(CUTE), validate=True)
+    assert len(catalog) == 1
+    assert catalog.names[0] == "CUTE-1 (CO-55)"
+    assert catalog.catalog_numbers[0] == 27844
+    assert catalog.epochs[0] == np.datetime64("2020-08-02T13:58:54.128352")
+    OE = catalog.OE[0]
+    npt.assert_allclose(OE.eccentricity, 0.0008652)
+    npt.assert_allclose(OE.inclination, np.deg2rad(98.6816))
+    npt.assert_allclose(OE.mean_anomaly, np.deg2rad(75.8485))
+    npt.assert_allclose(OE.semimajor_axis, 7195.7, rtol=1e-4)
+
+
+def test_readTLE_catalog():
+    catalog = readTLE(CATALOG, validate=True, chunk_size=50)
+    assert len(catalog) == 179
+    assert len(catalog.OE) == 179
+    assert np.all((catalog.OE.eccentricity >= 0) & (catalog.OE.eccentricity < 1))
+    assert np.all((catalog.OE.inclination >= 0) & (catalog.OE.inclination <= np.pi))
+    npt.assert_allclose(catalog[3].mean_motion, [14.88494287])
+
+
+def test_readTLE_badChecksum():
+    assert not checksumTLE(CUTE.splitlines()[1][:68] + "0")
+    with pytest.raises(ValueError):
+        readTLE(io.StringIO(CUTE.replace("9997", "9990")), validate=True)
+
+
+def test_readTLE_malformed():
+    lines = CUTE.splitlines()
+    # Record 2 lost the end of its line 1, record 4 its line 1
+    text = "\n".join([*lines, lines[0], lines[1][:40], lines[2], *lines, lines[2], *lines]) + "\n"
+    with pytest.raises(ValueError, match="line 4"):
+        readTLE(io.StringIO(text))
+
+    skipped = []
+    catalog = readTLE(io.StringIO(text), errors="skip", skipped=skipped)
+    assert len(catalog) == 3
+    assert [(record.line_number, record.lines) for record in skipped] == [(4, (lines[0], lines[1][:40], lines[2])), (10, (lines[2],))]
+
+    with pytest.raises(ValueError, match="line 1: wrong checksum"):
+        list(iterTLE(CUTE.replace("9997", "9990").splitlines(), validate=True))
+    with pytest.raises(ValueError, match="line 1: incomplete"):
+        list(iterTLE(lines[:2]))
+    with pytest.raises(ValueError):
+        list(iterTLE(lines, errors="ignore"))
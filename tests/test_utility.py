@@ -2,7 +2,8 @@ import pytest
 import numpy as np
 import numpy.testing as npt
 from datetime import datetime, timedelta
-from package.utility import TypeOE, getGMST
+from package.utility import (TypeOE, TypeOEArray, TypeLatLong, OE_FIELDS, OE_DTYPE, LATLONG_DTYPE, getGMST, getGMSTArray, getGMSTAndRie, getRie, getRieCached,
+                             calEccentricAnomaly, solveKepler, toECIfromLatLong, toECIfromLatLongBatch, getTangentBasis)
 
 
 @pytest.mark.skip
@@ -16,3 +17,94 @@ def test_SemimajorAxisfromMeanMotion():
 def test_GMST(dt, expected):
     time = datetime(year=2020, month=4, day=15, hour=18, minute=22, second=4)
     npt.assert_almost_equal(getGMST(time + timedelta(seconds=dt)), expected, decimal=2)
+
+
+def test_GMSTArray():
+    time = datetime(year=2020, month=4, day=15, hour=18, minute=22, second=4)
+    dts = np.array([-90000, 0, 3900, 4000, 86400 * 3 + 17], dtype='float64')
+    expected = [getGMST(time + timedelta(seconds=dt)) for dt in dts]
+    npt.assert_allclose(getGMSTArray(time, dts), expected, rtol=1e-10)
+
+
+def test_EccentricAnomalyArray():
+    M = np.linspace(-3, 9, num=25)
+    E = calEccentricAnomaly(M, 0.3, alias=1e-9)
+    npt.assert_allclose(E, [calEccentricAnomaly(m, 0.3, alias=1e-9) for m in M])
+
+
+@pytest.mark.parametrize("e", [0, 0.0020122, 0.5, 0.95])
+def test_solveKepler(e):
+    M = np.linspace(-20, 20, num=401)
+    E, iterations = solveKepler(M, e, tol=1e-13)
+    npt.assert_allclose(E - e * np.sin(E), M, atol=1e-12)
+    assert iterations.shape == M.shape and iterations.max() < 10
+
+
+def test_solveKepler_badEccentricity():
+    with pytest.raises(ValueError):
+        solveKepler(np.zeros(3), 1.0)
+
+
+def test_GMSTArray_datetime64():
+    time = datetime(year=2020, month=4, day=15, hour=18, minute=22, second=4)
+    dts = np.array([-90000, 0, 3900, 4000, 86400 * 3 + 17])
+    times = np.datetime64(time) + dts.astype('timedelta64[s]')
+    npt.assert_allclose(getGMSTArray(times), [getGMST(time + timedelta(seconds=int(dt))) for dt in dts], rtol=1e-10)
+
+
+@pytest.mark.parametrize("unique", [False, True])
+def test_GMSTAndRie(unique):
+    time = datetime(year=2020, month=4, day=15, hour=18, minute=22, second=4)
+    dts = np.array([3900, 4000, 3900, 4100, 4000], dtype='float64')
+    gmst, Rie = getGMSTAndRie(time, dts, unique=unique)
+    assert gmst.shape == (5,) and Rie.shape == (5, 3, 3)
+    for k, dt in enumerate(dts):
+        npt.assert_allclose(Rie[k], getRie(time + timedelta(seconds=dt)), atol=1e-12)
+        npt.assert_allclose(getRieCached(time + timedelta(seconds=dt)), Rie[k], atol=1e-12)
+
+    # Sub-second timestamps: the cached and the uncached path agree (both truncate to whole seconds)
+    fractional = time + timedelta(seconds=3900.75)
+    npt.assert_allclose(getRieCached(fractional), getRie(fractional), atol=1e-12)
+    npt.assert_allclose(getRieCached(np.datetime64(fractional)), getRie(fractional), atol=1e-12)
+    observer = TypeLatLong(21.047198, 105.800237)
+    npt.assert_allclose(toECIfromLatLong(observer, fractional, cache=True), toECIfromLatLong(observer, fractional), atol=1e-9)
+
+
+def test_TypeOE_slots():
+    OE = TypeOE(eccentricity=0.0012384, inclination=1.7, right_ascension=0.48, argument_of_perigee=3.0, mean_anomaly=3.2, mean_motion=14.91391657)
+    assert not hasattr(OE, "__dict__")
+    with pytest.raises(AttributeError):
+        OE.mean_motion = 14.9
+
+
+def test_OE_DTYPE_views():
+    records = np.zeros(4, dtype=OE_DTYPE)
+    records["semimajor_axis"] = [7000, 7100, 7200, 7300]
+    OE = TypeOEArray.fromRecords(records)
+    assert all(np.shares_memory(getattr(OE, name), records) for name in OE_FIELDS)
+    OE.mean_anomaly[2] = 1.5
+    assert records[2]["mean_anomaly"] == 1.5
+    assert OE[2].semimajor_axis == 7200
+    npt.assert_array_equal(OE.toRecords(), records)
+
+
+def test_LATLONG_DTYPE_views():
+    records = np.array([(21.0, 105.8), (-60, 30)], dtype=LATLONG_DTYPE)
+    observers = TypeLatLong.fromRecords(records)
+    assert np.shares_memory(observers.latitude, records)
+    time = datetime(year=2020, month=4, day=15, hour=18, minute=22, second=4)
+    positions = toECIfromLatLongBatch(observers, time, np.zeros(2))
+    npt.assert_allclose(positions[1], toECIfromLatLongBatch(TypeLatLong(-60, 30), time, np.zeros(1))[0])
+
+
+def test_getTangentBasis():
+    directions = np.random.default_rng(0).normal(size=(4, 5, 3))
+    directions[0, 0] = [0, 0, -1]
+    directions /= np.linalg.norm(directions, axis=-1)[..., None]
+    u, w = getTangentBasis(directions)
+    assert u.shape == w.shape == (4, 5, 3)
+    npt.assert_allclose(np.linalg.norm(u, axis=-1), 1)
+    npt.assert_allclose(np.linalg.norm(w, axis=-1), 1)
+    npt.assert_allclose(np.sum(u * directions, axis=-1), 0, atol=1e-12)
+    npt.assert_allclose(np.sum(w * u, axis=-1), 0, atol=1e-12)
+    npt.assert_allclose(np.cross(u, w), directions, atol=1e-12)